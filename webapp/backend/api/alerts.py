@@ -0,0 +1,433 @@
+"""
+Alerting
+Incremental threshold, rate-of-change and flapping rules with pluggable delivery
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import logging
+import urllib.request
+from collections import deque
+from pathlib import Path
+from api.services import get_containers_root
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TIMEOUT = float(os.environ.get('OPENHOMESTACK_ALERT_WEBHOOK_TIMEOUT', 5))
+
+# Used when no alerts file exists
+DEFAULT_RULES = [
+    {"name": "disk-full", "type": "threshold", "metric": "disk_percent", "above": 90, "clear": 85,
+     "severity": "critical"},
+    {"name": "memory-high", "type": "threshold", "metric": "memory_percent", "above": 95, "clear": 90,
+     "for": 3, "severity": "warning"},
+    {"name": "crash-loop", "type": "flapping", "transitions": 4, "window": 300, "severity": "critical"}
+]
+
+
+def _default_alerts_file():
+    return Path(os.environ.get('OPENHOMESTACK_ALERTS_FILE') or get_containers_root() / '.openhomestack' / 'alerts.json')
+
+
+def metric_value(sample, metric):
+    """
+    Look up a dotted metric path in a system sample
+
+    Args:
+        sample: Sample dict from SystemMonitor.sample()
+        metric: Path such as "disk_percent" or "net.eth0.rx_bps"
+
+    Returns:
+        float: Value, or None if the sample does not have it
+    """
+    value = sample
+    for part in metric.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, (int, float)) else None
+
+
+class ThresholdRule:
+    """
+    Fires when a metric crosses a bound for `for` consecutive samples
+
+    With `clear`, a firing alert only resolves once the value is back past
+    the clear level, so a value hovering at the bound does not flap.
+    """
+
+    kind = 'metric'
+
+    def __init__(self, spec):
+        """
+        Args:
+            spec: Rule dict with name, metric, above or below, and optional
+                clear, for and severity
+
+        Raises:
+            ValueError: If the rule is incomplete
+        """
+        self.name = spec.get('name')
+        self.metric = spec.get('metric')
+        if not self.name or not self.metric:
+            raise ValueError(f"Alert rule needs a name and a metric: {spec}")
+        if ('above' in spec) == ('below' in spec):
+            raise ValueError(f"Alert rule '{self.name}' needs exactly one of above/below")
+        self.above = 'above' in spec
+        self.bound = float(spec['above'] if self.above else spec['below'])
+        self.clear = float(spec.get('clear', self.bound))
+        self.samples = max(1, int(spec.get('for', 1)))
+        self.severity = spec.get('severity', 'warning')
+        self.spec = dict(spec)
+
+    def _breached(self, value, active):
+        if self.above:
+            return value > self.clear if active else value > self.bound
+        return value < self.clear if active else value < self.bound
+
+    def evaluate(self, value, ts, active, state):
+        """
+        Whether the alert condition holds after this sample
+
+        Args:
+            value: New metric value
+            ts: Sample timestamp
+            active: Whether the alert is currently firing
+            state: Per-key dict the rule may keep state in
+
+        Returns:
+            bool: True while the alert should be firing
+        """
+        if active:
+            still = self._breached(value, True)
+            if not still:
+                state['count'] = 0
+            return still
+        state['count'] = state.get('count', 0) + 1 if self._breached(value, False) else 0
+        return state['count'] >= self.samples
+
+    def describe(self, key, value, state):
+        direction = 'above' if self.above else 'below'
+        return f"{self.metric} is {value:g}, {direction} {self.bound:g}"
+
+    def _back_within(self, value):
+        """How a resolving value relates to the clear level, e.g. 'below 90'"""
+        if value == self.clear:
+            return f"at {self.clear:g}"
+        return f"{'below' if self.above else 'above'} {self.clear:g}"
+
+    def describe_resolved(self, key, value, state):
+        return f"{self.metric} back to {value:g}, {self._back_within(value)}"
+
+
+class RateRule(ThresholdRule):
+    """
+    Fires when a metric changes faster than a bound
+
+    The rate is the change between consecutive samples scaled to `per`
+    seconds (default 60), e.g. disk_percent growing by more than 1 per minute.
+    """
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.per = float(spec.get('per', 60))
+
+    def evaluate(self, value, ts, active, state):
+        previous = state.get('previous')
+        state['previous'] = (value, ts)
+        if previous is None or ts <= previous[1]:
+            return active
+        rate = (value - previous[0]) / (ts - previous[1]) * self.per
+        state['rate'] = rate
+        return super().evaluate(rate, ts, active, state)
+
+    def describe(self, key, value, state):
+        return f"{self.metric} changing by {state.get('rate', 0):.2f} per {self.per:g}s"
+
+    def describe_resolved(self, key, value, state):
+        rate = state.get('rate', 0)
+        return f"{self.metric} changing by {rate:.2f} per {self.per:g}s, {self._back_within(rate)}"
+
+
+class FlappingRule:
+    """
+    Fires when a service's container state changes too often
+
+    Keeps only the transition times inside the window per service, so
+    every sample costs O(1) amortized per service.
+    """
+
+    kind = 'state'
+
+    def __init__(self, spec):
+        self.name = spec.get('name')
+        if not self.name:
+            raise ValueError(f"Alert rule needs a name: {spec}")
+        self.transitions = max(2, int(spec.get('transitions', 4)))
+        self.window = float(spec.get('window', 300))
+        self.clear = int(spec.get('clear', 0))
+        self.severity = spec.get('severity', 'warning')
+        self.spec = dict(spec)
+
+    def evaluate(self, value, ts, active, state):
+        changes = state.setdefault('changes', deque())
+        last = state.get('last')
+        state['last'] = value
+        if last is not None and value != last:
+            changes.append(ts)
+        while changes and changes[0] < ts - self.window:
+            changes.popleft()
+        if active:
+            return len(changes) > self.clear
+        return len(changes) >= self.transitions
+
+    def describe(self, key, value, state):
+        return f"{key} changed state {self.transitions}+ times in {self.window:g}s (now {value})"
+
+    def describe_resolved(self, key, value, state):
+        changes = len(state.get('changes', ()))
+        return f"{key} settled: {changes} state changes in {self.window:g}s (now {value})"
+
+
+RULE_TYPES = {
+    'threshold': ThresholdRule,
+    'rate': RateRule,
+    'flapping': FlappingRule
+}
+
+
+def build_rule(spec):
+    """
+    Create a rule from its config dict
+
+    Raises:
+        ValueError: On an unknown type or invalid rule
+    """
+    rule_type = spec.get('type', 'threshold')
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"Unknown alert rule type '{rule_type}'")
+    return RULE_TYPES[rule_type](spec)
+
+
+class WebhookSink:
+    """POSTs each alert as JSON to a URL"""
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+
+    def send(self, alert):
+        body = json.dumps(alert, default=str).encode('utf-8')
+        request = urllib.request.Request(
+            self.url, data=body, method='POST',
+            headers={'Content-Type': 'application/json', **self.headers}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink:
+    """Appends each alert as a JSON line to a file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def send(self, alert):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert, default=str) + '\n')
+
+
+class EventSink:
+    """Publishes each alert on the event bus (and so to SSE clients)"""
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def send(self, alert):
+        self.bus.publish('alert', alert)
+
+
+def build_sink(spec):
+    """
+    Create a sink from its config dict
+
+    Raises:
+        ValueError: On an unknown type or missing setting
+    """
+    sink_type = spec.get('type')
+    if sink_type == 'webhook':
+        if not spec.get('url'):
+            raise ValueError("Webhook alert sink needs a url")
+        return WebhookSink(spec['url'], float(spec.get('timeout', WEBHOOK_TIMEOUT)), spec.get('headers'))
+    if sink_type == 'file':
+        if not spec.get('path'):
+            raise ValueError("File alert sink needs a path")
+        return FileSink(spec['path'])
+    raise ValueError(f"Unknown alert sink type '{sink_type}'")
+
+
+class AlertEngine:
+    """
+    Evaluates alert rules against each new sample and delivers state changes
+
+    Every rule keeps its own small state per key (metric or service), so a
+    sample costs O(rules) regardless of history length. An alert is only
+    delivered when it starts firing and when it resolves; repeated breaches
+    while it fires are deduplicated. Delivery runs on a background thread,
+    so a slow webhook never delays sampling.
+    """
+
+    def __init__(self, rules=None, sinks=None):
+        """
+        Initialize alert engine
+
+        Args:
+            rules: Rule config dicts (default: from the alerts file, else DEFAULT_RULES)
+            sinks: Sink objects with a send(alert) method (default: from the alerts file)
+        """
+        if rules is None:
+            rules, sink_specs = self._load()
+            if sinks is None:
+                sinks = []
+                for spec in sink_specs:
+                    try:
+                        sinks.append(build_sink(spec))
+                    except ValueError as e:
+                        logger.error("Ignoring alert sink: %s", e)
+
+        self.rules = []
+        for spec in rules:
+            try:
+                self.rules.append(build_rule(spec))
+            except (ValueError, TypeError) as e:
+                logger.error("Ignoring alert rule: %s", e)
+
+        self.sinks = list(sinks or [])
+        self._state = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._delivered = threading.Condition()
+        self._enqueued = 0
+        self._done = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.started = False
+
+    def _load(self):
+        alerts_file = _default_alerts_file()
+        if not alerts_file.is_file():
+            return DEFAULT_RULES, []
+        try:
+            with open(alerts_file, 'r') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read alerts file %s: %s", alerts_file, e)
+            return DEFAULT_RULES, []
+        return config.get('rules', DEFAULT_RULES), config.get('sinks', [])
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def start(self):
+        """Start the delivery thread (idempotent)"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._deliver_loop, name='alert-delivery', daemon=True)
+                self._thread.start()
+            self.started = True
+
+    def observe_metrics(self, sample):
+        """
+        Evaluate metric rules against a new system sample
+
+        Args:
+            sample: Sample dict from SystemMonitor.sample()
+        """
+        ts = sample.get('ts') or time.time()
+        for rule in self.rules:
+            if rule.kind != 'metric':
+                continue
+            value = metric_value(sample, rule.metric)
+            if value is not None:
+                self._evaluate(rule, rule.metric, value, ts)
+
+    def observe_states(self, statuses, ts=None):
+        """
+        Evaluate state rules against newly collected service statuses
+
+        Args:
+            statuses: service_id -> status dict
+            ts: Collection timestamp (default: now)
+        """
+        ts = ts or time.time()
+        for rule in self.rules:
+            if rule.kind != 'state':
+                continue
+            for service_id, status in statuses.items():
+                state = status.get('state')
+                if state and state != 'not_installed':
+                    self._evaluate(rule, service_id, state, ts)
+
+    def _evaluate(self, rule, key, value, ts):
+        alert_key = (rule.name, key)
+        with self._lock:
+            active = alert_key in self._active
+            state = self._state.setdefault(alert_key, {})
+            firing = rule.evaluate(value, ts, active, state)
+            if firing == active:
+                return
+            if firing:
+                alert = {
+                    "rule": rule.name,
+                    "key": key,
+                    "severity": rule.severity,
+                    "status": "firing",
+                    "message": rule.describe(key, value, state),
+                    "value": value,
+                    "started_at": ts,
+                    "resolved_at": None
+                }
+                self._active[alert_key] = alert
+            else:
+                alert = dict(self._active.pop(alert_key), status="resolved", resolved_at=ts, value=value,
+                             message=rule.describe_resolved(key, value, state))
+            alert = dict(alert)
+
+        logger.warning("Alert %s %s: %s", alert['rule'], alert['status'], alert['message'])
+        with self._delivered:
+            self._enqueued += 1
+        self._queue.put(alert)
+
+    def _deliver_loop(self):
+        while True:
+            alert = self._queue.get()
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    logger.error("Alert delivery via %s failed: %s", type(sink).__name__, e)
+            with self._delivered:
+                self._done += 1
+                self._delivered.notify_all()
+
+    def flush(self, timeout=5):
+        """Wait until every alert raised so far has been delivered"""
+        with self._delivered:
+            target = self._enqueued
+            self._delivered.wait_for(lambda: self._done >= target, timeout=timeout)
+
+    def active(self):
+        """Currently firing alerts, most severe first"""
+        with self._lock:
+            alerts = [dict(alert) for alert in self._active.values()]
+        alerts.sort(key=lambda a: (a['severity'] != 'critical', a['started_at']))
+        return alerts
+
+    def describe_rules(self):
+        return [rule.spec for rule in self.rules]
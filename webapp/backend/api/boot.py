@@ -0,0 +1,308 @@
+"""
+Stack Boot Orchestration
+Dependency-aware, parallel bring-up of every installed service
+"""
+
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from api.readiness import ReadinessWaiter, containers_ready
+
+logger = logging.getLogger(__name__)
+
+# Seconds a service may take to become ready before its dependents are skipped
+BOOT_READY_TIMEOUT = float(os.environ.get('OPENHOMESTACK_BOOT_READY_TIMEOUT', 180))
+BOOT_MAX_PARALLEL = int(os.environ.get('OPENHOMESTACK_BOOT_MAX_PARALLEL', 4))
+BOOT_ON_START = os.environ.get('OPENHOMESTACK_BOOT_ON_START', 'false').lower() in ('1', 'true', 'yes')
+
+
+def build_graph(services, installed):
+    """
+    Build the service-level dependency graph from openhomestack.requires labels
+
+    Requirements on services that are not installed are dropped, so
+    `requires=dns,pihole` waits for whichever DNS server is present.
+
+    Args:
+        services: Service mappings from ServiceManager.discover_services()
+        installed: Set of installed service IDs
+
+    Returns:
+        dict: service_id -> set of service IDs it must wait for
+    """
+    graph = {}
+    for service in services:
+        if service['id'] not in installed:
+            continue
+        graph[service['id']] = {
+            required for required in service.get('requires', [])
+            if required in installed and required != service['id']
+        }
+    return graph
+
+
+def boot_layers(graph):
+    """
+    Group services into layers that can be started together
+
+    Args:
+        graph: service_id -> set of required service IDs
+
+    Returns:
+        list: Layers of service IDs; each only requires earlier layers
+
+    Raises:
+        ValueError: If the requirements contain a cycle
+    """
+    remaining = {service_id: set(deps) for service_id, deps in graph.items()}
+    layers = []
+    while remaining:
+        ready = sorted(service_id for service_id, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError(f"Dependency cycle between services: {', '.join(sorted(remaining))}")
+        layers.append(ready)
+        for service_id in ready:
+            del remaining[service_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return layers
+
+
+def critical_path(graph, durations):
+    """
+    Longest chain of requirements weighted by each service's boot duration
+
+    Args:
+        graph: service_id -> set of required service IDs
+        durations: service_id -> seconds from start to ready
+
+    Returns:
+        tuple: (list of service IDs along the path, total seconds)
+    """
+    finish = {}
+    previous = {}
+    for layer in boot_layers(graph):
+        for service_id in layer:
+            start, before = 0.0, None
+            for required in graph[service_id]:
+                if finish[required] > start:
+                    start, before = finish[required], required
+            finish[service_id] = start + durations.get(service_id, 0.0)
+            previous[service_id] = before
+
+    if not finish:
+        return [], 0.0
+
+    end = max(finish, key=finish.get)
+    path = []
+    while end is not None:
+        path.append(end)
+        end = previous[end]
+    return list(reversed(path)), round(finish[path[0]], 2)
+
+
+class BootOrchestrator:
+    """Starts installed services in dependency order, as parallel as the graph allows"""
+
+    def __init__(self, service_manager, container_manager, readiness_waiter=None,
+                 ready_timeout=BOOT_READY_TIMEOUT, max_parallel=BOOT_MAX_PARALLEL):
+        """
+        Initialize boot orchestrator
+
+        Args:
+            service_manager: ServiceManager used for the catalog
+            container_manager: ContainerManager used to start and inspect services
+            readiness_waiter: ReadinessWaiter shared with the API (default: a new one)
+            ready_timeout: Seconds to wait for a service to become ready
+            max_parallel: Maximum number of services booting at once
+        """
+        self.service_manager = service_manager
+        self.container_manager = container_manager
+        self.readiness_waiter = readiness_waiter or ReadinessWaiter(service_manager, container_manager)
+        self.ready_timeout = ready_timeout
+        self.max_parallel = max_parallel
+        self._lock = threading.Lock()
+        self._run = None
+        self._thread = None
+
+    def plan(self):
+        """
+        Compute the boot order of the installed services
+
+        Returns:
+            dict: Requirement graph, layers and the critical path estimated
+                from the last run's timings
+
+        Raises:
+            ValueError: If the requirements contain a cycle
+        """
+        services = self.service_manager.discover_services()
+        installed = {
+            service['id'] for service in services
+            if self.container_manager.get_status(service['id']).get('state') not in ('not_installed', 'error', 'unknown')
+        }
+        graph = build_graph(services, installed)
+        layers = boot_layers(graph)
+
+        urls = {service['id']: service.get('url') for service in services if service['id'] in graph}
+        last_durations = {}
+        with self._lock:
+            if self._run:
+                last_durations = {
+                    service_id: entry['duration_s']
+                    for service_id, entry in self._run['services'].items()
+                    if entry.get('duration_s') is not None
+                }
+
+        # Without timings from a previous boot, the longest chain by hop count
+        path, estimate = critical_path(graph, last_durations or dict.fromkeys(graph, 1.0))
+        return {
+            "services": {
+                service_id: {"requires": sorted(deps), "url": urls.get(service_id)}
+                for service_id, deps in graph.items()
+            },
+            "layers": layers,
+            "critical_path": path,
+            "estimated_s": estimate if last_durations else None
+        }
+
+    def start(self):
+        """
+        Boot the stack in a background thread
+
+        Returns:
+            dict: The plan the run follows
+
+        Raises:
+            RuntimeError: If a boot is already in progress
+            ValueError: If the requirements contain a cycle
+        """
+        plan = self.plan()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("A boot is already in progress")
+            self._run = {
+                "state": "running",
+                "started_at": time.time(),
+                "finished_at": None,
+                "duration_s": None,
+                "critical_path": [],
+                "critical_path_s": None,
+                "services": {
+                    service_id: {"state": "pending", "requires": info['requires']}
+                    for service_id, info in plan['services'].items()
+                }
+            }
+            self._thread = threading.Thread(target=self._boot, args=(plan,), name='stack-boot', daemon=True)
+            self._thread.start()
+        logger.info("Booting %s services in %s layers", len(plan['services']), len(plan['layers']))
+        return plan
+
+    def status(self):
+        """
+        Progress and timings of the current or last boot
+
+        Returns:
+            dict: Run state with per-service timings, or None if never run
+        """
+        with self._lock:
+            if self._run is None:
+                return None
+            run = dict(self._run)
+            run['services'] = {service_id: dict(entry) for service_id, entry in self._run['services'].items()}
+            return run
+
+    def _update(self, service_id, **fields):
+        with self._lock:
+            self._run['services'][service_id].update(fields)
+
+    def _boot(self, plan):
+        """
+        Start each service as soon as everything it requires is ready
+
+        Unlike stepping through the layers, a service is released the moment
+        its own requirements are ready, so total time follows the critical
+        path rather than the slowest service of every layer.
+        """
+        graph = {service_id: set(info['requires']) for service_id, info in plan['services'].items()}
+        started = time.monotonic()
+        ready, failed, running = set(), set(), {}
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='boot') as executor:
+            while True:
+                for service_id, deps in graph.items():
+                    if service_id in ready or service_id in failed or service_id in running:
+                        continue
+                    if deps & failed:
+                        failed.add(service_id)
+                        self._update(service_id, state="skipped",
+                                     error=f"Required service failed: {', '.join(sorted(deps & failed))}")
+                        continue
+                    if deps <= ready:
+                        running[service_id] = executor.submit(self._boot_service, service_id, started)
+
+                if not running:
+                    if len(ready) + len(failed) == len(graph):
+                        break
+                    # Skipped services were marked failed; loop again to propagate
+                    continue
+
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for service_id, future in list(running.items()):
+                    if future not in done:
+                        continue
+                    del running[service_id]
+                    (ready if future.result() else failed).add(service_id)
+
+        durations = {}
+        with self._lock:
+            for service_id, entry in self._run['services'].items():
+                if entry.get('duration_s') is not None:
+                    durations[service_id] = entry['duration_s']
+        path, path_s = critical_path(graph, durations)
+
+        with self._lock:
+            self._run.update({
+                "state": "completed" if not failed else "failed",
+                "finished_at": time.time(),
+                "duration_s": round(time.monotonic() - started, 2),
+                "critical_path": path,
+                "critical_path_s": path_s
+            })
+        logger.info("Stack boot finished in %ss (%s ready, %s failed or skipped)",
+                    self._run['duration_s'], len(ready), len(failed))
+
+    def _boot_service(self, service_id, boot_started):
+        """
+        Start one service and wait until it is ready
+
+        Returns:
+            bool: True if the service became ready
+        """
+        begin = time.monotonic()
+        self._update(service_id, state="starting", started_at_s=round(begin - boot_started, 2))
+
+        status = self.container_manager.get_status(service_id, fresh=True)
+        if not containers_ready(status):
+            result = self.container_manager.start(service_id)
+            if not result.get('success'):
+                self._update(service_id, state="failed", error=result.get('error'))
+                logger.error("Boot: could not start %s: %s", service_id, result.get('error'))
+                return False
+
+        self._update(service_id, state="waiting")
+        # Driven by Docker events; only the URL check is retried, with backoff
+        timeout = max(begin + self.ready_timeout - time.monotonic(), 0)
+        readiness = self.readiness_waiter.wait(service_id, timeout=timeout, started=begin)
+        if not readiness['ready']:
+            self._update(service_id, state="failed", error=readiness['error'])
+            logger.error("Boot: %s %s", service_id, readiness['error'])
+            return False
+
+        now = time.monotonic()
+        self._update(service_id, state="ready", ready_at_s=round(now - boot_started, 2),
+                     duration_s=round(now - begin, 2))
+        logger.info("Boot: %s ready in %.1fs", service_id, now - begin)
+        return True
@@ -0,0 +1,132 @@
+"""
+Request Coalescing
+Single-flight TTL cache with stale-while-revalidate for expensive reads
+"""
+
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default freshness windows (seconds)
+CACHE_TTL = float(os.environ.get('OPENHOMESTACK_CACHE_TTL', 2))
+CACHE_STALE_TTL = float(os.environ.get('OPENHOMESTACK_CACHE_STALE_TTL', 10))
+
+
+class _Call:
+    """An in-flight computation other callers can wait on"""
+
+    __slots__ = ('event', 'value', 'error', 'generation')
+
+    def __init__(self, generation):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.generation = generation
+
+
+class SingleFlightCache:
+    """
+    Coalesces concurrent identical reads and caches their results briefly
+
+    - Fresh (younger than `ttl`): served from the cache
+    - Stale (younger than `ttl + stale_ttl`): served from the cache while one
+      background thread recomputes it
+    - Missing or expired: the first caller computes, concurrent callers for
+      the same key wait for that result instead of repeating the work
+
+    Failed computations are not cached.
+    """
+
+    def __init__(self, name, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL):
+        """
+        Initialize cache
+
+        Args:
+            name: Name used in log messages
+            ttl: Seconds a value is considered fresh
+            stale_ttl: Additional seconds a stale value may be served while refreshing
+        """
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._in_flight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Get a value, computing it at most once across concurrent callers
+
+        Args:
+            key: Hashable cache key
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            Cached or freshly computed value
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, computed_at = entry
+                age = now - computed_at
+                if age < self.ttl:
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    if key not in self._in_flight:
+                        call = self._in_flight[key] = _Call(self._generation)
+                        threading.Thread(
+                            target=self._compute, args=(key, compute, call),
+                            name=f'refresh-{self.name}', daemon=True
+                        ).start()
+                    return value
+
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call(self._generation)
+
+        if leader:
+            self._compute(key, compute, call)
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def _compute(self, key, compute, call):
+        """Run a computation and publish its result to waiters"""
+        try:
+            call.value = compute()
+        except Exception as e:
+            call.error = e
+            logger.debug("%s cache computation for %r failed: %s", self.name, key, e)
+
+        with self._lock:
+            # Results started before an invalidation may predate the change
+            if call.error is None and call.generation == self._generation:
+                self._entries[key] = (call.value, time.monotonic())
+            if self._in_flight.get(key) is call:
+                del self._in_flight[key]
+        call.event.set()
+
+    def invalidate(self, key=None):
+        """
+        Drop a cached value (or all values) so the next read recomputes
+
+        Args:
+            key: Key to drop, or None to clear the cache
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._in_flight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._in_flight.pop(key, None)
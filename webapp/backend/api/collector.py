@@ -0,0 +1,363 @@
+"""
+State Collector
+Leader-elected background collector shared by all API worker processes
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import logging
+from pathlib import Path
+from api.responses import encode_json
+
+# fcntl is only available on POSIX; without it every worker collects on its own
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COLLECTOR_ENABLED = os.environ.get('OPENHOMESTACK_COLLECTOR', 'true').lower() not in ('0', 'false', 'no')
+COLLECTOR_INTERVAL = float(os.environ.get('OPENHOMESTACK_COLLECTOR_INTERVAL', 5))
+
+
+def _default_run_dir():
+    """Prefer tmpfs (/dev/shm) so the snapshot never touches disk"""
+    shm = Path('/dev/shm')
+    base = shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+    return base / 'openhomestack'
+
+
+class StateCollector:
+    """
+    Owns Docker state, metric sampling and the catalog for all workers
+
+    Every worker process runs a lightweight thread that tries to take an
+    exclusive flock on a lock file. The holder becomes the leader: it runs the
+    registered collection functions every interval and publishes the results
+    as one JSON snapshot on tmpfs. Other workers only read that file (re-parsed
+    when its mtime changes). If the leader dies the kernel releases the lock
+    and another worker takes over on its next attempt.
+    """
+
+    def __init__(self, run_dir=None, interval=COLLECTOR_INTERVAL, enabled=COLLECTOR_ENABLED):
+        """
+        Initialize state collector
+
+        Args:
+            run_dir: Directory for the lock and snapshot files
+            interval: Seconds between collections
+            enabled: Whether to collect in the background at all
+        """
+        self.run_dir = Path(run_dir or os.environ.get('OPENHOMESTACK_RUN_DIR') or _default_run_dir())
+        self.interval = interval
+        self.enabled = enabled and fcntl is not None
+        self.lock_path = self.run_dir / 'collector.lock'
+        self.snapshot_path = self.run_dir / 'snapshot.json'
+        self.refresh_path = self.run_dir / 'refresh'
+
+        self._sections = {}
+        self._separate = set()
+        self._derived = {}
+        self._leader_callbacks = []
+        self._lock_file = None
+        self._is_leader = False
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._cache_mtime = None
+        self._cache = None
+        self._section_cache = {}
+
+    @property
+    def is_leader(self):
+        """Whether this process currently owns collection"""
+        return self._is_leader
+
+    def register(self, name, collect_fn, separate=False):
+        """
+        Register a snapshot section
+
+        Args:
+            name: Section name in the snapshot
+            collect_fn: Callable returning JSON-serializable data, run by the leader
+            separate: Publish the section in a file of its own, parsed only by
+                workers that read it, for large data most requests do not need
+        """
+        self._sections[name] = collect_fn
+        if separate:
+            self._separate.add(name)
+
+    def register_derived(self, name, derive_fn):
+        """
+        Register a section computed from the other sections of the same snapshot
+
+        Args:
+            name: Section name in the snapshot
+            derive_fn: Callable taking the dict of collected sections, run by
+                the leader after every regular section
+        """
+        self._derived[name] = derive_fn
+
+    def on_leader(self, callback):
+        """
+        Register a callback run once when this process becomes leader
+
+        Used to start background samplers only in the process that owns them.
+        """
+        self._leader_callbacks.append(callback)
+
+    def ensure_started(self):
+        """Start the election/collection thread in this process (fork safe)"""
+        if not self.enabled:
+            return
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._pid == pid and self._thread is not None:
+                return
+            # After a fork the parent's thread and lock do not exist here
+            self._pid = pid
+            self._is_leader = False
+            self._lock_file = None
+            self._thread = threading.Thread(target=self._run, name='state-collector', daemon=True)
+            self._thread.start()
+
+    def get(self, name, fresh=True):
+        """
+        Read a section from the shared snapshot
+
+        Args:
+            name: Section name
+            fresh: Only read a current snapshot; False also accepts one from
+                a dead leader or from before a refresh request
+
+        Returns:
+            Section data, or None if no (fresh) snapshot is available and the
+            caller should compute the value itself
+        """
+        if not self.enabled:
+            return None
+        self.ensure_started()
+
+        snapshot = self._read_snapshot() if fresh else self._load_snapshot()
+        if snapshot is None:
+            return None
+        if name in self._separate:
+            return self._load_section(name)
+        return snapshot.get('sections', {}).get(name)
+
+    def get_sections(self, fresh=True):
+        """
+        All sections of one snapshot, for reads that must be consistent
+
+        Args:
+            fresh: Only return a snapshot that is current; False also accepts
+                one from a dead leader or from before a refresh request
+
+        Returns:
+            dict: Section name -> data, or None if no (fresh) snapshot exists
+        """
+        if not self.enabled:
+            return None
+        self.ensure_started()
+
+        snapshot = self._read_snapshot() if fresh else self._load_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.get('sections', {})
+
+    def snapshot_info(self):
+        """Describe the current snapshot and leadership for diagnostics"""
+        self.ensure_started()
+        snapshot = self._read_snapshot() if self.enabled else None
+        return {
+            "enabled": self.enabled,
+            "leader": self._is_leader,
+            "pid": os.getpid(),
+            "leader_pid": snapshot.get('pid') if snapshot else None,
+            "generated_at": snapshot.get('generated_at') if snapshot else None,
+            "sections": sorted(list(self._sections) + list(self._derived))
+        }
+
+    def request_refresh(self):
+        """
+        Ask the leader to collect again, e.g. after a service was started
+
+        Until the new snapshot is published, readers fall back to computing
+        values directly so they never see state older than the change.
+        """
+        if not self.enabled:
+            return
+        try:
+            self.run_dir.mkdir(parents=True, exist_ok=True)
+            self.refresh_path.touch()
+        except OSError as e:
+            logger.warning("Could not request collector refresh: %s", e)
+        self._wake.set()
+
+    def _load_snapshot(self):
+        """Return the parsed snapshot whatever its age, re-reading only on change"""
+        try:
+            mtime = self.snapshot_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+        if mtime != self._cache_mtime:
+            try:
+                with open(self.snapshot_path, 'rb') as f:
+                    self._cache = json.loads(f.read())
+                self._cache_mtime = mtime
+            except (OSError, ValueError):
+                return None
+        return self._cache
+
+    def _section_path(self, name):
+        return self.run_dir / f'section-{name}.json'
+
+    def _load_section(self, name):
+        """Return a separately published section, re-reading only on change"""
+        path = self._section_path(name)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+        cached = self._section_cache.get(name)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, 'rb') as f:
+                    cached = (mtime, json.loads(f.read()))
+            except (OSError, ValueError):
+                return None
+            self._section_cache[name] = cached
+        return cached[1]
+
+    def _read_snapshot(self):
+        """Return the parsed snapshot if it is fresh"""
+        snapshot = self._load_snapshot()
+        if snapshot is None:
+            return None
+        generated_at = snapshot.get('generated_at', 0)
+
+        # A dead leader stops refreshing the snapshot
+        if time.time() - generated_at > max(self.interval * 3, 15):
+            return None
+
+        # A refresh was requested after this snapshot was taken
+        try:
+            if self.refresh_path.stat().st_mtime > generated_at:
+                return None
+        except OSError:
+            pass
+
+        return snapshot
+
+    def _try_become_leader(self):
+        """Attempt to take the collector lock without blocking"""
+        try:
+            self.run_dir.mkdir(parents=True, exist_ok=True)
+            lock_file = open(self.lock_path, 'a+')
+        except OSError as e:
+            logger.warning("Collector lock unavailable: %s", e)
+            return False
+
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        self._is_leader = True
+        logger.info("Process %s is now the state collector leader", os.getpid())
+
+        for callback in self._leader_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Collector leader callback failed: %s", e)
+        return True
+
+    def _run(self):
+        """Election and collection loop"""
+        while True:
+            if not self._is_leader and not self._try_become_leader():
+                time.sleep(self.interval)
+                continue
+
+            started = time.time()
+            try:
+                self._publish(*self._collect())
+            except Exception as e:
+                logger.error("State collection failed: %s", e)
+
+            self._wait_for_next_cycle(started)
+
+    def _collect(self):
+        """
+        Run every registered section
+
+        Returns:
+            tuple: (time the collection started, sections). The snapshot is
+                stamped with the start, so a refresh requested while it ran
+                still marks it as out of date.
+        """
+        collected_at = time.time()
+        sections = {}
+        for name, collect_fn in self._sections.items():
+            try:
+                sections[name] = collect_fn()
+            except Exception as e:
+                logger.error("Error collecting '%s': %s", name, e)
+        for name, derive_fn in self._derived.items():
+            try:
+                sections[name] = derive_fn(sections)
+            except Exception as e:
+                logger.error("Error deriving '%s': %s", name, e)
+        return collected_at, sections
+
+    def _publish(self, collected_at, sections):
+        """Atomically replace the shared snapshot file"""
+        sections = dict(sections)
+        # Separate sections are written first, so a fresh snapshot never points at older ones
+        for name in self._separate:
+            if name in sections:
+                self._write_file(self._section_path(name), sections.pop(name))
+        self._write_file(self.snapshot_path, {
+            "generated_at": collected_at,
+            "pid": os.getpid(),
+            "sections": sections
+        })
+
+    def _write_file(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.run_dir, prefix='.snapshot-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encode_json(data))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _wait_for_next_cycle(self, started):
+        """Sleep until the interval elapses or a refresh is requested"""
+        deadline = started + self.interval
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            if self._wake.wait(min(remaining, 0.5)):
+                self._wake.clear()
+                return
+            try:
+                if self.refresh_path.stat().st_mtime > started:
+                    return
+            except OSError:
+                pass
@@ -4,14 +4,142 @@ Handles docker-compose operations for service lifecycle
 """
 
 import os
+import copy
+import json
+import time
+import hashlib
+import base64
+import binascii
 import subprocess
 import logging
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-import docker
-from api.services import ServiceManager
+from api.services import ServiceManager, get_containers_root
+from api.cache import SingleFlightCache
+from api.limits import OVERRIDE_FILE, normalize_limits, compose_limits, docker_update_kwargs
+from api.logpolicy import DEFAULT_LOG_POLICY, normalize_log_policy, compose_logging, max_log_bytes
+from api.journal import operation_journal
+from api.hosts import host_registry
+from api.runner import command_runner, CommandCancelled
 
 logger = logging.getLogger(__name__)
 
+# Default upper bound for a single logs response
+LOG_MAX_BYTES = 256 * 1024
+
+# Per-service record of the last successful install
+DEPLOY_STATE_FILE = '.openhomestack-state.json'
+
+# Seconds a container gets to shut down before it is killed (compose default)
+STOP_TIMEOUT = 10
+
+# docker ps columns parsed by _parse_ps_output
+PS_FORMAT = '{{.Names}}\t{{.Status}}\t{{.Image}}\t{{.ID}}\t{{.Label "openhomestack.service"}}'
+
+# Files in a service directory that define its deployment
+DEPLOY_FILES = ('docker-compose.yml', OVERRIDE_FILE)
+
+# Small image used for one-off jobs on the Docker host (log file sizes, rotation)
+HELPER_IMAGE = os.environ.get('OPENHOMESTACK_HELPER_IMAGE', 'alpine:3.19')
+
+# Archives kept per container by rotate_logs(archive=True)
+LOG_ARCHIVES_KEPT = 3
+
+# Resource cache key of get_all_resource_usage() (never a valid service ID)
+ALL_SERVICES = '*'
+
+# Sizes of a container's log files: json-file logs and their rotations, or the
+# local driver's files. Arguments: container IDs
+_LOG_SIZES_SCRIPT = """
+for id in "$@"; do
+  for f in /containers/$id/$id-json.log* /containers/$id/local-logs/*; do
+    [ -f "$f" ] && echo "$id $(stat -c %s "$f") $f"
+  done
+done
+"""
+
+# Copy (optionally) and truncate the active json-file log. Docker writes with
+# O_APPEND, so truncating in place is safe while the container runs.
+# Arguments: archive flag, number of archives kept, then container ID / name pairs
+_LOG_ROTATE_SCRIPT = """
+archive=$1; keep=$2; shift 2
+stamp=$(date +%Y%m%d%H%M%S)
+while [ $# -gt 1 ]; do
+  id=$1; name=$2; shift 2
+  log=/containers/$id/$id-json.log
+  [ -f "$log" ] || continue
+  if [ "$archive" = 1 ]; then
+    mkdir -p /archive
+    gzip -c "$log" > "/archive/$name-$stamp.log.gz"
+    ls -1t /archive/$name-*.log.gz | tail -n +$((keep + 1)) | xargs -r rm -f
+  fi
+  before=$(stat -c %s "$log")
+  truncate -s 0 "$log"
+  echo "$id $before"
+done
+"""
+
+
+def encode_log_cursor(positions):
+    """
+    Encode per-container log positions into an opaque cursor
+
+    Args:
+        positions: Dict of container name -> position from _read_container_logs()
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    raw = json.dumps(positions, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_log_cursor(cursor):
+    """
+    Decode a cursor produced by encode_log_cursor
+
+    Args:
+        cursor: Cursor string
+
+    Returns:
+        dict: Container name -> position ([timestamp, line digests]; a bare
+            timestamp in cursors from before digests were added)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        positions = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid log cursor")
+
+    def valid(position):
+        if isinstance(position, str):
+            return True
+        return (isinstance(position, list) and len(position) == 2 and isinstance(position[0], str)
+                and isinstance(position[1], list) and all(isinstance(d, str) for d in position[1]))
+
+    if not isinstance(positions, dict) or not all(
+            isinstance(k, str) and valid(v) for k, v in positions.items()):
+        raise ValueError("Invalid log cursor")
+    return positions
+
+
+def log_line_digest(line):
+    """Short digest identifying a log line among those sharing its timestamp"""
+    return hashlib.blake2b(line.encode('utf-8', 'replace'), digest_size=6).hexdigest()
+
+
+def line_timestamp(line):
+    """Return the leading docker --timestamps value of a log line, if any"""
+    ts = line.split(' ', 1)[0]
+    if len(ts) >= 20 and ts[4] == '-' and ts[10] == 'T':
+        return ts.rstrip()
+    return None
+
 
 class ContainerManager:
     """Manages container lifecycle using docker-compose and docker SDK"""
@@ -19,32 +147,59 @@ class ContainerManager:
     def __init__(self):
         """Initialize container manager"""
         self.service_manager = ServiceManager()
-        self._docker_client = None
+        self.hosts = host_registry
+        self._status_cache = SingleFlightCache('status')
+        self._resource_cache = SingleFlightCache('resources', ttl=5, stale_ttl=10)
 
     @property
     def docker_client(self):
-        """Lazy initialization of Docker client"""
-        if self._docker_client is None:
-            try:
-                self._docker_client = docker.from_env()
-                logger.info("Docker client initialized")
-            except Exception as e:
-                logger.error(f"Failed to initialize Docker client: {e}")
-                self._docker_client = None
-        return self._docker_client
-
-    def install(self, service_id, env_vars=None):
+        """Docker client of the default host (lazily initialized)"""
+        return self.hosts.default.client()
+
+    def host_for(self, service_id):
+        """
+        Docker host a service is pinned to
+
+        Args:
+            service_id: Service identifier
+
+        Returns:
+            DockerHost: The host running the service's containers
+        """
+        label = None
+        for service in self.service_manager.discover_services():
+            if service['id'] == service_id:
+                label = service.get('host')
+                break
+        return self.hosts.host_for(service_id, label)
+
+    def client_for(self, service_id):
+        """Docker SDK client for the host a service is pinned to (None if unavailable)"""
+        return self.host_for(service_id).client()
+
+    def install(self, service_id, env_vars=None, force=False, limits=None, log_policy=None):
         """
         Install a service with optional environment variables
 
+        If the compose file, rendered .env and config templates hash to the
+        same value as the last successful install and the containers created
+        then are still running, nothing is redone.
+
         Args:
             service_id: Service identifier
             env_vars: Dict of environment variables for the service
+            force: Reconcile even if nothing changed
+            limits: Resource budget (cpus, memory, io_weight) overriding the
+                openhomestack.limits.* labels; None keeps the previous setting
+            log_policy: Log rotation (driver, max_size, max_file, compress)
+                overriding the openhomestack.logging.* labels and defaults;
+                None keeps the previous setting
 
         Returns:
             dict: Result with success status and message
         """
         env_vars = env_vars or {}
+        started_at = time.time()
 
         try:
             service_dir = self.service_manager.get_service_dir(service_id)
@@ -56,6 +211,25 @@ class ContainerManager:
                     "error": f"Service '{service_id}' not found"
                 }
 
+            state = self._load_deploy_state(service_dir)
+            configured_limits = state.get('limits', {}) if limits is None else normalize_limits(limits)
+            configured_log_policy = (
+                state.get('log_policy', {}) if log_policy is None else normalize_log_policy(log_policy)
+            )
+            self._write_override_file(service_id, service_dir, configured_limits, configured_log_policy)
+
+            env_content = self._render_env(env_vars) if env_vars else None
+            config_hash = self._compute_config_hash(service_dir, env_content)
+
+            if not force and self._is_up_to_date(service_id, service_dir, config_hash):
+                logger.info("Service %s is up to date, skipping reconcile", service_id)
+                return {
+                    "success": True,
+                    "message": f"Service '{service_id}' is already up to date",
+                    "service_id": service_id,
+                    "unchanged": True
+                }
+
             # Create container data directories
             self._create_data_directories(service_id)
 
@@ -67,10 +241,21 @@ class ContainerManager:
             result = self._run_compose_command(
                 service_dir,
                 ['up', '-d'],
-                f"Installing {service_id}"
+                f"Installing {service_id}",
+                journal=False
             )
 
+            self._status_cache.invalidate(service_id)
+            self._journal(service_id, 'install', started_at, result)
+
             if result['success']:
+                self._save_deploy_state(service_dir, {
+                    "config_hash": config_hash,
+                    "container_ids": self._container_ids(service_id),
+                    "deployed_at": time.time(),
+                    "limits": configured_limits,
+                    "log_policy": configured_log_policy
+                })
                 return {
                     "success": True,
                     "message": f"Service '{service_id}' installed successfully",
@@ -80,81 +265,684 @@ class ContainerManager:
                 return result
 
         except Exception as e:
-            logger.error(f"Error installing service {service_id}: {e}")
+            logger.error("Error installing service %s: %s", service_id, e)
+            self._journal(service_id, 'install', started_at, {"error": str(e)})
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    def start(self, service_id):
-        """Start a stopped service"""
+    def _journal(self, service_id, action, started_at, result):
+        """Record the outcome of an operation in the operation journal"""
+        operation_journal.record(
+            service_id, action, started_at,
+            exit_code=0 if result.get('success') else result.get('returncode', 1),
+            output=result.get('error') or result.get('output'),
+            timed_out=result.get('timed_out', False)
+        )
+
+    def _effective_limits(self, service_id, configured_limits):
+        """Label defaults from the compose file overlaid with configured limits"""
+        service = self.service_manager.get_service(service_id) or {}
         try:
-            service_dir = self.service_manager.get_service_dir(service_id)
+            effective = normalize_limits(service.get('limits', {}))
+        except ValueError as e:
+            logger.warning("Ignoring invalid limit labels on %s: %s", service_id, e)
+            effective = {}
+        effective.update(configured_limits)
+        return effective
+
+    def _effective_log_policy(self, service_id, configured_policy):
+        """Defaults overlaid with the compose file labels and the configured policy"""
+        service = self.service_manager.get_service(service_id) or {}
+        effective = dict(DEFAULT_LOG_POLICY)
+        try:
+            effective.update(normalize_log_policy(service.get('logging', {})))
+        except ValueError as e:
+            logger.warning("Ignoring invalid logging labels on %s: %s", service_id, e)
+        effective.update(configured_policy)
+        return effective
 
-            result = self._run_compose_command(
-                service_dir,
-                ['start'],
-                f"Starting {service_id}"
+    def _write_override_file(self, service_id, service_dir, configured_limits, configured_log_policy=None):
+        """
+        Render the generated compose override for a service
+
+        The override applies the service budget and log policy to every
+        compose service of the stack.
+
+        Args:
+            service_id: Service identifier
+            service_dir: Path to service directory
+            configured_limits: Normalized limits set at install time or via the API
+            configured_log_policy: Normalized log policy set at install time or via the API
+        """
+        import yaml
+
+        limits = self._effective_limits(service_id, configured_limits)
+        log_policy = self._effective_log_policy(service_id, configured_log_policy or {})
+        override_path = service_dir / OVERRIDE_FILE
+
+        service_config = compose_limits(limits)
+        service_config['logging'] = compose_logging(log_policy)
+
+        compose_services = [
+            name for layer in self.service_manager.get_dependency_layers(service_id) for name in layer
+        ]
+        override = {
+            # Separate copies, so YAML does not emit anchors for shared dicts
+            'services': {name: copy.deepcopy(service_config) for name in compose_services}
+        }
+
+        content = "# Generated by openHomeStack - do not edit, changes are overwritten\n"
+        content += yaml.safe_dump(override, sort_keys=False)
+        if not override_path.exists() or override_path.read_text() != content:
+            override_path.write_text(content)
+            logger.info("Wrote %s for %s", OVERRIDE_FILE, service_id)
+
+    def update_limits(self, service_id, limits):
+        """
+        Change a service's resource budget without recreating its containers
+
+        The new budget is written to the override file (so it survives a
+        recreate) and applied to the running containers through the Docker
+        update API. Keys set to null are removed from the budget; removing a
+        limit from running containers requires a recreate.
+
+        Args:
+            service_id: Service identifier
+            limits: Dict with any of cpus, memory, io_weight
+
+        Returns:
+            dict: Result with the effective limits and per-container outcome
+
+        Raises:
+            ValueError: If the service is unknown or a limit is invalid
+        """
+        service_dir = self.service_manager.get_service_dir(service_id)
+        if not self.service_manager.get_compose_file_path(service_id):
+            raise ValueError(f"Service '{service_id}' not found")
+
+        state = self._load_deploy_state(service_dir)
+        configured = dict(state.get('limits', {}))
+        removed = [key for key, value in limits.items() if value in (None, '') and key in configured]
+        for key in removed:
+            configured.pop(key)
+        configured.update(normalize_limits(limits))
+
+        self._write_override_file(service_id, service_dir, configured, state.get('log_policy', {}))
+        state_update = {"limits": configured}
+        # Limits are applied live, so a later install should still be a no-op
+        if state.get('config_hash'):
+            state_update["config_hash"] = self._compute_config_hash(service_dir)
+        self._save_deploy_state(service_dir, state_update)
+
+        effective = self._effective_limits(service_id, configured)
+        update_kwargs = docker_update_kwargs(effective)
+        applied, errors = [], []
+
+        client = self.client_for(service_id)
+        if client is not None and update_kwargs:
+            containers = client.containers.list(
+                filters={'label': f'openhomestack.service={service_id}'}
             )
+            for container in containers:
+                try:
+                    container.update(**update_kwargs)
+                    applied.append(container.name)
+                except Exception as e:
+                    errors.append(f"{container.name}: {e}")
+
+        self._resource_cache.invalidate(service_id)
+        self._resource_cache.invalidate(ALL_SERVICES)
+        return {
+            "success": not errors,
+            "service_id": service_id,
+            "limits": effective,
+            "applied_to": applied,
+            "errors": errors,
+            "recreate_required": bool(removed)
+        }
+
+    def update_log_policy(self, service_id, policy, apply=False):
+        """
+        Change a service's log rotation policy
 
-            if result['success']:
-                return {
-                    "success": True,
-                    "message": f"Service '{service_id}' started successfully",
-                    "service_id": service_id
+        Docker fixes the log configuration when a container is created, so the
+        new policy is written to the override file and only takes effect when
+        the containers are recreated: right away with `apply`, otherwise at
+        the next install.
+
+        Args:
+            service_id: Service identifier
+            policy: Dict with any of driver, max_size, max_file, compress;
+                keys set to null fall back to the labels and defaults
+            apply: Recreate the service's containers now
+
+        Returns:
+            dict: Result with the effective policy
+
+        Raises:
+            ValueError: If the service is unknown or a setting is invalid
+        """
+        service_dir = self.service_manager.get_service_dir(service_id)
+        if not self.service_manager.get_compose_file_path(service_id):
+            raise ValueError(f"Service '{service_id}' not found")
+
+        state = self._load_deploy_state(service_dir)
+        configured = dict(state.get('log_policy', {}))
+        for key in [key for key, value in policy.items() if value in (None, '')]:
+            configured.pop(key, None)
+        configured.update(normalize_log_policy(policy))
+
+        self._write_override_file(service_id, service_dir, state.get('limits', {}), configured)
+        self._save_deploy_state(service_dir, {"log_policy": configured})
+        effective = self._effective_log_policy(service_id, configured)
+
+        result = {
+            "success": True,
+            "service_id": service_id,
+            "log_policy": effective,
+            "max_bytes_per_container": max_log_bytes(effective),
+            "recreate_required": not apply
+        }
+        if apply:
+            running = self.get_status(service_id, fresh=True).get('state') == 'running'
+            recreated = self.recreate(service_id, start=running)
+            if not recreated['success']:
+                return {**result, "success": False, "error": recreated.get('error'), "recreate_required": True}
+            # The recreated containers match the new override, keep installs a no-op
+            self._save_deploy_state(service_dir, {"config_hash": self._compute_config_hash(service_dir)})
+        return result
+
+    def _service_containers(self, service_id):
+        """Docker client and all containers of a service (running or not)"""
+        client = self.client_for(service_id)
+        if client is None:
+            raise ConnectionError("Docker client not available")
+        return client, client.containers.list(all=True, filters={'label': f'openhomestack.service={service_id}'})
+
+    def _run_helper(self, client, script, args, volumes):
+        """Run a shell script in a throwaway helper container on the service's host"""
+        output = client.containers.run(
+            HELPER_IMAGE, ['sh', '-c', script, 'helper'] + [str(arg) for arg in args],
+            volumes=volumes, remove=True, network_mode='none'
+        )
+        return output.decode('utf-8', errors='replace')
+
+    def get_log_usage(self, service_id):
+        """
+        Log configuration and on-disk log size of each container of a service
+
+        Log files live under the Docker data root, which the API usually
+        cannot read, so their sizes are read by a helper container.
+
+        Returns:
+            dict: Per-container driver, options, size and files
+
+        Raises:
+            ConnectionError: If the Docker host is unavailable
+        """
+        client, containers = self._service_containers(service_id)
+        if not containers:
+            return {"containers": [], "total_bytes": 0}
+
+        docker_root = client.info().get('DockerRootDir', '/var/lib/docker')
+        output = self._run_helper(
+            client, _LOG_SIZES_SCRIPT, [c.id for c in containers],
+            {f"{docker_root}/containers": {'bind': '/containers', 'mode': 'ro'}}
+        )
+        files = {}
+        for line in output.splitlines():
+            parts = line.split(' ', 2)
+            if len(parts) == 3 and parts[1].isdigit():
+                files.setdefault(parts[0], []).append({"path": parts[2], "size_bytes": int(parts[1])})
+
+        usage = []
+        for container in containers:
+            log_config = container.attrs.get('HostConfig', {}).get('LogConfig', {})
+            container_files = files.get(container.id, [])
+            usage.append({
+                "container": container.name,
+                "driver": log_config.get('Type'),
+                "options": log_config.get('Config') or {},
+                "size_bytes": sum(f['size_bytes'] for f in container_files),
+                "files": container_files
+            })
+
+        service_dir = self.service_manager.get_service_dir(service_id)
+        policy = self._effective_log_policy(service_id, self._load_deploy_state(service_dir).get('log_policy', {}))
+        return {
+            "containers": usage,
+            "total_bytes": sum(c['size_bytes'] for c in usage),
+            "log_policy": policy,
+            # Containers created before the policy was set still have unbounded logs
+            "unbounded": [c['container'] for c in usage if not c['options'].get('max-size')]
+        }
+
+    def rotate_logs(self, service_id, archive=True):
+        """
+        Empty the active log file of each container of a service
+
+        With `archive`, the current log is first saved gzipped to
+        /home/containers/.openhomestack/log-archive/<service>/ (the last
+        LOG_ARCHIVES_KEPT per container are kept). Only the json-file driver
+        can be rotated this way; the local driver's format must not be
+        truncated, it rotates itself by size.
+
+        Args:
+            service_id: Service identifier
+            archive: Keep a compressed copy of the discarded log
+
+        Returns:
+            dict: Bytes freed per container and containers that were skipped
+
+        Raises:
+            ConnectionError: If the Docker host is unavailable
+        """
+        client, containers = self._service_containers(service_id)
+        rotatable, skipped = [], []
+        for container in containers:
+            driver = container.attrs.get('HostConfig', {}).get('LogConfig', {}).get('Type')
+            (rotatable if driver == 'json-file' else skipped).append(container)
+
+        freed = {}
+        if rotatable:
+            docker_root = client.info().get('DockerRootDir', '/var/lib/docker')
+            archive_dir = get_containers_root() / '.openhomestack' / 'log-archive' / service_id
+            volumes = {f"{docker_root}/containers": {'bind': '/containers', 'mode': 'rw'}}
+            if archive:
+                volumes[str(archive_dir)] = {'bind': '/archive', 'mode': 'rw'}
+            args = ['1' if archive else '0', LOG_ARCHIVES_KEPT]
+            for container in rotatable:
+                args += [container.id, container.name]
+
+            output = self._run_helper(client, _LOG_ROTATE_SCRIPT, args, volumes)
+            names = {container.id: container.name for container in rotatable}
+            for line in output.splitlines():
+                parts = line.split()
+                if len(parts) == 2 and parts[0] in names and parts[1].isdigit():
+                    freed[names[parts[0]]] = int(parts[1])
+
+        logger.info("Rotated logs of %s (%s bytes)", service_id, sum(freed.values()))
+        return {
+            "success": True,
+            "service_id": service_id,
+            "archived": archive,
+            "freed_bytes": freed,
+            "skipped": [
+                {"container": c.name, "reason": "Only json-file logs can be rotated on demand"} for c in skipped
+            ]
+        }
+
+    def get_resource_usage(self, service_id):
+        """
+        Current CPU and memory usage of a service's containers against their budget
+
+        Returns:
+            dict: Per-container usage and limits, plus the configured budget
+        """
+        return self._resource_cache.get(service_id, lambda: self._query_resource_usage(service_id))
+
+    def _query_resource_usage(self, service_id):
+        client = self.client_for(service_id)
+        if client is None:
+            return {"containers": [], "error": "Docker client not available"}
+
+        containers = client.containers.list(filters={'label': f'openhomestack.service={service_id}'})
+        if not containers:
+            return {"containers": []}
+
+        # docker stats takes a second per container to sample CPU, so run them in parallel
+        with ThreadPoolExecutor(max_workers=len(containers)) as executor:
+            usage = list(executor.map(self._container_usage, containers))
+
+        service_dir = self.service_manager.get_service_dir(service_id)
+        configured = self._load_deploy_state(service_dir).get('limits', {})
+        return {
+            "containers": usage,
+            "limits": self._effective_limits(service_id, configured)
+        }
+
+    def get_all_resource_usage(self):
+        """
+        Usage of every running service, sampled once per host
+
+        Collected by the leader for the dashboard: containers of all services
+        on a host are sampled in parallel, so the whole page costs one round
+        of docker stats instead of one request per service. Services on a
+        host that failed are left out.
+
+        Returns:
+            dict: service_id -> same shape as get_resource_usage()
+        """
+        return self._resource_cache.get(ALL_SERVICES, self._query_all_resource_usage)
+
+    def _query_all_resource_usage(self):
+        def query(host):
+            client = host.client()
+            if client is None:
+                raise RuntimeError("Docker client not available")
+            containers = client.containers.list(filters={'label': 'openhomestack.service'})
+            if not containers:
+                return {}
+            with ThreadPoolExecutor(max_workers=len(containers)) as executor:
+                usage = list(executor.map(self._container_usage, containers))
+            by_service = {}
+            for container, container_usage in zip(containers, usage):
+                service_id = container.labels.get('openhomestack.service')
+                by_service.setdefault(service_id, []).append(container_usage)
+            return by_service
+
+        # Sampling CPU takes about a second, give it more than a status query
+        answers = self.hosts.fan_out('resources', query, timeout=self.hosts.timeout * 2)
+
+        usage = {}
+        for host_name, answer in answers.items():
+            if not answer['ok']:
+                logger.warning("Resource usage of host %s unavailable: %s", host_name, answer['error'])
+                continue
+            for service_id, containers in answer['result'].items():
+                service_dir = self.service_manager.get_service_dir(service_id)
+                configured = self._load_deploy_state(service_dir).get('limits', {})
+                usage[service_id] = {
+                    "containers": containers,
+                    "limits": self._effective_limits(service_id, configured)
                 }
-            return result
+        return usage
+
+    def _container_usage(self, container):
+        """Usage and enforced limits of one container"""
+        try:
+            stats = container.stats(stream=False)
+            host_config = container.attrs.get('HostConfig', {})
+
+            cpu = stats.get('cpu_stats', {})
+            precpu = stats.get('precpu_stats', {})
+            cpu_delta = cpu.get('cpu_usage', {}).get('total_usage', 0) - \
+                precpu.get('cpu_usage', {}).get('total_usage', 0)
+            system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+            online_cpus = cpu.get('online_cpus') or 1
+            cpu_percent = (cpu_delta / system_delta) * online_cpus * 100 if system_delta > 0 else 0.0
+
+            memory = stats.get('memory_stats', {})
+            # Page cache is reclaimable; subtract it like `docker stats` does
+            cache = memory.get('stats', {}).get('inactive_file', memory.get('stats', {}).get('cache', 0))
+            memory_used = max(memory.get('usage', 0) - cache, 0)
+
+            cpu_limit = None
+            if host_config.get('NanoCpus'):
+                cpu_limit = host_config['NanoCpus'] / 1e9
+            elif host_config.get('CpuQuota', 0) > 0 and host_config.get('CpuPeriod'):
+                cpu_limit = host_config['CpuQuota'] / host_config['CpuPeriod']
+            memory_limit = host_config.get('Memory') or None
 
+            return {
+                "name": container.name,
+                "cpu_percent": round(cpu_percent, 2),
+                "cpu_limit": cpu_limit,
+                "cpu_percent_of_budget": round(cpu_percent / cpu_limit, 2) if cpu_limit else None,
+                "memory_bytes": memory_used,
+                "memory_limit_bytes": memory_limit,
+                "memory_percent_of_budget": round(memory_used / memory_limit * 100, 2) if memory_limit else None,
+                "io_weight": host_config.get('BlkioWeight') or None
+            }
         except Exception as e:
-            logger.error(f"Error starting service {service_id}: {e}")
-            return {"success": False, "error": str(e)}
+            logger.error("Error getting usage for %s: %s", container.name, e)
+            return {"name": container.name, "error": str(e)}
 
-    def stop(self, service_id):
-        """Stop a running service"""
+    def _compute_config_hash(self, service_dir, env_content=None):
+        """
+        Hash everything that determines a deployment of a service
+
+        Covers the compose file, the .env that will be used (the newly
+        rendered one, or the existing file) and the config templates.
+
+        Args:
+            service_dir: Path to service directory
+            env_content: Rendered .env content, or None to use the existing file
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha256()
+
+        def add(name, data):
+            digest.update(name.encode('utf-8') + b'\0')
+            digest.update(hashlib.sha256(data).digest())
+
+        for name in DEPLOY_FILES:
+            path = service_dir / name
+            if path.is_file():
+                add(name, path.read_bytes())
+
+        env_file = service_dir / '.env'
+        if env_content is not None:
+            add('.env', env_content.encode('utf-8'))
+        elif env_file.is_file():
+            add('.env', env_file.read_bytes())
+
+        config_dir = service_dir / 'config'
+        if config_dir.is_dir():
+            for path in sorted(p for p in config_dir.rglob('*') if p.is_file()):
+                add(str(path.relative_to(service_dir)), path.read_bytes())
+
+        return digest.hexdigest()
+
+    def _is_up_to_date(self, service_id, service_dir, config_hash):
+        """
+        Check whether the last deployment matches and is still running as created
+
+        Returns:
+            bool: True if a reconcile would be a no-op
+        """
+        state = self._load_deploy_state(service_dir)
+        if state.get('config_hash') != config_hash or not state.get('container_ids'):
+            return False
+
+        status = self._query_status(service_id)
+        containers = status.get('containers', [status])
+        if not containers or any(c.get('state') != 'running' for c in containers):
+            return False
+
+        # Containers recreated or removed outside openHomeStack get new IDs
+        return self._container_ids(service_id) == state['container_ids']
+
+    def _container_ids(self, service_id):
+        """Full IDs of all containers of a service, sorted"""
+        result = command_runner.run(
+            ['docker', 'ps', '-a', '--no-trunc', '--filter', f'label=openhomestack.service={service_id}',
+             '--format', '{{.ID}}'],
+            timeout=10,
+            service=service_id,
+            env=self.host_for(service_id).env()
+        )
+        if result.returncode != 0:
+            return []
+        return sorted(line.strip() for line in result.stdout.split('\n') if line.strip())
+
+    def _load_deploy_state(self, service_dir):
+        """Read the per-service deploy state file"""
+        state_file = service_dir / DEPLOY_STATE_FILE
         try:
-            service_dir = self.service_manager.get_service_dir(service_id)
+            with open(state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_deploy_state(self, service_dir, updates):
+        """Merge updates into the per-service deploy state file"""
+        state = self._load_deploy_state(service_dir)
+        state.update(updates)
+        try:
+            with open(service_dir / DEPLOY_STATE_FILE, 'w') as f:
+                json.dump(state, f, indent=2)
+        except OSError as e:
+            logger.warning("Could not write deploy state in %s: %s", service_dir, e)
 
-            result = self._run_compose_command(
-                service_dir,
-                ['stop'],
-                f"Stopping {service_id}"
-            )
+    def recreate(self, service_id, compose_services=None, start=True):
+        """
+        Recreate containers from their current images without touching the rest
 
-            if result['success']:
-                return {
-                    "success": True,
-                    "message": f"Service '{service_id}' stopped successfully",
-                    "service_id": service_id
-                }
-            return result
+        Used after new images have been pulled: compose replaces only the
+        containers whose image changed, so downtime is limited to the
+        stop/create/start of those containers.
 
-        except Exception as e:
-            logger.error(f"Error stopping service {service_id}: {e}")
-            return {"success": False, "error": str(e)}
+        Args:
+            service_id: Service identifier
+            compose_services: Compose service names to recreate (default: all)
+            start: Start the new containers; False leaves them created but stopped
+
+        Returns:
+            dict: Result with success status and output
+        """
+        service_dir = self.service_manager.get_service_dir(service_id)
+        args = ['up', '-d', '--no-deps'] if start else ['up', '--no-start', '--no-deps']
+        result = self._run_compose_command(
+            service_dir,
+            args + list(compose_services or []),
+            f"Recreating {service_id}"
+        )
+        self._status_cache.invalidate(service_id)
+
+        if result['success']:
+            # Keep the install fast path valid for the replacement containers
+            self._save_deploy_state(service_dir, {"container_ids": self._container_ids(service_id)})
+        return result
+
+    def start(self, service_id):
+        """Start a stopped service"""
+        return self._lifecycle(service_id, 'start', "started", "Starting")
+
+    def stop(self, service_id):
+        """Stop a running service"""
+        return self._lifecycle(service_id, 'stop', "stopped", "Stopping")
 
     def restart(self, service_id):
         """Restart a service"""
+        return self._lifecycle(service_id, 'restart', "restarted", "Restarting")
+
+    def _lifecycle(self, service_id, action, past_tense, description):
+        """
+        Run start/stop/restart against the Docker API, falling back to compose
+
+        Already created containers are driven directly through the Docker
+        API, which avoids booting docker-compose. Compose is only used when
+        the Docker SDK is unavailable or no containers exist yet.
+
+        Args:
+            service_id: Service identifier
+            action: 'start', 'stop' or 'restart'
+            past_tense: Verb for the success message
+            description: Verb for log messages
+
+        Returns:
+            dict: Result with success status and message
+        """
+        started_at = time.time()
         try:
-            service_dir = self.service_manager.get_service_dir(service_id)
+            result = self._run_direct_action(service_id, action)
+
+            if result is None:
+                service_dir = self.service_manager.get_service_dir(service_id)
+                result = self._run_compose_command(
+                    service_dir,
+                    [action],
+                    f"{description} {service_id}",
+                    journal=False
+                )
 
-            result = self._run_compose_command(
-                service_dir,
-                ['restart'],
-                f"Restarting {service_id}"
-            )
+            self._status_cache.invalidate(service_id)
+            self._journal(service_id, action, started_at, result)
 
             if result['success']:
                 return {
                     "success": True,
-                    "message": f"Service '{service_id}' restarted successfully",
+                    "message": f"Service '{service_id}' {past_tense} successfully",
                     "service_id": service_id
                 }
             return result
 
         except Exception as e:
-            logger.error(f"Error restarting service {service_id}: {e}")
+            logger.error("Error running %s for service %s: %s", action, service_id, e)
+            self._journal(service_id, action, started_at, {"error": str(e)})
             return {"success": False, "error": str(e)}
 
+    def _run_direct_action(self, service_id, action):
+        """
+        Apply a lifecycle action to a service's containers via the Docker API
+
+        Containers in the same dependency layer are handled in parallel.
+        Start walks the depends_on layers forward, stop walks them backwards
+        and restart does a full stop followed by a start.
+
+        Args:
+            service_id: Service identifier
+            action: 'start', 'stop' or 'restart'
+
+        Returns:
+            dict: Result, or None if the caller should fall back to compose
+        """
+        client = self.client_for(service_id)
+        if client is None:
+            return None
+
+        containers = client.containers.list(
+            all=True,
+            filters={'label': f'openhomestack.service={service_id}'}
+        )
+        if not containers:
+            return None
+
+        # Group containers by compose service and order them by depends_on
+        by_service = {}
+        for container in containers:
+            name = container.labels.get('com.docker.compose.service', container.name)
+            by_service.setdefault(name, []).append(container)
+
+        layers = []
+        for layer in self.service_manager.get_dependency_layers(service_id):
+            group = [c for name in layer for c in by_service.pop(name, [])]
+            if group:
+                layers.append(group)
+        # Containers not described by the compose file go last
+        leftovers = [c for group in by_service.values() for c in group]
+        if leftovers:
+            layers.append(leftovers)
+
+        if action in ('stop', 'restart'):
+            errors = self._apply_layers(reversed(layers), lambda c: c.stop(timeout=STOP_TIMEOUT))
+            if errors:
+                return {"success": False, "error": "; ".join(errors)}
+        if action in ('start', 'restart'):
+            errors = self._apply_layers(layers, lambda c: c.start())
+            if errors:
+                return {"success": False, "error": "; ".join(errors)}
+
+        logger.info("%s %s via Docker API (%s container(s))", action, service_id, len(containers))
+        return {"success": True}
+
+    def _apply_layers(self, layers, operation):
+        """
+        Run an operation over dependency layers, in parallel within each layer
+
+        Stops at the first layer with a failure so dependents are not touched.
+
+        Returns:
+            list: Error messages (empty on success)
+        """
+        for layer in layers:
+            errors = []
+            with ThreadPoolExecutor(max_workers=len(layer)) as executor:
+                futures = {executor.submit(operation, c): c for c in layer}
+                for future, container in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(f"{container.name}: {e}")
+            if errors:
+                return errors
+        return []
+
     def remove(self, service_id, remove_volumes=False):
         """
         Remove a service
@@ -178,13 +966,19 @@ class ContainerManager:
                 cmd,
                 f"Removing {service_id}"
             )
+            self._status_cache.invalidate(service_id)
 
             if result['success']:
                 # Also remove .env file if it exists
                 env_file = service_dir / '.env'
                 if env_file.exists():
                     env_file.unlink()
-                    logger.info(f"Removed .env file for {service_id}")
+                    logger.info("Removed .env file for %s", service_id)
+
+                for generated in (DEPLOY_STATE_FILE, OVERRIDE_FILE):
+                    generated_file = service_dir / generated
+                    if generated_file.exists():
+                        generated_file.unlink()
 
                 return {
                     "success": True,
@@ -195,154 +989,381 @@ class ContainerManager:
             return result
 
         except Exception as e:
-            logger.error(f"Error removing service {service_id}: {e}")
+            logger.error("Error removing service %s: %s", service_id, e)
             return {"success": False, "error": str(e)}
 
-    def get_status(self, service_id):
+    def get_status(self, service_id, fresh=False):
         """
         Get current status of service containers
+
+        Concurrent calls for the same service share one docker query and the
+        result is cached briefly (see api/cache.py).
+
+        Args:
+            service_id: Service identifier
+            fresh: Drop the cached status first (e.g. when polling for readiness)
+
+        Returns:
+            dict: Container status information
+        """
+        if fresh:
+            self._status_cache.invalidate(service_id)
+        return self._status_cache.get(service_id, lambda: self._query_status(service_id))
+
+    def _query_status(self, service_id):
+        """
+        Query current status of service containers
         Uses docker CLI with label filtering to find containers belonging to a service
 
         Returns:
             dict: Container status information
         """
         try:
+            host = self.host_for(service_id)
             # Use label filter to find containers belonging to this service
             # This handles services where container_name differs from service_id
-            result = subprocess.run(
+            result = command_runner.run(
                 ['docker', 'ps', '-a', '--filter', f'label=openhomestack.service={service_id}',
-                 '--format', '{{.Names}}\t{{.Status}}\t{{.Image}}\t{{.ID}}'],
-                capture_output=True,
-                text=True,
-                timeout=10
+                 '--format', PS_FORMAT],
+                timeout=10,
+                service=service_id,
+                env=host.env()
             )
 
             if result.returncode != 0:
                 return {"state": "unknown", "error": "Docker command failed"}
 
-            output = result.stdout.strip()
-            if not output:
-                return {"state": "not_installed"}
+            containers = self._parse_ps_output(result.stdout).get(service_id, [])
+            return self._summarize_containers(containers, host)
 
-            # Parse the output - may have multiple containers for multi-container services
-            containers = []
-            for line in output.split('\n'):
-                if not line.strip():
-                    continue
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    name = parts[0]
-                    status = parts[1]
-                    image = parts[2] if len(parts) > 2 else "unknown"
-                    container_id = parts[3] if len(parts) > 3 else "unknown"
-
-                    # Determine state from status string
-                    status_lower = status.lower()
-                    if 'up' in status_lower:
-                        state = 'running'
-                    elif 'exited' in status_lower:
-                        state = 'exited'
-                    elif 'paused' in status_lower:
-                        state = 'paused'
-                    elif 'restarting' in status_lower:
-                        state = 'restarting'
-                    elif 'created' in status_lower:
-                        state = 'created'
-                    else:
-                        state = 'unknown'
+        except Exception as e:
+            logger.error("Error getting status for %s: %s", service_id, e)
+            return {"state": "error", "error": str(e)}
 
-                    containers.append({
-                        "state": state,
-                        "id": container_id[:12] if len(container_id) >= 12 else container_id,
-                        "name": name,
-                        "image": image,
-                        "status_text": status
-                    })
+    def get_all_statuses(self, service_ids):
+        """
+        Status of many services with one docker query per host
 
-            if not containers:
-                return {"state": "not_installed"}
-
-            # For single container services, return simple status
-            if len(containers) == 1:
-                return containers[0]
-
-            # For multi-container services, determine overall state
-            # Running if any container is running, otherwise use first container's state
-            states = [c['state'] for c in containers]
-            if 'running' in states:
-                overall_state = 'running'
-            elif 'restarting' in states:
-                overall_state = 'restarting'
-            elif all(s == 'exited' for s in states):
-                overall_state = 'exited'
-            else:
-                overall_state = containers[0]['state']
+        Hosts are queried concurrently with a per-host timeout, so the call
+        takes as long as the slowest responsive host. Services on a host that
+        failed or timed out are reported as unknown with the host's error.
 
-            return {
-                "state": overall_state,
-                "containers": containers,
-                "container_count": len(containers)
-            }
+        Args:
+            service_ids: Service identifiers
 
-        except Exception as e:
-            logger.error(f"Error getting status for {service_id}: {e}")
-            return {"state": "error", "error": str(e)}
+        Returns:
+            dict: service_id -> container status information
+        """
+        by_host = {}
+        for service_id in service_ids:
+            by_host.setdefault(self.host_for(service_id).name, []).append(service_id)
+
+        def query(host):
+            result = command_runner.run(
+                ['docker', 'ps', '-a', '--filter', 'label=openhomestack.service', '--format', PS_FORMAT],
+                timeout=10,
+                env=host.env()
+            )
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or "Docker command failed")
+            return self._parse_ps_output(result.stdout)
+
+        hosts = [self.hosts.get(name) for name in by_host]
+        answers = self.hosts.fan_out('status', query, hosts=hosts)
+
+        statuses = {}
+        for host in hosts:
+            answer = answers[host.name]
+            for service_id in by_host[host.name]:
+                if answer['ok']:
+                    status = self._summarize_containers(answer['result'].get(service_id, []), host)
+                else:
+                    status = {"state": "unknown", "host": host.name,
+                              "error": f"Host {host.name} unavailable: {answer['error']}"}
+                statuses[service_id] = status
+        return statuses
 
-    def get_logs(self, service_id, tail=100, follow=False):
+    def _parse_ps_output(self, output):
+        """
+        Parse `docker ps --format PS_FORMAT` output
+
+        Returns:
+            dict: service label -> list of container dicts
+        """
+        services = {}
+        for line in output.split('\n'):
+            if not line.strip():
+                continue
+            parts = line.split('\t')
+            if len(parts) >= 2:
+                name = parts[0]
+                status = parts[1]
+                image = parts[2] if len(parts) > 2 else "unknown"
+                container_id = parts[3] if len(parts) > 3 else "unknown"
+                service_label = parts[4] if len(parts) > 4 else name
+
+                # Determine state from status string
+                status_lower = status.lower()
+                if 'up' in status_lower:
+                    state = 'running'
+                elif 'exited' in status_lower:
+                    state = 'exited'
+                elif 'paused' in status_lower:
+                    state = 'paused'
+                elif 'restarting' in status_lower:
+                    state = 'restarting'
+                elif 'created' in status_lower:
+                    state = 'created'
+                else:
+                    state = 'unknown'
+
+                services.setdefault(service_label, []).append({
+                    "state": state,
+                    "id": container_id[:12] if len(container_id) >= 12 else container_id,
+                    "name": name,
+                    "image": image,
+                    "status_text": status
+                })
+        return services
+
+    def _summarize_containers(self, containers, host):
+        """Overall status of a service from its containers"""
+        if not containers:
+            return {"state": "not_installed"}
+
+        # For single container services, return simple status
+        if len(containers) == 1:
+            return dict(containers[0], host=host.name)
+
+        # For multi-container services, determine overall state
+        # Running if any container is running, otherwise use first container's state
+        states = [c['state'] for c in containers]
+        if 'running' in states:
+            overall_state = 'running'
+        elif 'restarting' in states:
+            overall_state = 'restarting'
+        elif all(s == 'exited' for s in states):
+            overall_state = 'exited'
+        else:
+            overall_state = containers[0]['state']
+
+        return {
+            "state": overall_state,
+            "containers": containers,
+            "container_count": len(containers),
+            "host": host.name
+        }
+
+    def get_logs(self, service_id, tail=100, follow=False, since=None, until=None, max_bytes=None):
         """
         Get container logs using docker CLI
 
         Args:
             service_id: Service identifier
-            tail: Number of lines to return
+            tail: Number of lines to return when no cursor is given
             follow: Stream logs (not implemented for HTTP response)
+            since: Opaque cursor from a previous call; only newer lines are returned
+            until: Only return lines before this timestamp (passed to docker logs)
+            max_bytes: Upper bound on the size of the returned log text
 
         Returns:
-            str: Container logs
-        """
-        try:
-            # First, find the container(s) by label
-            find_result = subprocess.run(
-                ['docker', 'ps', '-a', '--filter', f'label=openhomestack.service={service_id}',
-                 '--format', '{{.Names}}'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            dict: Log text, cursor for the next call and truncation flag
 
-            if find_result.returncode != 0:
-                return f"Error finding containers: {find_result.stderr}"
+        Raises:
+            ValueError: If the cursor cannot be decoded
+        """
+        positions = decode_log_cursor(since) if since else {}
+        max_bytes = max_bytes if max_bytes and max_bytes > 0 else LOG_MAX_BYTES
 
-            container_names = [n.strip() for n in find_result.stdout.strip().split('\n') if n.strip()]
+        try:
+            container_names = self.find_container_names(service_id)
+            host = self.host_for(service_id)
 
             if not container_names:
-                return f"No containers found for service '{service_id}'"
+                return {
+                    "logs": f"No containers found for service '{service_id}'",
+                    "cursor": since,
+                    "truncated": False
+                }
 
-            # Get logs from all containers (useful for multi-container services)
+            # Share the byte budget between containers of multi-container services
+            budget = max(max_bytes // len(container_names), 1)
+            new_positions = dict(positions)
+            truncated = False
             all_logs = []
+
             for container_name in container_names:
-                result = subprocess.run(
-                    ['docker', 'logs', container_name, '--tail', str(tail), '--timestamps'],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
+                lines, position, was_truncated = self._read_container_logs(
+                    container_name,
+                    tail=tail,
+                    since=positions.get(container_name),
+                    until=until,
+                    max_bytes=budget,
+                    host=host
                 )
+                truncated = truncated or was_truncated
+                if position:
+                    new_positions[container_name] = position
 
-                if result.returncode == 0:
-                    if len(container_names) > 1:
-                        all_logs.append(f"=== {container_name} ===\n{result.stdout}")
-                    else:
-                        all_logs.append(result.stdout)
+                # Incremental reads skip containers that have nothing new
+                if since and not lines:
+                    continue
+
+                # Lines keep their newline; sections are joined without doubling it
+                text = ''.join(lines).rstrip('\n')
+                if len(container_names) > 1:
+                    all_logs.append(f"=== {container_name} ===\n{text}")
                 else:
-                    all_logs.append(f"=== {container_name} ===\nError: {result.stderr}")
+                    all_logs.append(text)
 
-            return '\n'.join(all_logs)
+            return {
+                # Ends with a newline, so an incremental read can be appended as is
+                "logs": '\n'.join(all_logs) + '\n' if all_logs else '',
+                "cursor": encode_log_cursor(new_positions),
+                "truncated": truncated
+            }
 
         except Exception as e:
-            logger.error(f"Error getting logs for {service_id}: {e}")
-            return f"Error: {str(e)}"
+            logger.error("Error getting logs for %s: %s", service_id, e)
+            return {"logs": f"Error: {str(e)}", "cursor": since, "truncated": False}
+
+    def find_container_names(self, service_id):
+        """
+        Find names of all containers carrying the service label
+
+        Args:
+            service_id: Service identifier
+
+        Returns:
+            list: Container names
+
+        Raises:
+            RuntimeError: If the docker command fails
+        """
+        find_result = command_runner.run(
+            ['docker', 'ps', '-a', '--filter', f'label=openhomestack.service={service_id}',
+             '--format', '{{.Names}}'],
+            timeout=10,
+            service=service_id,
+            env=self.host_for(service_id).env()
+        )
+
+        if find_result.returncode != 0:
+            raise RuntimeError(f"Error finding containers: {find_result.stderr}")
+
+        return [n.strip() for n in find_result.stdout.strip().split('\n') if n.strip()]
+
+    def _read_container_logs(self, container_name, tail=100, since=None, until=None,
+                             max_bytes=LOG_MAX_BYTES, timeout=30, host=None):
+        """
+        Read timestamped log lines of one container
 
-    def _run_compose_command(self, service_dir, args, description="Docker compose"):
+        Without a cursor position the last `tail` lines are read and the oldest
+        are dropped to fit `max_bytes`. With a position, lines are streamed
+        forward from it and reading stops once `max_bytes` is reached, so the
+        next call continues where this one stopped.
+
+        Several lines can share a timestamp, and reading may stop between
+        them. A position is therefore the last timestamp plus the digests of
+        the lines already returned at it. The next read asks docker for lines
+        from that timestamp on (inclusive) and skips only those lines.
+
+        Args:
+            container_name: Container name
+            tail: Number of lines to read when no position is given
+            since: Position of the last lines already seen ([timestamp, digests],
+                or a bare timestamp)
+            until: Upper time bound passed to docker logs
+            max_bytes: Byte budget for the returned lines
+            timeout: Seconds before the docker process is killed
+            host: DockerHost running the container (default: local daemon)
+
+        Returns:
+            tuple: (lines, position for the next read or None, truncated)
+        """
+        lines = deque()
+        size = 0
+        last_ts = None
+        last_digests = []
+        truncated = False
+
+        if isinstance(since, str):
+            # Cursor without digests: everything at its timestamp was returned
+            since_ts, seen = since, None
+        elif since:
+            since_ts, seen = since[0], Counter(since[1])
+        else:
+            since_ts, seen = None, None
+
+        with self.log_stream(container_name, since=since_ts, until=until,
+                             tail=None if since_ts else tail, timeout=timeout, host=host) as stream:
+            for line in stream:
+                ts = line_timestamp(line)
+                digest = log_line_digest(line) if ts else None
+                # docker logs --since is inclusive, drop lines we already returned
+                if since_ts and ts and ts <= since_ts:
+                    if ts < since_ts or seen is None:
+                        continue
+                    if seen[digest] > 0:
+                        seen[digest] -= 1
+                        continue
+
+                line_size = len(line.encode('utf-8', 'replace'))
+                if since:
+                    if size + line_size > max_bytes and lines:
+                        truncated = True
+                        break
+                else:
+                    while lines and size + line_size > max_bytes:
+                        size -= len(lines.popleft().encode('utf-8', 'replace'))
+                        truncated = True
+
+                lines.append(line)
+                size += line_size
+                if ts:
+                    if ts != last_ts:
+                        last_ts, last_digests = ts, []
+                    last_digests.append(digest)
+
+        if last_ts is None:
+            return list(lines), None, truncated
+        if last_ts == since_ts and seen is not None:
+            # Still at the cursor's timestamp: keep the lines returned before
+            last_digests = list((Counter(since[1]) - seen).elements()) + last_digests
+        return list(lines), [last_ts, last_digests], truncated
+
+    @contextmanager
+    def log_stream(self, container_name, since=None, until=None, tail=None, timeout=30, host=None):
+        """
+        Stream timestamped log lines (stdout and stderr) of a container
+
+        The docker process is killed when the block exits or the timeout (or
+        request deadline) elapses, so callers can stop reading at any point.
+
+        Args:
+            container_name: Container name
+            since: Lower time bound passed to docker logs
+            until: Upper time bound passed to docker logs
+            tail: Only stream the last N lines
+            timeout: Seconds before the docker process is killed
+            host: DockerHost running the container (default: local daemon)
+
+        Yields:
+            iterator: Log lines including trailing newlines
+        """
+        cmd = ['docker', 'logs', container_name, '--timestamps']
+        if since:
+            cmd += ['--since', since]
+        if tail is not None:
+            cmd += ['--tail', str(tail)]
+        if until:
+            cmd += ['--until', until]
+
+        with command_runner.stream(cmd, timeout=timeout, label=f"logs {container_name}",
+                                   env=host.env() if host else None) as stream:
+            yield stream
+
+    def _run_compose_command(self, service_dir, args, description="Docker compose", journal=True):
         """
         Run a docker-compose command
 
@@ -350,30 +1371,42 @@ class ContainerManager:
             service_dir: Path to service directory
             args: List of command arguments
             description: Description for logging
+            journal: Record the command as `compose <command>`; False when the
+                caller records the whole operation (install, start, ...) itself
 
         Returns:
             dict: Result with success status and output
         """
+        started_at = time.time()
         try:
-            cmd = ['docker-compose'] + args
-            logger.info(f"{description}: {' '.join(cmd)} in {service_dir}")
+            cmd = ['docker-compose']
+            if (Path(service_dir) / OVERRIDE_FILE).exists():
+                cmd += ['-f', 'docker-compose.yml', '-f', OVERRIDE_FILE]
+            cmd += args
+            logger.info("%s: %s in %s", description, ' '.join(cmd), service_dir)
 
-            result = subprocess.run(
+            result = command_runner.run(
                 cmd,
+                timeout=120,
+                service=Path(service_dir).name,
+                label=description,
                 cwd=service_dir,
-                capture_output=True,
-                text=True,
-                timeout=120
+                env=self.host_for(Path(service_dir).name).env()
             )
+            if journal:
+                operation_journal.record(
+                    Path(service_dir).name, f"compose {args[0]}", started_at,
+                    exit_code=result.returncode, output=result.stderr or result.stdout
+                )
 
             if result.returncode == 0:
-                logger.info(f"{description} completed successfully")
+                logger.info("%s completed successfully", description)
                 return {
                     "success": True,
                     "output": result.stdout
                 }
             else:
-                logger.error(f"{description} failed: {result.stderr}")
+                logger.error("%s failed: %s", description, result.stderr)
                 return {
                     "success": False,
                     "error": result.stderr or result.stdout,
@@ -381,10 +1414,22 @@ class ContainerManager:
                 }
 
         except subprocess.TimeoutExpired:
-            logger.error(f"{description} timed out")
-            return {"success": False, "error": "Command timed out"}
+            logger.error("%s timed out", description)
+            if journal:
+                operation_journal.record(
+                    Path(service_dir).name, f"compose {args[0]}", started_at,
+                    output="Command timed out", timed_out=True
+                )
+            return {"success": False, "error": "Command timed out", "timed_out": True}
+        except CommandCancelled:
+            logger.warning("%s cancelled", description)
+            if journal:
+                operation_journal.record(
+                    Path(service_dir).name, f"compose {args[0]}", started_at, output="Cancelled"
+                )
+            return {"success": False, "error": "Cancelled", "cancelled": True}
         except Exception as e:
-            logger.error(f"{description} error: {e}")
+            logger.error("%s error: %s", description, e)
             return {"success": False, "error": str(e)}
 
     def _create_data_directories(self, service_id):
@@ -395,16 +1440,12 @@ class ContainerManager:
             service_id: Service identifier
         """
         import platform
-        import shutil
 
-        if platform.system() == 'Windows':
-            base_path = Path(f"C:\\containers\\{service_id}")
-        else:
-            base_path = Path(f"/home/containers/{service_id}")
+        base_path = self.service_manager.get_data_dir(service_id)
 
         try:
             base_path.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Created data directory: {base_path}")
+            logger.info("Created data directory: %s", base_path)
 
             # Get service directory for config templates
             service_dir = self.service_manager.get_service_dir(service_id)
@@ -418,7 +1459,7 @@ class ContainerManager:
             if service_id == 'plex':
                 for subdir in ['media/movies', 'media/tv', 'media/music', 'config', 'transcode']:
                     (base_path / subdir).mkdir(parents=True, exist_ok=True)
-                logger.info(f"Created Plex media directories")
+                logger.info("Created Plex media directories")
 
             elif service_id == 'dns':
                 (base_path / 'config').mkdir(parents=True, exist_ok=True)
@@ -441,18 +1482,20 @@ class ContainerManager:
             # Use docker to fix permissions since backend may run in container without host privileges
             if platform.system() != 'Windows':
                 try:
-                    subprocess.run(
+                    command_runner.run(
                         ['docker', 'run', '--rm', '-v', f'{base_path}:/data', 'alpine',
                          'chown', '-R', '1000:1000', '/data'],
-                        capture_output=True,
-                        timeout=30
+                        timeout=30,
+                        service=service_id,
+                        label="chown data directory",
+                        env=self.host_for(service_id).env()
                     )
-                    logger.info(f"Set ownership to 1000:1000 for {base_path}")
+                    logger.info("Set ownership to 1000:1000 for %s", base_path)
                 except Exception as e:
-                    logger.warning(f"Could not set ownership for {base_path}: {e}")
+                    logger.warning("Could not set ownership for %s: %s", base_path, e)
 
         except Exception as e:
-            logger.error(f"Error creating data directories for {service_id}: {e}")
+            logger.error("Error creating data directories for %s: %s", service_id, e)
             raise
 
     def _deploy_config_files(self, service_id, config_template_dir, base_path):
@@ -486,12 +1529,25 @@ class ContainerManager:
                     # Only copy if destination doesn't exist (don't overwrite user configs)
                     if not dst_path.exists():
                         shutil.copy2(src_path, dst_path)
-                        logger.info(f"Deployed config: {src_rel} -> {dst_path}")
+                        logger.info("Deployed config: %s -> %s", src_rel, dst_path)
                     else:
-                        logger.info(f"Config already exists, skipping: {dst_path}")
+                        logger.info("Config already exists, skipping: %s", dst_path)
 
         except Exception as e:
-            logger.warning(f"Error deploying config files for {service_id}: {e}")
+            logger.warning("Error deploying config files for %s: %s", service_id, e)
+
+    def _render_env(self, env_vars):
+        """
+        Render .env content from user-provided environment variables
+
+        Args:
+            env_vars: Dict of environment variables
+
+        Returns:
+            str: .env file content
+        """
+        # Only write non-empty values
+        return ''.join(f"{key.upper()}={value}\n" for key, value in env_vars.items() if value)
 
     def _create_env_file(self, service_dir, env_vars):
         """
@@ -505,13 +1561,10 @@ class ContainerManager:
 
         try:
             with open(env_file_path, 'w') as f:
-                for key, value in env_vars.items():
-                    # Only write non-empty values
-                    if value:
-                        f.write(f"{key.upper()}={value}\n")
+                f.write(self._render_env(env_vars))
 
-            logger.info(f"Created .env file for service in {service_dir}")
+            logger.info("Created .env file for service in %s", service_dir)
 
         except Exception as e:
-            logger.error(f"Error creating .env file: {e}")
+            logger.error("Error creating .env file: %s", e)
             raise
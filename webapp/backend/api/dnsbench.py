@@ -0,0 +1,376 @@
+"""
+DNS Benchmark
+UDP latency and throughput benchmark of the installed DNS resolvers
+"""
+
+import os
+import time
+import random
+import socket
+import struct
+import threading
+import logging
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlparse
+from api.services import get_containers_root
+from api.runlog import RunLog
+from api.stats import summarize
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled runs; 0 disables the schedule
+DNS_BENCH_INTERVAL = float(os.environ.get('OPENHOMESTACK_DNS_BENCH_INTERVAL', 3600))
+DNS_BENCH_TIMEOUT = float(os.environ.get('OPENHOMESTACK_DNS_BENCH_TIMEOUT', 2))
+
+# Names that exist and are queried repeatedly, so they are answered from cache
+CACHED_NAMES = ('example.com', 'cloudflare.com', 'github.com', 'wikipedia.org')
+
+# Random labels under this suffix are never cached; a wildcard domain makes them
+# resolve (nip.io answers any "<label>-1-1-1-1.nip.io" with 1.1.1.1)
+UNCACHED_SUFFIX = os.environ.get('OPENHOMESTACK_DNS_BENCH_UNCACHED_SUFFIX', '1-1-1-1.nip.io')
+
+# Reserved TLD (RFC 6761) that never exists
+NXDOMAIN_SUFFIX = 'invalid'
+
+# scenario -> (number of queries, queries in flight)
+SCENARIOS = {
+    "cached": (50, 1),
+    "uncached": (20, 1),
+    "burst": (200, 20),
+    "nxdomain": (20, 1)
+}
+
+# Runs kept in the results file
+RUN_HISTORY = 500
+
+RCODES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+QTYPE_A = 1
+QCLASS_IN = 1
+
+
+def build_query(query_id, name, qtype=QTYPE_A):
+    """
+    Encode a standard recursive DNS query
+
+    Args:
+        query_id: 16-bit message ID
+        name: Domain name to look up
+        qtype: Record type (default: A)
+
+    Returns:
+        bytes: Wire-format query
+    """
+    # Flags: RD (recursion desired); one question
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+    qname = b''.join(
+        bytes([len(label)]) + label for label in (part.encode('idna') for part in name.rstrip('.').split('.'))
+    ) + b'\x00'
+    return header + qname + struct.pack('!HH', qtype, QCLASS_IN)
+
+
+def parse_response_header(data):
+    """
+    Read the ID and response code of a DNS reply
+
+    Returns:
+        tuple: (query_id, rcode name), or None for a truncated packet
+    """
+    if len(data) < 12:
+        return None
+    query_id, flags = struct.unpack('!HH', data[:4])
+    rcode = flags & 0x000F
+    return query_id, RCODES.get(rcode, str(rcode))
+
+
+def run_batch(server, names, concurrency=1, timeout=DNS_BENCH_TIMEOUT):
+    """
+    Send queries over one UDP socket with up to `concurrency` in flight
+
+    Replies are matched to queries by message ID, so a burst needs neither
+    threads nor one socket per query.
+
+    Args:
+        server: (host, port) of the resolver
+        names: Names to query, in order
+        concurrency: Maximum outstanding queries
+        timeout: Seconds before an unanswered query counts as lost
+
+    Returns:
+        dict: Counts, response codes, latency summary (ms) and answered QPS
+    """
+    family, _, _, _, address = socket.getaddrinfo(server[0], server[1], type=socket.SOCK_DGRAM)[0]
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.connect(address)
+
+    next_id = random.randrange(65536)
+    queue = deque(names)
+    pending = {}
+    latencies = []
+    rcodes = {}
+    timeouts = 0
+    started = time.perf_counter()
+    try:
+        while queue or pending:
+            while queue and len(pending) < concurrency:
+                next_id = (next_id + 1) % 65536
+                sock.send(build_query(next_id, queue.popleft()))
+                pending[next_id] = time.perf_counter()
+
+            now = time.perf_counter()
+            wait = min(pending.values()) + timeout - now
+            if wait <= 0:
+                expired = [qid for qid, sent in pending.items() if sent + timeout <= now]
+                for qid in expired:
+                    del pending[qid]
+                timeouts += len(expired)
+                continue
+
+            sock.settimeout(wait)
+            try:
+                data = sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                # ICMP port unreachable: nothing listens, every query is lost
+                timeouts += len(pending) + len(queue)
+                pending.clear()
+                queue.clear()
+                break
+
+            header = parse_response_header(data)
+            if header is None or header[0] not in pending:
+                continue
+            latencies.append((time.perf_counter() - pending.pop(header[0])) * 1000)
+            rcodes[header[1]] = rcodes.get(header[1], 0) + 1
+    finally:
+        sock.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "queries": len(names),
+        "answered": len(latencies),
+        "timeouts": timeouts,
+        "rcodes": rcodes,
+        "latency_ms": summarize(latencies),
+        "qps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+def _random_label():
+    return '%016x' % random.getrandbits(64)
+
+
+def benchmark_resolver(server, timeout=DNS_BENCH_TIMEOUT):
+    """
+    Run every scenario against one resolver
+
+    Args:
+        server: (host, port) of the resolver
+        timeout: Per-query timeout in seconds
+
+    Returns:
+        dict: scenario -> run_batch() result
+    """
+    count, concurrency = SCENARIOS['cached']
+    # Warm the cache first so the cached scenario really measures cache hits
+    run_batch(server, list(CACHED_NAMES), len(CACHED_NAMES), timeout)
+    results = {
+        "cached": run_batch(server, [CACHED_NAMES[i % len(CACHED_NAMES)] for i in range(count)], concurrency, timeout)
+    }
+
+    count, concurrency = SCENARIOS['uncached']
+    results['uncached'] = run_batch(
+        server, [f"{_random_label()}-{UNCACHED_SUFFIX}" for _ in range(count)], concurrency, timeout
+    )
+
+    count, concurrency = SCENARIOS['burst']
+    results['burst'] = run_batch(
+        server, [CACHED_NAMES[i % len(CACHED_NAMES)] for i in range(count)], concurrency, timeout
+    )
+
+    count, concurrency = SCENARIOS['nxdomain']
+    results['nxdomain'] = run_batch(
+        server, [f"{_random_label()}.{NXDOMAIN_SUFFIX}" for _ in range(count)], concurrency, timeout
+    )
+    return results
+
+
+def resolver_address(label, host_url=None):
+    """
+    Address of a service's resolver from its openhomestack.dns label
+
+    Args:
+        label: "port" or "host:port"
+        host_url: URL of the Docker host running the service; for remote
+            TCP/SSH hosts the port is published on that machine
+
+    Returns:
+        tuple: (host, port)
+
+    Raises:
+        ValueError: If the label is not a valid port
+    """
+    host, _, port = str(label).rpartition(':')
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Invalid openhomestack.dns label '{label}' (expected port or host:port)")
+    if not host:
+        parsed = urlparse(host_url) if host_url else None
+        host = parsed.hostname if parsed and parsed.scheme in ('tcp', 'ssh', 'http', 'https') else '127.0.0.1'
+    return host, int(port)
+
+
+def _default_results_file():
+    return Path(os.environ.get('OPENHOMESTACK_DNS_BENCH_FILE') or
+                get_containers_root() / '.openhomestack' / 'dns-benchmark.jsonl')
+
+
+class DnsBenchmark:
+    """Benchmarks each running service that declares a DNS port, on a schedule and on demand"""
+
+    def __init__(self, service_manager, container_manager, interval=DNS_BENCH_INTERVAL,
+                 timeout=DNS_BENCH_TIMEOUT, results_file=None):
+        """
+        Initialize DNS benchmark
+
+        Args:
+            service_manager: ServiceManager used for the catalog
+            container_manager: ContainerManager used to find running resolvers
+            interval: Seconds between scheduled runs (0 disables)
+            timeout: Per-query timeout in seconds
+            results_file: JSON-lines file runs are appended to, shared by all
+                workers (default: /home/containers/.openhomestack/dns-benchmark.jsonl)
+        """
+        self.service_manager = service_manager
+        self.container_manager = container_manager
+        self.interval = interval
+        self.timeout = timeout
+        self.results_file = Path(results_file) if results_file else _default_results_file()
+        self.run_log = RunLog(self.results_file, RUN_HISTORY)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._scheduler = None
+
+    def resolvers(self):
+        """
+        Running services with an openhomestack.dns label
+
+        Returns:
+            dict: service_id -> (host, port)
+        """
+        resolvers = {}
+        for service in self.service_manager.discover_services():
+            if not service.get('dns'):
+                continue
+            if self.container_manager.get_status(service['id']).get('state') != 'running':
+                continue
+            try:
+                host = self.container_manager.host_for(service['id'])
+                resolvers[service['id']] = resolver_address(service['dns'], host.url)
+            except ValueError as e:
+                logger.warning("Skipping DNS benchmark of %s: %s", service['id'], e)
+        return resolvers
+
+    def start(self):
+        """
+        Run a benchmark in a background thread
+
+        Returns:
+            dict: Resolvers that will be benchmarked
+
+        Raises:
+            RuntimeError: If a benchmark is already running
+        """
+        resolvers = self.resolvers()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("A DNS benchmark is already running")
+            self._thread = threading.Thread(target=self.run, args=(resolvers,), name='dns-benchmark', daemon=True)
+            self._thread.start()
+        return {service_id: f"{host}:{port}" for service_id, (host, port) in resolvers.items()}
+
+    def run(self, resolvers=None):
+        """
+        Benchmark resolvers now (blocking)
+
+        Args:
+            resolvers: service_id -> (host, port) (default: all running resolvers)
+
+        Returns:
+            dict: The recorded run
+        """
+        resolvers = self.resolvers() if resolvers is None else resolvers
+        run = {"started_at": time.time(), "resolvers": {}}
+        for service_id, server in resolvers.items():
+            try:
+                run['resolvers'][service_id] = {
+                    "server": f"{server[0]}:{server[1]}",
+                    "scenarios": benchmark_resolver(server, self.timeout)
+                }
+            except OSError as e:
+                logger.error("DNS benchmark of %s failed: %s", service_id, e)
+                run['resolvers'][service_id] = {"server": f"{server[0]}:{server[1]}", "error": str(e)}
+        run['duration_s'] = round(time.time() - run['started_at'], 2)
+
+        self.run_log.append(run)
+        logger.info("DNS benchmark of %s resolvers finished in %ss", len(resolvers), run['duration_s'])
+        return run
+
+    def runs(self, limit=24):
+        """Recorded runs, newest first"""
+        return self.run_log.runs(limit)
+
+    def latest(self):
+        """Most recent run"""
+        return self.run_log.latest()
+
+    def running(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def latest_metrics(self):
+        """
+        Compact figures of the latest run for the system metric history
+
+        Returns:
+            dict: service_id -> scenario -> {p50_ms, p95_ms, p99_ms, qps, loss}, or None
+        """
+        run = self.latest()
+        if run is None:
+            return None
+
+        metrics = {}
+        for service_id, result in run['resolvers'].items():
+            metrics[service_id] = {
+                scenario: {
+                    "p50_ms": batch['latency_ms']['p50'],
+                    "p95_ms": batch['latency_ms']['p95'],
+                    "p99_ms": batch['latency_ms']['p99'],
+                    "qps": batch['qps'],
+                    "loss": round(batch['timeouts'] / batch['queries'], 3) if batch['queries'] else None
+                }
+                for scenario, batch in result.get('scenarios', {}).items()
+            }
+        return metrics
+
+    def start_schedule(self):
+        """Run a benchmark every interval in the background (idempotent)"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._schedule_loop, name='dns-benchmark-schedule', daemon=True)
+            self._scheduler.start()
+
+    def _schedule_loop(self):
+        # Leave the stack a minute to come up before the first run
+        time.sleep(min(self.interval, 60))
+        while True:
+            try:
+                if not self.running():
+                    self.run()
+            except Exception as e:
+                logger.error("Scheduled DNS benchmark failed: %s", e)
+            time.sleep(self.interval)
@@ -0,0 +1,176 @@
+"""
+Event Bus
+In-process publish/subscribe of backend events, streamed to clients as SSE
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import logging
+from collections import deque
+from api.startup import LazyInstance
+
+logger = logging.getLogger(__name__)
+
+# Recent events kept so reconnecting clients can resume from Last-Event-ID
+EVENT_HISTORY = int(os.environ.get('OPENHOMESTACK_EVENT_HISTORY', 200))
+
+# Events buffered per subscriber; a client that falls further behind loses the oldest
+EVENT_QUEUE_SIZE = 100
+
+# Seconds between SSE keep-alive comments on an idle stream
+EVENT_HEARTBEAT = 15
+
+
+class Subscription:
+    """One subscriber's bounded queue of events"""
+
+    def __init__(self, bus, types=None):
+        self._bus = bus
+        self.types = set(types) if types else None
+        self._queue = queue.Queue(EVENT_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, event):
+        return self.types is None or event['type'] in self.types
+
+    def offer(self, event):
+        """Queue an event without ever blocking the publisher"""
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within the timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    Fan-out of events to any number of subscribers
+
+    Publishing never blocks: each subscriber has its own bounded queue and
+    slow consumers drop their oldest events. Events carry increasing IDs so
+    a client can resume after a reconnect.
+    """
+
+    def __init__(self, history=EVENT_HISTORY):
+        """
+        Initialize event bus
+
+        Args:
+            history: Number of recent events kept for resuming clients
+        """
+        self._recent = deque(maxlen=history)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data, event_id=None, ts=None):
+        """
+        Publish an event to every interested subscriber
+
+        Args:
+            event_type: Event type, e.g. "alert"
+            data: JSON-serializable payload
+            event_id: ID to use instead of the next one (when relaying events
+                that were published in another process)
+            ts: Unix timestamp (default: now)
+
+        Returns:
+            dict: The published event
+        """
+        with self._lock:
+            event_id = event_id or self._next_id
+            self._next_id = max(self._next_id, event_id + 1)
+            event = {"id": event_id, "type": event_type, "ts": ts or time.time(), "data": data}
+            self._recent.append(event)
+            subscribers = [s for s in self._subscribers if s.wants(event)]
+
+        for subscriber in subscribers:
+            subscriber.offer(event)
+        return event
+
+    def subscribe(self, types=None, last_event_id=None):
+        """
+        Subscribe to events
+
+        Args:
+            types: Event types to receive (default: all)
+            last_event_id: Also deliver retained events after this ID
+
+        Returns:
+            Subscription: Call close() when done
+        """
+        subscription = Subscription(self, types)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event['id'] > last_event_id and subscription.wants(event):
+                        subscription.offer(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def recent(self, since_id=0):
+        """Retained events after an ID, oldest first"""
+        with self._lock:
+            return [event for event in self._recent if event['id'] > since_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "last_id": self._next_id - 1,
+                "dropped": sum(s.dropped for s in self._subscribers)
+            }
+
+
+def format_sse(event):
+    """Encode an event in the text/event-stream wire format"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def stream_events(subscription, heartbeat=EVENT_HEARTBEAT):
+    """
+    Generate an SSE stream from a subscription until the client disconnects
+
+    Args:
+        subscription: Subscription to drain; closed when the stream ends
+        heartbeat: Seconds between keep-alive comments when idle
+
+    Yields:
+        str: SSE frames
+    """
+    try:
+        # Ask browsers to wait a few seconds before reconnecting
+        yield "retry: 5000\n\n"
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        subscription.close()
+
+
+event_bus = LazyInstance(EventBus)
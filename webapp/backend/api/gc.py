@@ -0,0 +1,413 @@
+"""
+Garbage Collection
+Finds and removes superseded images, stale containers and orphaned volumes
+"""
+
+import os
+import re
+import time
+import threading
+import logging
+from pathlib import Path
+from api.services import get_containers_root
+from api.updates import split_image_ref
+from api.runlog import RunLog
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled collections; 0 disables the schedule
+GC_INTERVAL = float(os.environ.get('OPENHOMESTACK_GC_INTERVAL', 86400))
+
+# Unused images kept per repository besides the one in use, for quick rollback
+GC_KEEP_IMAGES = int(os.environ.get('OPENHOMESTACK_GC_KEEP_IMAGES', 1))
+
+# Orphaned volumes may still hold data someone wants back, so scheduled runs
+# only remove them when enabled explicitly
+GC_VOLUMES = os.environ.get('OPENHOMESTACK_GC_VOLUMES', 'false').lower() in ('1', 'true', 'yes')
+
+# `docker system df` computes volume sizes and can take a while on big hosts
+GC_HOST_TIMEOUT = float(os.environ.get('OPENHOMESTACK_GC_HOST_TIMEOUT', 120))
+
+# Runs kept in the results file
+RUN_HISTORY = 200
+
+GC_KINDS = ('containers', 'images', 'volumes')
+
+
+def _default_results_file():
+    return Path(os.environ.get('OPENHOMESTACK_GC_FILE') or get_containers_root() / '.openhomestack' / 'gc.jsonl')
+
+
+def normalize_repository(ref):
+    """
+    Repository of an image reference, without tag, digest or implicit Docker Hub prefixes
+
+    Args:
+        ref: Reference such as docker.io/library/nginx:1.25 or nginx@sha256:...
+
+    Returns:
+        str: Repository, e.g. nginx
+    """
+    repository, _ = split_image_ref(ref.split('@', 1)[0])
+    for prefix in ('docker.io/', 'index.docker.io/', 'library/'):
+        if repository.startswith(prefix):
+            repository = repository[len(prefix):]
+    return repository
+
+
+def _project_key(name):
+    """docker-compose v1 strips everything but letters and digits from project names"""
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+
+def _image_repositories(image):
+    refs = [t for t in image.get('RepoTags') or [] if t != '<none>:<none>']
+    refs += [d for d in image.get('RepoDigests') or [] if not d.startswith('<none>')]
+    return {normalize_repository(ref) for ref in refs}
+
+
+def _unique_size(image):
+    """Bytes only this image's layers use (what removing it alone frees)"""
+    shared = image.get('SharedSize', -1)
+    return image.get('Size', 0) - shared if shared is not None and shared >= 0 else image.get('Size', 0)
+
+
+def plan_host(df, repositories, projects, keep_images=GC_KEEP_IMAGES, remove_containers=True):
+    """
+    Work out what can be removed on one Docker host
+
+    Only openHomeStack's own objects are considered:
+    - containers: labelled with openhomestack.service and not running, that
+      are dead, belong to a service that no longer exists, or were
+      superseded by a newer container for the same compose service;
+    - images: of a repository some service uses, not used by any remaining
+      container, beyond the `keep_images` newest unused ones per repository;
+    - volumes: of a service's compose project, not used by any container.
+
+    Args:
+        df: Result of the Docker API's system df (Containers, Images, Volumes)
+        repositories: Normalized repositories of all catalog services
+        projects: Service IDs (compose project names)
+        keep_images: Unused images kept per repository for rollback
+        remove_containers: Whether the stale containers will be removed too;
+            if not, their images count as in use
+
+    Returns:
+        dict: Candidates and kept images per kind, and reclaimable bytes
+    """
+    projects = {_project_key(p): p for p in projects}
+    containers = df.get('Containers') or []
+
+    # Newest container per (service, compose service, replica number)
+    newest = {}
+    for container in containers:
+        labels = container.get('Labels') or {}
+        if 'openhomestack.service' not in labels:
+            continue
+        key = (labels['openhomestack.service'], labels.get('com.docker.compose.service'),
+               labels.get('com.docker.compose.container-number'))
+        if key not in newest or container.get('Created', 0) > newest[key].get('Created', 0):
+            newest[key] = container
+
+    stale_containers = []
+    for container in containers:
+        labels = container.get('Labels') or {}
+        service_id = labels.get('openhomestack.service')
+        if service_id is None or container.get('State') == 'running':
+            continue
+        key = (service_id, labels.get('com.docker.compose.service'), labels.get('com.docker.compose.container-number'))
+        if container.get('State') == 'dead':
+            reason = "dead"
+        elif _project_key(service_id) not in projects:
+            reason = "service no longer exists"
+        elif newest[key] is not container:
+            reason = "superseded by a newer container"
+        else:
+            continue
+        stale_containers.append({
+            "id": container['Id'],
+            "name": (container.get('Names') or ['?'])[0].lstrip('/'),
+            "service": service_id,
+            "state": container.get('State'),
+            "size_bytes": container.get('SizeRw') or 0,
+            "reason": reason
+        })
+
+    # Images stay in use while any container that is not being removed refers to them
+    removed_ids = {c['id'] for c in stale_containers} if remove_containers else set()
+    in_use = {c.get('ImageID') for c in containers if c['Id'] not in removed_ids}
+
+    by_repository = {}
+    for image in df.get('Images') or []:
+        ours = _image_repositories(image) & repositories
+        if ours:
+            by_repository.setdefault(min(ours), []).append(image)
+
+    stale_images, kept_images = [], []
+    for repository, images in sorted(by_repository.items()):
+        unused = 0
+        for image in sorted(images, key=lambda i: i.get('Created', 0), reverse=True):
+            entry = {
+                "id": image['Id'],
+                "repository": repository,
+                "tags": [t for t in image.get('RepoTags') or [] if t != '<none>:<none>'],
+                "created": image.get('Created'),
+                "size_bytes": _unique_size(image)
+            }
+            if image['Id'] in in_use:
+                kept_images.append(dict(entry, reason="in use"))
+            elif unused < keep_images:
+                unused += 1
+                kept_images.append(dict(entry, reason="rollback"))
+            else:
+                stale_images.append(dict(entry, reason="superseded"))
+
+    orphaned_volumes = []
+    for volume in df.get('Volumes') or []:
+        project = (volume.get('Labels') or {}).get('com.docker.compose.project')
+        usage = volume.get('UsageData') or {}
+        if _project_key(project) in projects and usage.get('RefCount', 1) == 0:
+            orphaned_volumes.append({
+                "name": volume['Name'],
+                "service": projects[_project_key(project)],
+                "size_bytes": max(usage.get('Size', 0), 0),
+                "reason": "not used by any container"
+            })
+
+    candidates = {"containers": stale_containers, "images": stale_images, "volumes": orphaned_volumes}
+    reclaimable = {kind: sum(item['size_bytes'] for item in items) for kind, items in candidates.items()}
+    reclaimable['total'] = sum(reclaimable.values())
+    return {**candidates, "kept_images": kept_images, "reclaimable_bytes": reclaimable}
+
+
+class GarbageCollector:
+    """Plans and runs garbage collection on every Docker host, on a schedule and on demand"""
+
+    def __init__(self, service_manager, container_manager, interval=GC_INTERVAL,
+                 keep_images=GC_KEEP_IMAGES, volumes=GC_VOLUMES, results_file=None):
+        """
+        Initialize garbage collector
+
+        Args:
+            service_manager: ServiceManager used for the catalog
+            container_manager: ContainerManager used to reach the Docker hosts
+            interval: Seconds between scheduled runs (0 disables)
+            keep_images: Unused images kept per repository for rollback
+            volumes: Whether scheduled runs remove orphaned volumes
+            results_file: JSON-lines file runs are appended to, shared by all
+                workers (default: /home/containers/.openhomestack/gc.jsonl)
+        """
+        self.service_manager = service_manager
+        self.container_manager = container_manager
+        self.interval = interval
+        self.keep_images = keep_images
+        self.volumes = volumes
+        self.run_log = RunLog(Path(results_file) if results_file else _default_results_file(), RUN_HISTORY)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._scheduler = None
+
+    def _catalog(self):
+        services = self.service_manager.discover_services()
+        repositories = {
+            normalize_repository(ref)
+            for service in services for ref in self.service_manager.get_images(service['id'])
+        }
+        return repositories, {service['id'] for service in services}
+
+    def _host_client(self, host):
+        client = host.client()
+        if client is None:
+            raise ConnectionError(f"Docker client not available for host {host.name}")
+        return client
+
+    def plan(self, keep_images=None):
+        """
+        What a collection would remove on each host, without removing anything
+
+        Args:
+            keep_images: Unused images kept per repository (default: configured)
+
+        Returns:
+            dict: Per-host plans (or errors) and total reclaimable bytes per kind
+        """
+        keep_images = self.keep_images if keep_images is None else keep_images
+        repositories, projects = self._catalog()
+
+        def plan_one(host):
+            return plan_host(self._host_client(host).df(), repositories, projects, keep_images)
+
+        answers = self.container_manager.hosts.fan_out(f'gc-plan:{keep_images}', plan_one, timeout=GC_HOST_TIMEOUT)
+        hosts = {
+            name: answer['result'] if answer['ok'] else {"error": answer['error']}
+            for name, answer in answers.items()
+        }
+        totals = {kind: 0 for kind in GC_KINDS + ('total',)}
+        for plan in hosts.values():
+            for kind, size in plan.get('reclaimable_bytes', {}).items():
+                totals[kind] += size
+        return {"keep_images": keep_images, "hosts": hosts, "reclaimable_bytes": totals}
+
+    def start(self, kinds=None, keep_images=None, trigger='manual'):
+        """
+        Run a collection in a background thread
+
+        Args:
+            kinds: Kinds to remove (default: containers and images, plus
+                volumes if enabled)
+            keep_images: Unused images kept per repository (default: configured)
+            trigger: What started the run, recorded with it
+
+        Returns:
+            dict: Options the run uses
+
+        Raises:
+            RuntimeError: If a collection is already running
+            ValueError: On unknown kinds
+        """
+        options = self._options(kinds, keep_images)
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("Garbage collection is already running")
+            self._thread = threading.Thread(
+                target=self.run, kwargs={**options, "trigger": trigger}, name='gc', daemon=True
+            )
+            self._thread.start()
+        return options
+
+    def _options(self, kinds, keep_images):
+        if kinds is None:
+            kinds = [kind for kind in GC_KINDS if kind != 'volumes' or self.volumes]
+        unknown = set(kinds) - set(GC_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown kinds: {', '.join(sorted(unknown))} (expected {', '.join(GC_KINDS)})")
+        keep_images = self.keep_images if keep_images is None else int(keep_images)
+        if keep_images < 0:
+            raise ValueError("keep_images must not be negative")
+        return {"kinds": sorted(kinds), "keep_images": keep_images}
+
+    def running(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def run(self, kinds=None, keep_images=None, trigger='manual'):
+        """
+        Collect garbage now (blocking)
+
+        Each host is planned again right before removal, so the run never
+        acts on a stale plan. Freed image space is measured as the change in
+        total layer size, which also counts layers only the removed images
+        shared.
+
+        Returns:
+            dict: The recorded run
+        """
+        options = self._options(kinds, keep_images)
+        repositories, projects = self._catalog()
+        run = {"started_at": time.time(), "trigger": trigger, **options}
+
+        def collect(host):
+            return self._collect_host(self._host_client(host), repositories, projects, options)
+
+        # Concurrent runs with the same options share one collection per host
+        query_name = f"gc-collect:{','.join(options['kinds'])}:{options['keep_images']}"
+        answers = self.container_manager.hosts.fan_out(query_name, collect, timeout=GC_HOST_TIMEOUT * 5)
+        run['hosts'] = {
+            name: answer['result'] if answer['ok'] else {"error": answer['error']}
+            for name, answer in answers.items()
+        }
+        run['freed_bytes'] = sum(h.get('freed_bytes', 0) for h in run['hosts'].values())
+        run['finished_at'] = time.time()
+        run['duration_s'] = round(run['finished_at'] - run['started_at'], 2)
+
+        self.run_log.append(run)
+        logger.info("Garbage collection freed %s bytes in %ss", run['freed_bytes'], run['duration_s'])
+        return run
+
+    def _collect_host(self, client, repositories, projects, options):
+        """Remove one host's candidates of the selected kinds; returns what was removed and freed"""
+        started = time.monotonic()
+        df = client.df()
+        plan = plan_host(df, repositories, projects, options['keep_images'],
+                         remove_containers='containers' in options['kinds'])
+        removed = {kind: [] for kind in GC_KINDS}
+        errors = []
+        freed = 0
+
+        if 'containers' in options['kinds']:
+            for container in plan['containers']:
+                try:
+                    client.containers.get(container['id']).remove()
+                    removed['containers'].append(container['name'])
+                    freed += container['size_bytes']
+                except Exception as e:
+                    errors.append(f"container {container['name']}: {e}")
+
+        if 'images' in options['kinds'] and plan['images']:
+            layers_before = df.get('LayersSize', 0)
+            for image in plan['images']:
+                try:
+                    # Multi-tagged images must be untagged one reference at a time
+                    for tag in image['tags']:
+                        client.images.remove(tag)
+                    if not image['tags'] or self._image_exists(client, image['id']):
+                        client.images.remove(image['id'])
+                    removed['images'].append(image['tags'][0] if image['tags'] else image['id'][:19])
+                except Exception as e:
+                    errors.append(f"image {image['id'][:19]}: {e}")
+            freed += max(0, layers_before - client.df().get('LayersSize', 0))
+
+        if 'volumes' in options['kinds']:
+            for volume in plan['volumes']:
+                try:
+                    client.volumes.get(volume['name']).remove()
+                    removed['volumes'].append(volume['name'])
+                    freed += volume['size_bytes']
+                except Exception as e:
+                    errors.append(f"volume {volume['name']}: {e}")
+
+        for error in errors:
+            logger.warning("Garbage collection: %s", error)
+        return {
+            "removed": removed,
+            "reclaimable_bytes": plan['reclaimable_bytes'],
+            "freed_bytes": freed,
+            "errors": errors,
+            "duration_s": round(time.monotonic() - started, 2)
+        }
+
+    def _image_exists(self, client, image_id):
+        try:
+            client.images.get(image_id)
+            return True
+        except Exception:
+            return False
+
+    def runs(self, limit=20):
+        """Recorded runs, newest first"""
+        return self.run_log.runs(limit)
+
+    def latest(self):
+        """Most recent run"""
+        return self.run_log.latest()
+
+    def start_schedule(self):
+        """Collect every interval in the background (idempotent)"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._schedule_loop, name='gc-schedule', daemon=True)
+            self._scheduler.start()
+
+    def _schedule_loop(self):
+        # Not right at startup, when boot and updates may still be pulling
+        time.sleep(min(self.interval, 600))
+        while True:
+            try:
+                if not self.running():
+                    self.run(trigger='schedule')
+            except Exception as e:
+                logger.error("Scheduled garbage collection failed: %s", e)
+            time.sleep(self.interval)
@@ -0,0 +1,245 @@
+"""
+Docker Hosts
+Registry of Docker endpoints and concurrent fan-out of queries across them
+"""
+
+import os
+import json
+import time
+import contextvars
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from api.services import get_containers_root
+from api.startup import LazyInstance
+
+logger = logging.getLogger(__name__)
+
+# Seconds a single host may take to answer a fan-out query
+HOST_TIMEOUT = float(os.environ.get('OPENHOMESTACK_HOST_TIMEOUT', 5))
+
+# Name of the implicit host when no registry is configured
+DEFAULT_HOST = 'local'
+
+
+def _default_hosts_file():
+    return Path(os.environ.get('OPENHOMESTACK_HOSTS_FILE') or get_containers_root() / '.openhomestack' / 'hosts.json')
+
+
+def parse_hosts_env(value):
+    """
+    Parse OPENHOMESTACK_DOCKER_HOSTS (name=url pairs, comma separated)
+
+    Args:
+        value: e.g. "core=unix:///var/run/docker.sock,media=tcp://192.168.1.21:2375"
+
+    Returns:
+        dict: host name -> Docker endpoint URL
+
+    Raises:
+        ValueError: On an entry without a name
+    """
+    hosts = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid Docker host entry '{entry}' (expected name=url)")
+        hosts[name.strip()] = url.strip()
+    return hosts
+
+
+class DockerHost:
+    """One Docker endpoint (unix socket or TCP)"""
+
+    def __init__(self, name, url=None):
+        """
+        Initialize host
+
+        Args:
+            name: Host name used in labels and API responses
+            url: Docker endpoint (e.g. tcp://192.168.1.21:2375); None uses the
+                environment (DOCKER_HOST or the local socket)
+        """
+        self.name = name
+        self.url = url or None
+        self._client = None
+
+    def env(self):
+        """Environment for docker / docker-compose subprocesses targeting this host"""
+        env = dict(os.environ)
+        if self.url:
+            env['DOCKER_HOST'] = self.url
+        return env
+
+    def client(self):
+        """Lazily created Docker SDK client, or None if the daemon is unavailable"""
+        if self._client is None:
+            try:
+                import docker
+                if self.url:
+                    self._client = docker.DockerClient(base_url=self.url, timeout=int(HOST_TIMEOUT * 6))
+                else:
+                    self._client = docker.from_env()
+                logger.info("Docker client initialized for host %s", self.name)
+            except Exception as e:
+                logger.error("Failed to initialize Docker client for host %s: %s", self.name, e)
+                self._client = None
+        return self._client
+
+    def as_dict(self):
+        return {"name": self.name, "url": self.url}
+
+
+class HostRegistry:
+    """
+    Known Docker hosts and which host each service is pinned to
+
+    Hosts come from OPENHOMESTACK_DOCKER_HOSTS or the "hosts" object of the
+    hosts file; without either there is a single host using the local
+    daemon. A service runs on the host named by the "services" object of the
+    hosts file, else its openhomestack.host label, else the first host.
+    """
+
+    def __init__(self, hosts=None, assignments=None, timeout=HOST_TIMEOUT):
+        """
+        Initialize registry
+
+        Args:
+            hosts: Dict of host name -> endpoint URL (default: from env or hosts file)
+            assignments: Dict of service_id -> host name (default: from hosts file)
+            timeout: Default per-host timeout for fan-out queries
+        """
+        if hosts is None:
+            hosts, file_assignments = self._load()
+            assignments = file_assignments if assignments is None else assignments
+
+        self._hosts = {name: DockerHost(name, url) for name, url in (hosts or {DEFAULT_HOST: None}).items()}
+        self.assignments = dict(assignments or {})
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self._hosts)), thread_name_prefix='host-query')
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        env_hosts = os.environ.get('OPENHOMESTACK_DOCKER_HOSTS')
+        hosts_file = _default_hosts_file()
+        config = {}
+        if hosts_file.is_file():
+            try:
+                with open(hosts_file, 'r') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error("Could not read hosts file %s: %s", hosts_file, e)
+
+        hosts = parse_hosts_env(env_hosts) if env_hosts else config.get('hosts')
+        return hosts or None, config.get('services') or {}
+
+    @property
+    def default(self):
+        """The first configured host"""
+        return next(iter(self._hosts.values()))
+
+    def hosts(self):
+        """All configured hosts"""
+        return list(self._hosts.values())
+
+    def get(self, name):
+        """
+        Get a host by name
+
+        Raises:
+            ValueError: If no such host is configured
+        """
+        if name not in self._hosts:
+            raise ValueError(f"Unknown Docker host '{name}'")
+        return self._hosts[name]
+
+    def host_for(self, service_id, label=None):
+        """
+        Host a service is pinned to
+
+        Args:
+            service_id: Service identifier
+            label: Value of the service's openhomestack.host label, if any
+
+        Returns:
+            DockerHost: Assigned host, or the default one for unknown names
+        """
+        name = self.assignments.get(service_id) or label
+        if name and name in self._hosts:
+            return self._hosts[name]
+        if name:
+            logger.warning("Service %s is pinned to unknown host %s, using %s", service_id, name, self.default.name)
+        return self.default
+
+    def fan_out(self, name, fn, hosts=None, timeout=None):
+        """
+        Run a query against several hosts concurrently
+
+        Waits at most `timeout` overall; hosts that have not answered by then
+        are reported as timed out while the others' results are returned.
+        Calls are single-flight per host and name: a caller arriving while
+        the same query is running on a host waits for that call's result
+        instead of starting another. Once a call has run past its own
+        timeout (e.g. an unreachable node hanging on connect) the host is
+        reported as unavailable rather than queried again, so stuck calls
+        never pile up threads.
+
+        Args:
+            name: Query name; calls with the same name must compute the same
+                result, so it includes every argument `fn` depends on
+            fn: Callable taking a DockerHost and returning its result
+            hosts: Hosts to query (default: all)
+            timeout: Seconds to wait (default: the registry timeout)
+
+        Returns:
+            dict: host name -> {"ok", "result" or "error", "latency_ms"}
+        """
+        timeout = self.timeout if timeout is None else timeout
+        hosts = self.hosts() if hosts is None else hosts
+        results = {}
+        futures = {}
+
+        def timed(host):
+            started = time.perf_counter()
+            try:
+                return fn(host), (time.perf_counter() - started) * 1000
+            finally:
+                with self._lock:
+                    self._in_flight.pop((host.name, name), None)
+
+        with self._lock:
+            now = time.monotonic()
+            for host in hosts:
+                key = (host.name, name)
+                if key in self._in_flight:
+                    future, deadline = self._in_flight[key]
+                    if now >= deadline:
+                        results[host.name] = {"ok": False, "error": "Previous query has not finished", "latency_ms": None}
+                        continue
+                    # Still within its timeout: share its result
+                    futures[future] = host
+                    continue
+                # Carry the caller's context (e.g. its request deadline) into the worker
+                future = self._executor.submit(contextvars.copy_context().run, timed, host)
+                self._in_flight[key] = (future, now + timeout)
+                futures[future] = host
+
+        wait(futures, timeout=timeout)
+        for future, host in futures.items():
+            if not future.done():
+                results[host.name] = {"ok": False, "error": f"Timed out after {timeout:g}s", "latency_ms": None}
+                continue
+            try:
+                value, latency_ms = future.result()
+                results[host.name] = {"ok": True, "result": value, "latency_ms": round(latency_ms, 1)}
+            except Exception as e:
+                results[host.name] = {"ok": False, "error": str(e), "latency_ms": None}
+        return results
+
+
+host_registry = LazyInstance(HostRegistry)
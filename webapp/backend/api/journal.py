@@ -0,0 +1,264 @@
+"""
+Operation Journal
+Persistent SQLite history of compose and lifecycle operations with duration analytics
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from api.services import get_containers_root
+from api.startup import LazyInstance
+from api.stats import summarize
+
+logger = logging.getLogger(__name__)
+
+# Output stored per operation (the tail, where errors end up)
+OUTPUT_LIMIT = 4096
+
+# Writes are batched: flushed every interval or when a batch fills up
+FLUSH_INTERVAL = float(os.environ.get('OPENHOMESTACK_JOURNAL_FLUSH_INTERVAL', 1))
+BATCH_SIZE = 100
+
+# Most recent operations per service/action compared against older ones for trends
+TREND_WINDOW = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY,
+    service_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    duration_s REAL NOT NULL,
+    exit_code INTEGER,
+    timed_out INTEGER NOT NULL DEFAULT 0,
+    output TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_operations_service ON operations (service_id, action, started_at);
+CREATE INDEX IF NOT EXISTS idx_operations_action ON operations (action, started_at);
+CREATE INDEX IF NOT EXISTS idx_operations_started ON operations (started_at);
+"""
+
+_COLUMNS = ('id', 'service_id', 'action', 'started_at', 'ended_at', 'duration_s', 'exit_code', 'timed_out', 'output')
+
+
+def _default_journal_path():
+    return Path(os.environ.get('OPENHOMESTACK_JOURNAL_PATH') or get_containers_root() / '.openhomestack' / 'journal.db')
+
+
+def _truncate_output(output):
+    if not output:
+        return None
+    if len(output) <= OUTPUT_LIMIT:
+        return output
+    return '...' + output[-OUTPUT_LIMIT:]
+
+
+class OperationJournal:
+    """
+    Records how long each operation took and how it ended
+
+    `record()` only enqueues; a background thread writes batches in one
+    transaction each, so requests never wait on SQLite.
+    """
+
+    def __init__(self, path=None):
+        """
+        Initialize journal
+
+        Args:
+            path: SQLite database file (default: /home/containers/.openhomestack/journal.db)
+        """
+        self.path = Path(path) if path else _default_journal_path()
+        self._queue = queue.Queue()
+        self._flushed = threading.Condition()
+        self._enqueued = 0
+        self._written = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        """Per-thread connection (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            # WAL lets readers (and other workers) proceed while a batch is written
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._write_loop, name='journal-writer', daemon=True)
+                self._thread.start()
+
+    def record(self, service_id, action, started_at, ended_at=None, exit_code=None, output=None, timed_out=False):
+        """
+        Queue an operation for writing
+
+        Args:
+            service_id: Service identifier
+            action: Operation name (e.g. install, compose up, stop)
+            started_at: Unix timestamp the operation started
+            ended_at: Unix timestamp it ended (default: now)
+            exit_code: Process exit code, 0 for success (None if unknown)
+            output: Command output; only the last OUTPUT_LIMIT characters are kept
+            timed_out: Whether the operation was killed at its timeout
+        """
+        ended_at = ended_at or time.time()
+        row = (
+            service_id, action, started_at, ended_at, round(ended_at - started_at, 3),
+            exit_code, int(bool(timed_out)), _truncate_output(output)
+        )
+        with self._flushed:
+            self._enqueued += 1
+        self._queue.put(row)
+        self._ensure_writer()
+
+    def _write_loop(self):
+        """Write queued operations in batches"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    'INSERT INTO operations (service_id, action, started_at, ended_at, duration_s, '
+                    'exit_code, timed_out, output) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    batch
+                )
+        except sqlite3.Error as e:
+            logger.error("Could not write %s journal entries: %s", len(batch), e)
+        with self._flushed:
+            self._written += len(batch)
+            self._flushed.notify_all()
+
+    def flush(self, timeout=5):
+        """Wait until everything recorded so far has been written"""
+        with self._flushed:
+            target = self._enqueued
+            self._flushed.wait_for(lambda: self._written >= target, timeout=timeout)
+
+    def _where(self, service_id=None, action=None, since=None, until=None, failed=None):
+        clauses, params = [], []
+        if service_id:
+            clauses.append('service_id = ?')
+            params.append(service_id)
+        if action:
+            clauses.append('action = ?')
+            params.append(action)
+        if since is not None:
+            clauses.append('started_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('started_at < ?')
+            params.append(until)
+        if failed:
+            clauses.append('(exit_code IS NULL OR exit_code != 0 OR timed_out = 1)')
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def query(self, service_id=None, action=None, since=None, until=None, failed=False, limit=100):
+        """
+        List recorded operations, newest first
+
+        Args:
+            service_id: Only this service
+            action: Only this action
+            since: Only operations started at or after this Unix timestamp
+            until: Only operations started before this Unix timestamp
+            failed: Only operations that exited non-zero or timed out
+            limit: Maximum number of rows
+
+        Returns:
+            list: Operation dicts
+        """
+        self.flush()
+        where, params = self._where(service_id, action, since, until, failed)
+        rows = self._connect().execute(
+            f'SELECT {", ".join(_COLUMNS)} FROM operations{where} ORDER BY started_at DESC LIMIT ?',
+            params + [limit]
+        ).fetchall()
+
+        operations = []
+        for row in rows:
+            operation = dict(zip(_COLUMNS, row))
+            operation['timed_out'] = bool(operation['timed_out'])
+            operations.append(operation)
+        return operations
+
+    def stats(self, service_id=None, action=None, since=None, until=None):
+        """
+        Duration percentiles per service and action
+
+        Each group also compares its most recent TREND_WINDOW operations with
+        the ones before, so a growing pull or a stop that keeps hitting its
+        timeout stands out.
+
+        Returns:
+            list: One dict per (service_id, action), slowest p95 first
+        """
+        self.flush()
+        where, params = self._where(service_id, action, since, until)
+        rows = self._connect().execute(
+            f'SELECT service_id, action, duration_s, exit_code, timed_out FROM operations{where} '
+            'ORDER BY service_id, action, started_at',
+            params
+        ).fetchall()
+
+        groups = {}
+        for sid, act, duration, exit_code, timed_out in rows:
+            group = groups.setdefault((sid, act), {"durations": [], "failures": 0, "timeouts": 0})
+            group['durations'].append(duration)
+            if exit_code != 0 or timed_out:
+                group['failures'] += 1
+            if timed_out:
+                group['timeouts'] += 1
+
+        result = []
+        for (sid, act), group in groups.items():
+            durations = group['durations']
+            recent = summarize(durations[-TREND_WINDOW:])
+            baseline = summarize(durations[:-TREND_WINDOW])
+            trend = None
+            if baseline['p50']:
+                trend = round(recent['p50'] / baseline['p50'], 2)
+            result.append({
+                "service_id": sid,
+                "action": act,
+                "duration_s": summarize(durations),
+                "failures": group['failures'],
+                "timeouts": group['timeouts'],
+                "recent_p50_s": recent['p50'],
+                "baseline_p50_s": baseline['p50'],
+                # Ratio of recent to earlier median duration; > 1 means slower
+                "trend": trend
+            })
+
+        result.sort(key=lambda g: g['duration_s']['p95'] or 0, reverse=True)
+        return result
+
+
+operation_journal = LazyInstance(OperationJournal)
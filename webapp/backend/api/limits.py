@@ -0,0 +1,106 @@
+"""
+Resource Limits
+Validation and translation of per-service CPU, memory and I/O budgets
+"""
+
+import re
+
+# Supported budget keys (labels: openhomestack.limits.<key>)
+LIMIT_KEYS = ('cpus', 'memory', 'io_weight')
+
+# Generated compose file applied on top of docker-compose.yml
+OVERRIDE_FILE = 'docker-compose.openhomestack.yml'
+
+CPU_PERIOD = 100000
+
+_MEMORY_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([bkmg]?)b?$', re.IGNORECASE)
+_MEMORY_UNITS = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_memory(value):
+    """
+    Parse a compose-style memory size (e.g. 512m, 2g, 1073741824)
+
+    Args:
+        value: Size string or number of bytes
+
+    Returns:
+        int: Size in bytes
+
+    Raises:
+        ValueError: If the value is not a valid size
+    """
+    match = _MEMORY_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid memory limit '{value}'")
+    return int(float(match.group(1)) * _MEMORY_UNITS[match.group(2).lower()])
+
+
+def normalize_limits(limits):
+    """
+    Validate a limits dict, dropping empty values
+
+    Args:
+        limits: Dict with any of cpus, memory, io_weight
+
+    Returns:
+        dict: Normalized limits (cpus float, memory string, io_weight int)
+
+    Raises:
+        ValueError: On unknown keys or invalid values
+    """
+    normalized = {}
+    for key, value in (limits or {}).items():
+        if key not in LIMIT_KEYS:
+            raise ValueError(f"Unknown limit '{key}' (expected one of {', '.join(LIMIT_KEYS)})")
+        if value in (None, ''):
+            continue
+
+        if key == 'cpus':
+            try:
+                cpus = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid cpus limit '{value}'")
+            if cpus <= 0:
+                raise ValueError("cpus limit must be positive")
+            normalized['cpus'] = cpus
+        elif key == 'memory':
+            if parse_memory(value) < 6 * 1024 ** 2:
+                raise ValueError("memory limit must be at least 6m")
+            normalized['memory'] = str(value).strip().lower()
+        else:
+            try:
+                weight = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid io_weight '{value}'")
+            if not 10 <= weight <= 1000:
+                raise ValueError("io_weight must be between 10 and 1000")
+            normalized['io_weight'] = weight
+    return normalized
+
+
+def compose_limits(limits):
+    """Translate normalized limits into compose service keys"""
+    config = {}
+    if 'cpus' in limits:
+        config['cpus'] = limits['cpus']
+    if 'memory' in limits:
+        config['mem_limit'] = limits['memory']
+    if 'io_weight' in limits:
+        config['blkio_config'] = {'weight': limits['io_weight']}
+    return config
+
+
+def docker_update_kwargs(limits):
+    """Translate normalized limits into Container.update() arguments"""
+    kwargs = {}
+    if 'cpus' in limits:
+        kwargs['cpu_period'] = CPU_PERIOD
+        kwargs['cpu_quota'] = int(limits['cpus'] * CPU_PERIOD)
+    if 'memory' in limits:
+        kwargs['mem_limit'] = parse_memory(limits['memory'])
+        # Swap must be at least the memory limit; leave it unbounded like compose
+        kwargs['memswap_limit'] = -1
+    if 'io_weight' in limits:
+        kwargs['blkio_weight'] = limits['io_weight']
+    return kwargs
@@ -0,0 +1,182 @@
+"""
+Logging Pipeline
+Queue-based logging with a background writer, JSON output and rate limiting
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.environ.get('OPENHOMESTACK_LOG_LEVEL', 'INFO').upper()
+
+# 'json' for one structured object per line, 'text' for the classic format
+LOG_FORMAT = os.environ.get('OPENHOMESTACK_LOG_FORMAT', 'json').lower()
+
+# Each message template may be logged this many times per window
+LOG_RATE_LIMIT = int(os.environ.get('OPENHOMESTACK_LOG_RATE_LIMIT', 10))
+LOG_RATE_WINDOW = float(os.environ.get('OPENHOMESTACK_LOG_RATE_WINDOW', 60))
+
+# Records waiting for the writer; beyond this they are dropped rather than blocking
+LOG_QUEUE_SIZE = 10000
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repeats of the same message template beyond a per-window budget
+
+    Records are keyed by logger and unformatted message, so
+    "Discovered service: %s" counts as one message whatever the service.
+    The first record after a window with drops carries a `suppressed` count.
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, window=LOG_RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        # Warnings and errors are never dropped
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                if suppressed:
+                    record.suppressed = suppressed
+                window_start, count, suppressed = now, 0, 0
+
+            if count >= self.limit:
+                self._windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, count + 1, suppressed)
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without formatting them
+
+    The stock QueueHandler formats the message in the calling thread so the
+    record can be pickled; our queue is in-process, so formatting (and the
+    write) is left entirely to the listener. A full queue drops the record
+    instead of blocking the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def _make_output_handler():
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'text':
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _start_listener():
+    global _listener
+    _listener = logging.handlers.QueueListener(_handler.queue, _make_output_handler(), respect_handler_level=False)
+    _listener.start()
+
+
+def _restart_in_child():
+    # The inherited queue's lock may have been held by the parent's writer
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _start_listener()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """
+    Route all logging through a queue drained by a background writer
+
+    Request threads only filter and enqueue records; formatting and the
+    write to stdout happen in the listener thread. Safe to call more than
+    once.
+    """
+    global _handler
+    if _handler is not None:
+        return
+
+    _handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _start_listener()
+    atexit.register(_stop_listener)
+    if hasattr(os, 'register_at_fork'):
+        # Pre-forking servers copy the handler but not the writer thread
+        os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def logging_stats():
+    """Queue depth and dropped record count of the logging pipeline"""
+    if _handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "format": LOG_FORMAT,
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped
+    }
@@ -0,0 +1,96 @@
+"""
+Log Policy
+Validation and translation of per-service container log rotation settings
+"""
+
+import os
+from api.limits import parse_memory
+
+# Supported policy keys (labels: openhomestack.logging.<key>)
+LOG_POLICY_KEYS = ('driver', 'max_size', 'max_file', 'compress')
+
+# Drivers that keep logs readable by `docker logs` and rotate them by size
+LOG_DRIVERS = ('json-file', 'local')
+
+# Applied to every service unless its labels or the API say otherwise
+DEFAULT_LOG_POLICY = {
+    'driver': os.environ.get('OPENHOMESTACK_LOG_DRIVER', 'json-file'),
+    'max_size': os.environ.get('OPENHOMESTACK_LOG_MAX_SIZE', '10m'),
+    'max_file': int(os.environ.get('OPENHOMESTACK_LOG_MAX_FILE', 3)),
+    'compress': os.environ.get('OPENHOMESTACK_LOG_COMPRESS', 'true').lower() in ('1', 'true', 'yes')
+}
+
+
+def _parse_bool(key, value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'on'):
+        return True
+    if text in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"Invalid {key} '{value}' (expected true or false)")
+
+
+def normalize_log_policy(policy):
+    """
+    Validate a log policy dict, dropping empty values
+
+    Args:
+        policy: Dict with any of driver, max_size, max_file, compress
+
+    Returns:
+        dict: Normalized policy (driver str, max_size str, max_file int, compress bool)
+
+    Raises:
+        ValueError: On unknown keys or invalid values
+    """
+    normalized = {}
+    for key, value in (policy or {}).items():
+        if key not in LOG_POLICY_KEYS:
+            raise ValueError(f"Unknown log setting '{key}' (expected one of {', '.join(LOG_POLICY_KEYS)})")
+        if value in (None, ''):
+            continue
+
+        if key == 'driver':
+            if value not in LOG_DRIVERS:
+                raise ValueError(f"Unsupported log driver '{value}' (expected one of {', '.join(LOG_DRIVERS)})")
+            normalized['driver'] = value
+        elif key == 'max_size':
+            if parse_memory(value) < 1024 ** 2:
+                raise ValueError("max_size must be at least 1m")
+            normalized['max_size'] = str(value).strip().lower()
+        elif key == 'max_file':
+            try:
+                max_file = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid max_file '{value}'")
+            if not 1 <= max_file <= 100:
+                raise ValueError("max_file must be between 1 and 100")
+            normalized['max_file'] = max_file
+        else:
+            normalized['compress'] = _parse_bool(key, value)
+    return normalized
+
+
+def compose_logging(policy):
+    """
+    Translate a complete normalized policy into a compose `logging` section
+
+    Options are strings, as the Docker API expects them.
+    """
+    options = {
+        'max-size': policy['max_size'],
+        'max-file': str(policy['max_file'])
+    }
+    if policy['driver'] == 'json-file':
+        options['compress'] = 'true' if policy['compress'] else 'false'
+    elif not policy['compress']:
+        # The local driver compresses rotated files unless told not to
+        options['compress'] = 'false'
+    return {'driver': policy['driver'], 'options': options}
+
+
+def max_log_bytes(policy):
+    """Upper bound on the log storage one container can use under a policy"""
+    return parse_memory(policy['max_size']) * policy['max_file']
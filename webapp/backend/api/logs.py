@@ -0,0 +1,283 @@
+"""
+Log Search
+Scans container log streams server-side and returns only matching lines
+"""
+
+import re
+import json
+import logging
+from collections import deque
+from api.containers import line_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Severity ranks used by the level filter
+LOG_LEVELS = {
+    'debug': 10,
+    'info': 20,
+    'warning': 30,
+    'error': 40,
+    'critical': 50
+}
+
+# Aliases seen in the logs of the bundled services
+_LEVEL_ALIASES = {
+    'warn': 'warning',
+    'err': 'error',
+    'crit': 'critical',
+    'fatal': 'critical',
+    'panic': 'critical'
+}
+
+_LEVEL_PATTERN = re.compile(
+    r'\b(debug|info|warn(?:ing)?|err(?:or)?|crit(?:ical)?|fatal|panic)\b',
+    re.IGNORECASE
+)
+
+# Hard caps so a single request stays bounded
+MAX_MATCHES = 1000
+MAX_CONTEXT = 10
+MAX_LINE_CHARS = 2000
+
+
+def detect_level(line):
+    """
+    Detect the log level of a line
+
+    Handles the common formats of the bundled services, e.g.
+    `ERROR (MainThread)` (Home Assistant) and `level=warn` (Grafana, Prometheus).
+
+    Args:
+        line: Log line
+
+    Returns:
+        str: Normalized level name or None
+    """
+    match = _LEVEL_PATTERN.search(line)
+    if not match:
+        return None
+    level = match.group(1).lower()
+    return _LEVEL_ALIASES.get(level, level)
+
+
+class LogSearcher:
+    """Streaming search over the log streams of a service's containers"""
+
+    def __init__(self, container_manager):
+        """
+        Initialize log searcher
+
+        Args:
+            container_manager: ContainerManager used to locate and stream containers
+        """
+        self.container_manager = container_manager
+
+    def search(self, service_id, query=None, regex=False, case_sensitive=False,
+               level=None, since=None, until=None, context=0, limit=100, timeout=30):
+        """
+        Search the logs of all containers of a service
+
+        Lines are streamed from `docker logs` one at a time; only the current
+        context window is held in memory and the scan stops as soon as `limit`
+        matches (plus their trailing context) have been collected.
+
+        Args:
+            service_id: Service identifier
+            query: Substring or regular expression to look for
+            regex: Treat query as a regular expression
+            case_sensitive: Match case sensitively
+            level: Minimum log level (debug, info, warning, error, critical)
+            since: Start of the time window (timestamp or relative, e.g. 1h)
+            until: End of the time window
+            context: Number of lines to include before and after each match
+            limit: Maximum number of matches to return
+            timeout: Seconds allowed per container scan
+
+        Returns:
+            dict: Matches and scan statistics
+
+        Raises:
+            ValueError: If the query or level is invalid
+        """
+        matcher, min_level = self._build_filters(query, regex, case_sensitive, level)
+
+        context = max(0, min(context, MAX_CONTEXT))
+        limit = max(1, min(limit, MAX_MATCHES))
+
+        container_names = self.container_manager.find_container_names(service_id)
+        host = self.container_manager.host_for(service_id)
+
+        matches = []
+        scanned = 0
+        for container_name in container_names:
+            if len(matches) >= limit:
+                break
+            scanned += self._scan_container(
+                container_name, matcher, min_level, since, until,
+                context, limit, matches, timeout, host
+            )
+
+        return {
+            "matches": matches,
+            "match_count": len(matches),
+            "limit_reached": len(matches) >= limit,
+            "lines_scanned": scanned,
+            "containers": container_names
+        }
+
+    def search_all(self, service_ids, query=None, regex=False, case_sensitive=False,
+                   level=None, since=None, until=None, context=0, limit=100, timeout=30):
+        """
+        Search the logs of several services, fanning out across Docker hosts
+
+        Each host's services are searched in its own worker, so a slow or
+        unreachable host only loses its own results.
+
+        Args:
+            service_ids: Services to search
+            Other arguments: as for search(); `limit` applies per service
+
+        Returns:
+            dict: Per-service results and per-host errors
+
+        Raises:
+            ValueError: If the query or level is invalid
+        """
+        # Fail fast on invalid filters instead of once per host
+        self._build_filters(query, regex, case_sensitive, level)
+
+        by_host = {}
+        for service_id in service_ids:
+            host = self.container_manager.host_for(service_id)
+            by_host.setdefault(host.name, (host, []))[1].append(service_id)
+
+        def search_host(host):
+            results = {}
+            for service_id in by_host[host.name][1]:
+                results[service_id] = self.search(
+                    service_id, query=query, regex=regex, case_sensitive=case_sensitive,
+                    level=level, since=since, until=until, context=context, limit=limit, timeout=timeout
+                )
+            return results
+
+        # Identical concurrent searches share one call per host, so the name covers every argument
+        name = 'log-search:' + json.dumps([
+            query, regex, case_sensitive, level, since, until, context, limit,
+            {host_name: ids for host_name, (_, ids) in sorted(by_host.items())}
+        ])
+        answers = self.container_manager.hosts.fan_out(
+            name, search_host, hosts=[host for host, _ in by_host.values()], timeout=timeout
+        )
+
+        services, host_errors = {}, {}
+        for name, answer in answers.items():
+            if answer['ok']:
+                services.update(answer['result'])
+            else:
+                host_errors[name] = answer['error']
+        return {
+            "services": services,
+            "match_count": sum(r['match_count'] for r in services.values()),
+            "host_errors": host_errors
+        }
+
+    def _scan_container(self, container_name, matcher, min_level, since, until,
+                        context, limit, matches, timeout, host=None):
+        """
+        Scan one container's log stream, appending matches in place
+
+        Returns:
+            int: Number of lines scanned
+        """
+        before = deque(maxlen=context)
+        pending = []  # matches still collecting trailing context
+        scanned = 0
+
+        with self.container_manager.log_stream(
+                container_name, since=since, until=until, timeout=timeout, host=host) as stream:
+            for raw in stream:
+                scanned += 1
+                line = raw.rstrip('\n')[:MAX_LINE_CHARS]
+
+                for entry in pending:
+                    entry['after'].append(line)
+                pending = [e for e in pending if len(e['after']) < context]
+
+                if len(matches) >= limit:
+                    if not pending:
+                        break
+                    continue
+
+                if self._line_matches(line, matcher, min_level):
+                    ts = line_timestamp(line)
+                    entry = {
+                        "container": container_name,
+                        "timestamp": ts,
+                        "level": detect_level(line),
+                        "line": line,
+                        "before": list(before),
+                        "after": []
+                    }
+                    matches.append(entry)
+                    if context:
+                        pending.append(entry)
+
+                before.append(line)
+
+        return scanned
+
+    def _build_filters(self, query, regex, case_sensitive, level):
+        """
+        Validate the query and level filter
+
+        Returns:
+            tuple: (matcher or None, minimum level rank or None)
+
+        Raises:
+            ValueError: If the query or level is invalid, or neither is given
+        """
+        matcher = self._build_matcher(query, regex, case_sensitive)
+        min_level = None
+        if level:
+            level = _LEVEL_ALIASES.get(level.lower(), level.lower())
+            if level not in LOG_LEVELS:
+                raise ValueError(f"Unknown log level '{level}'")
+            min_level = LOG_LEVELS[level]
+        if matcher is None and min_level is None:
+            raise ValueError("A query or a level filter is required")
+        return matcher, min_level
+
+    def _line_matches(self, line, matcher, min_level):
+        """Check a line against the query and level filter"""
+        if min_level is not None:
+            level = detect_level(line)
+            if level is None or LOG_LEVELS[level] < min_level:
+                return False
+        if matcher is not None and not matcher(line):
+            return False
+        return True
+
+    def _build_matcher(self, query, regex, case_sensitive):
+        """
+        Build a predicate for the query
+
+        Returns:
+            callable: Predicate taking a line, or None when there is no query
+
+        Raises:
+            ValueError: If the regular expression is invalid
+        """
+        if not query:
+            return None
+
+        if regex:
+            try:
+                pattern = re.compile(query, 0 if case_sensitive else re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}")
+            return lambda line: pattern.search(line) is not None
+
+        if case_sensitive:
+            return lambda line: query in line
+        folded = query.casefold()
+        return lambda line: folded in line.casefold()
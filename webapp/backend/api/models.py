@@ -0,0 +1,175 @@
+"""
+Service Models
+Compact service descriptors and the immutable catalog snapshot they live in
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import NamedTuple
+from api.responses import encode_json, body_digest
+
+
+class InstallPrompt(NamedTuple):
+    """A value asked for at install time (openhomestack.install.prompt.<key>)"""
+    key: str
+    label: str
+    env_var: str
+
+
+class ServiceDescriptor(Mapping):
+    """
+    One catalog service, parsed from its compose labels
+
+    Slotted and read-only: limits and logging are kept as tuples of pairs,
+    install prompts as InstallPrompt tuples and labels outside the known set
+    in `extra`. Reading it as a mapping (service['url'], service.get(...),
+    dict(service)) gives the same shape the API has always returned, so
+    callers that treated services as dicts keep working.
+    """
+
+    __slots__ = (
+        'id', 'name', 'description', 'icon', 'category', 'url', 'service', 'host', 'dns',
+        'requires', 'install_prompts', 'limits', 'logging', 'compose_file', 'service_dir',
+        'readme', 'extra'
+    )
+
+    # Only present in the mapping when set, as before
+    _OPTIONAL = frozenset(('service', 'readme'))
+
+    def __init__(self, id, name='', description='', icon='box', category='other', url=None,
+                 service=None, host=None, dns=None, requires=(), install_prompts=(), limits=(),
+                 logging=(), compose_file=None, service_dir=None, readme=None, extra=()):
+        set_field = object.__setattr__
+        set_field(self, 'id', id)
+        set_field(self, 'name', name)
+        set_field(self, 'description', description)
+        # Icons, categories and host labels repeat across the catalog; share one string each
+        set_field(self, 'icon', sys.intern(icon))
+        set_field(self, 'category', sys.intern(category))
+        set_field(self, 'url', url)
+        set_field(self, 'service', service)
+        set_field(self, 'host', sys.intern(host) if host else host)
+        set_field(self, 'dns', dns)
+        set_field(self, 'requires', tuple(requires))
+        set_field(self, 'install_prompts', tuple(InstallPrompt(*prompt) for prompt in install_prompts))
+        set_field(self, 'limits', tuple(dict(limits).items()))
+        set_field(self, 'logging', tuple(dict(logging).items()))
+        set_field(self, 'compose_file', compose_file)
+        set_field(self, 'service_dir', service_dir)
+        set_field(self, 'readme', readme)
+        set_field(self, 'extra', tuple(dict(extra).items()))
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """
+        Build a descriptor from parsed label metadata
+
+        Args:
+            metadata: Dict from ServiceManager._parse_labels() plus id,
+                compose_file, service_dir and readme
+
+        Returns:
+            ServiceDescriptor
+        """
+        fields = dict(metadata)
+        fields['install_prompts'] = [
+            (prompt['key'], prompt['label'], prompt['env_var']) for prompt in fields.get('install_prompts', [])
+        ]
+        extra = {key: fields.pop(key) for key in list(fields) if key not in cls.__slots__}
+        return cls(extra=extra, **fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key):
+        if key in self._OPTIONAL:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if key == 'install_prompts':
+            return [prompt._asdict() for prompt in self.install_prompts]
+        if key in ('limits', 'logging'):
+            return dict(getattr(self, key))
+        if key in self.__slots__ and key != 'extra':
+            return getattr(self, key)
+        for extra_key, value in self.extra:
+            if extra_key == key:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self.__slots__:
+            if key == 'extra' or (key in self._OPTIONAL and getattr(self, key) is None):
+                continue
+            yield key
+        for key, _ in self.extra:
+            yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def _values(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, ServiceDescriptor):
+            return self._values() == other._values()
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __reduce__(self):
+        return (_restore_descriptor, (self._values(),))
+
+    def __repr__(self):
+        return f"ServiceDescriptor({self.id!r})"
+
+    def to_dict(self):
+        """The service as a plain dict, as returned by the API"""
+        return dict(self)
+
+
+def _restore_descriptor(values):
+    return ServiceDescriptor(**dict(zip(ServiceDescriptor.__slots__, values)))
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog with its listing body encoded once
+
+    GET /api/services returns `body` as is, with `digest` as its ETag, so
+    serving the listing neither rebuilds nor re-encodes anything.
+    """
+
+    __slots__ = ('services', 'by_id', 'body', 'digest')
+
+    def __init__(self, services):
+        """
+        Args:
+            services: ServiceDescriptors, in listing order
+        """
+        services = tuple(services)
+        body = encode_json({"success": True, "count": len(services), "services": services})
+        set_field = object.__setattr__
+        set_field(self, 'services', services)
+        set_field(self, 'by_id', {service.id: service for service in services})
+        set_field(self, 'body', body)
+        set_field(self, 'digest', body_digest(body))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CatalogSnapshot is read-only")
+
+    def get(self, service_id):
+        """Descriptor of a service, or None"""
+        return self.by_id.get(service_id)
+
+    def __iter__(self):
+        return iter(self.services)
+
+    def __len__(self):
+        return len(self.services)
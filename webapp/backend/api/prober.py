@@ -0,0 +1,171 @@
+"""
+Endpoint Probing
+Background reachability and latency checks of each service's web URL
+"""
+
+import os
+import time
+import threading
+import logging
+import urllib.request
+import urllib.error
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from api.stats import summarize
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = float(os.environ.get('OPENHOMESTACK_PROBE_INTERVAL', 15))
+PROBE_TIMEOUT = float(os.environ.get('OPENHOMESTACK_PROBE_TIMEOUT', 3))
+
+# Number of recent latency samples kept per service
+PROBE_WINDOW = 50
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Treat redirects as an answer instead of following them"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def check_url(url, timeout=PROBE_TIMEOUT):
+    """
+    Send a single GET request and measure how long the app takes to answer
+
+    Any HTTP response below 500 (including redirects and auth challenges)
+    counts as the application being up.
+
+    Args:
+        url: URL to check
+        timeout: Socket timeout in seconds
+
+    Returns:
+        dict: up flag, latency in ms, HTTP status code and error
+    """
+    started = time.perf_counter()
+    try:
+        with _opener.open(urllib.request.Request(url, method='GET'), timeout=timeout) as response:
+            code = response.status
+    except urllib.error.HTTPError as e:
+        code = e.code
+    except Exception as e:
+        return {
+            "up": False,
+            "latency_ms": None,
+            "status_code": None,
+            "error": str(getattr(e, 'reason', e))
+        }
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {
+        "up": code < 500,
+        "latency_ms": round(latency_ms, 2),
+        "status_code": code,
+        "error": None if code < 500 else f"HTTP {code}"
+    }
+
+
+class EndpointProber:
+    """Concurrently probes service URLs in the background and caches results"""
+
+    def __init__(self, targets_fn, interval=PROBE_INTERVAL, timeout=PROBE_TIMEOUT, max_workers=8):
+        """
+        Initialize endpoint prober
+
+        Args:
+            targets_fn: Callable returning a list of (service_id, url) to probe
+            interval: Seconds between probe rounds
+            timeout: Per-probe timeout in seconds
+            max_workers: Maximum number of concurrent probes
+        """
+        self.targets_fn = targets_fn
+        self.interval = interval
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prober')
+        self._lock = threading.Lock()
+        self._results = {}
+        self._latencies = {}
+        self._in_flight = set()
+        self._thread = None
+
+    def start(self):
+        """Start the background probe loop (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='endpoint-prober', daemon=True)
+            self._thread.start()
+        logger.info("Endpoint prober started")
+
+    def _run(self):
+        """Probe loop"""
+        while True:
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.error("Endpoint probe round failed: %s", e)
+            time.sleep(self.interval)
+
+    def probe_all(self):
+        """
+        Submit one probe per target without waiting for them
+
+        A service whose previous probe is still running (e.g. a hung Plex) is
+        skipped, so a slow endpoint never piles up threads or delays others.
+        """
+        targets = self.targets_fn()
+        active = {service_id for service_id, _ in targets}
+
+        with self._lock:
+            # Forget services that are no longer installed or running
+            for service_id in list(self._results):
+                if service_id not in active:
+                    self._results.pop(service_id, None)
+                    self._latencies.pop(service_id, None)
+
+            for service_id, url in targets:
+                if service_id in self._in_flight:
+                    continue
+                self._in_flight.add(service_id)
+                self._executor.submit(self._probe, service_id, url)
+
+    def _probe(self, service_id, url):
+        """Run one probe and record its result"""
+        try:
+            result = check_url(url, self.timeout)
+        except Exception as e:
+            result = {"up": False, "latency_ms": None, "status_code": None, "error": str(e)}
+
+        with self._lock:
+            self._in_flight.discard(service_id)
+            latencies = self._latencies.setdefault(service_id, deque(maxlen=PROBE_WINDOW))
+            if result['latency_ms'] is not None:
+                latencies.append(result['latency_ms'])
+
+            previous = self._results.get(service_id, {})
+            failures = 0 if result['up'] else previous.get('consecutive_failures', 0) + 1
+
+            self._results[service_id] = {
+                "state": "up" if result['up'] else "down",
+                "url": url,
+                "checked_at": time.time(),
+                "latency_ms": result['latency_ms'],
+                "status_code": result['status_code'],
+                "error": result['error'],
+                "consecutive_failures": failures,
+                "latency": summarize(latencies)
+            }
+
+    def results(self):
+        """
+        Get the cached probe results
+
+        Returns:
+            dict: service_id -> reachability state and latency percentiles
+        """
+        with self._lock:
+            return {service_id: dict(result) for service_id, result in self._results.items()}
@@ -0,0 +1,321 @@
+"""
+Readiness
+Waits for a service to be ready, driven by Docker container events
+"""
+
+import os
+import time
+import queue
+import threading
+import logging
+from api.journal import operation_journal
+from api.prober import check_url
+from api.runner import remaining
+
+logger = logging.getLogger(__name__)
+
+# Longest a wait may take (also bounded by the request deadline)
+READY_TIMEOUT = float(os.environ.get('OPENHOMESTACK_READY_TIMEOUT', 180))
+
+# Backoff between checks of a service URL once its containers are ready
+URL_PROBE_MIN_INTERVAL = 0.25
+URL_PROBE_MAX_INTERVAL = 2.0
+
+# Containers are re-inspected at least this often, in case an event was missed
+# while the event stream reconnected
+RECHECK_INTERVAL = 10.0
+
+# Without the Docker SDK there are no events, only status polling
+POLL_INTERVAL = 1.0
+
+
+def health_from_status(status_text):
+    """
+    Healthcheck state from a `docker ps` status ("Up 5 minutes (healthy)" -> "healthy")
+
+    The one parser of Docker's status text for health; boot, updates and the
+    state tracker all go through it.
+
+    Returns:
+        str: 'healthy', 'unhealthy' or 'starting', or None without a healthcheck
+    """
+    text = (status_text or '').lower()
+    if 'unhealthy' in text:
+        return 'unhealthy'
+    if 'health: starting' in text:
+        return 'starting'
+    if 'healthy' in text:
+        return 'healthy'
+    return None
+
+
+def container_ready(state, health):
+    """Whether one container is running and, if it has a healthcheck, healthy"""
+    return state == 'running' and health in (None, 'healthy')
+
+
+def containers_ready(status):
+    """
+    Whether every container of a service is ready
+
+    Args:
+        status: Status dict from ContainerManager.get_status()
+
+    Returns:
+        bool: True when all containers are running and healthy
+    """
+    containers = status.get('containers') or [status]
+    return all(
+        container_ready(container.get('state'), health_from_status(container.get('status_text')))
+        for container in containers
+    )
+
+
+class ContainerEventWatcher:
+    """
+    Streams container events of one Docker host to listeners
+
+    One long-lived `docker events` connection per host serves every waiter
+    of the process. It runs while there are listeners and reconnects with
+    backoff if the stream breaks.
+    """
+
+    def __init__(self, host):
+        """
+        Args:
+            host: DockerHost to watch
+        """
+        self.host = host
+        self._listeners = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stream = None
+        self._closed = False
+
+    def add_listener(self, listener):
+        """Call listener(service_id, event) for every container event of an openHomeStack service"""
+        with self._lock:
+            self._listeners.add(listener)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name=f'docker-events-{self.host.name}', daemon=True
+                )
+                self._thread.start()
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners.discard(listener)
+            if not self._listeners and self._stream is not None:
+                # Unblocks the reader, which then exits
+                self._closed = True
+                try:
+                    self._stream.close()
+                except Exception:
+                    pass
+
+    def _loop(self):
+        backoff = 1
+        while True:
+            with self._lock:
+                if not self._listeners:
+                    self._thread = None
+                    return
+            try:
+                client = self.host.client()
+                if client is None:
+                    raise ConnectionError("Docker client not available")
+                stream = client.events(decode=True, filters={'type': 'container', 'label': 'openhomestack.service'})
+                with self._lock:
+                    self._stream = stream
+                backoff = 1
+                for event in stream:
+                    service_id = (event.get('Actor', {}).get('Attributes') or {}).get('openhomestack.service')
+                    with self._lock:
+                        listeners = list(self._listeners)
+                    for listener in listeners:
+                        listener(service_id, event)
+            except Exception as e:
+                with self._lock:
+                    closed, self._closed = self._closed, False
+                if closed:
+                    continue
+                logger.warning("Docker event stream of %s broke: %s", self.host.name, e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                with self._lock:
+                    self._stream = None
+
+
+class ReadinessWaiter:
+    """
+    Waits until every container of a service is running and healthy and its
+    URL answers
+
+    Containers are re-inspected whenever Docker reports an event for one of
+    them (start, die, health_status, ...), so a wait costs nothing while
+    nothing happens. Only the URL check, which has no events, is retried
+    with exponential backoff once the containers are ready.
+    """
+
+    def __init__(self, service_manager, container_manager, timeout=READY_TIMEOUT):
+        """
+        Initialize readiness waiter
+
+        Args:
+            service_manager: ServiceManager used for service URLs
+            container_manager: ContainerManager used to reach the Docker hosts
+            timeout: Default longest wait in seconds
+        """
+        self.service_manager = service_manager
+        self.container_manager = container_manager
+        self.timeout = timeout
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def _watcher(self, host):
+        with self._lock:
+            if host.name not in self._watchers:
+                self._watchers[host.name] = ContainerEventWatcher(host)
+            return self._watchers[host.name]
+
+    def _containers(self, service_id):
+        """Per-container state and health via the Docker API (None if unavailable)"""
+        client = self.container_manager.client_for(service_id)
+        if client is None:
+            return None
+        containers = client.containers.list(all=True, filters={'label': f'openhomestack.service={service_id}'})
+        return [
+            {
+                "name": c.name,
+                "state": c.attrs['State']['Status'],
+                "health": (c.attrs['State'].get('Health') or {}).get('Status')
+            }
+            for c in containers
+        ]
+
+    def _poll_containers(self, service_id):
+        """Container states from `docker ps`, for hosts without the Docker SDK"""
+        status = self.container_manager.get_status(service_id, fresh=True)
+        if status.get('state') in ('not_installed', 'error', 'unknown'):
+            return []
+        return [
+            {"name": c.get('name'), "state": c.get('state'), "health": health_from_status(c.get('status_text'))}
+            for c in (status.get('containers') or [status])
+        ]
+
+    def watch(self, service_id, timeout=None, started=None):
+        """
+        Follow a service until it is ready or the timeout elapses
+
+        Args:
+            service_id: Service identifier
+            timeout: Longest wait in seconds (default: configured), further
+                bounded by the request deadline
+            started: time.monotonic() when the action being waited for began
+                (default: now); time to ready is measured from it
+
+        Yields:
+            dict: {"type": "containers", "containers": [...]} whenever a
+                container's state or health changes, {"type": "url", ...}
+                when the URL is first checked, and finally {"type": "ready"}
+                or {"type": "timeout"} with the result
+        """
+        started = time.monotonic() if started is None else started
+        started_at = time.time() - (time.monotonic() - started)
+        deadline = time.monotonic() + remaining(self.timeout if timeout is None else timeout)
+        url = (self.service_manager.get_service(service_id) or {}).get('url')
+
+        wake = queue.Queue()
+
+        def listener(event_service, event):
+            if event_service == service_id:
+                wake.put(event.get('Action'))
+
+        watcher = None
+        if self.container_manager.client_for(service_id) is not None:
+            watcher = self._watcher(self.container_manager.host_for(service_id))
+            # Listen before the first inspection, so no event can slip in between
+            watcher.add_listener(listener)
+
+        containers, url_up, url_checked = None, None, False
+        url_interval = URL_PROBE_MIN_INTERVAL
+        try:
+            while True:
+                try:
+                    current = self._containers(service_id) if watcher else self._poll_containers(service_id)
+                except Exception as e:
+                    # A daemon hiccup is not a verdict; keep waiting until the deadline
+                    logger.warning("Could not inspect %s while waiting for readiness: %s", service_id, e)
+                    current = containers
+                if current != containers:
+                    containers = current
+                    yield {"type": "containers", "containers": containers}
+
+                containers_up = bool(containers) and all(
+                    container_ready(c['state'], c['health']) for c in containers
+                )
+                if containers_up and url:
+                    url_up = check_url(url)['up']
+                    if not url_checked:
+                        url_checked = True
+                        yield {"type": "url", "url": url, "up": url_up}
+                if containers_up and (not url or url_up):
+                    break
+
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                if not watcher:
+                    wait = POLL_INTERVAL
+                elif containers_up:
+                    # Waiting on the URL: back off, but still react to container events
+                    wait = url_interval
+                    url_interval = min(url_interval * 2, URL_PROBE_MAX_INTERVAL)
+                else:
+                    wait = RECHECK_INTERVAL
+                try:
+                    wake.get(timeout=min(wait, left))
+                    # Several events often arrive together; inspect once for all of them
+                    while True:
+                        wake.get_nowait()
+                except queue.Empty:
+                    pass
+        finally:
+            if watcher:
+                watcher.remove_listener(listener)
+
+        ready = containers_up and (not url or url_up)
+        elapsed = round(time.monotonic() - started, 2)
+        result = {
+            "type": "ready" if ready else "timeout",
+            "service_id": service_id,
+            "ready": ready,
+            "time_to_ready_s": elapsed if ready else None,
+            "waited_s": elapsed,
+            "containers": containers or [],
+            "url": url,
+            "url_up": url_up
+        }
+        if not ready:
+            waiting_on = "URL" if containers_up else "containers"
+            result['error'] = f"Not ready after {elapsed:.0f}s (waiting on {waiting_on})"
+
+        operation_journal.record(
+            service_id, 'ready', started_at, exit_code=0 if ready else 1,
+            output=f"Ready in {elapsed}s" if ready else result['error'], timed_out=not ready
+        )
+        logger.info("%s %s after %.1fs", service_id, "ready" if ready else "not ready", elapsed)
+        yield result
+
+    def wait(self, service_id, timeout=None, started=None):
+        """
+        Block until a service is ready or the timeout elapses
+
+        Returns:
+            dict: The final result of watch()
+        """
+        update = None
+        for update in self.watch(service_id, timeout=timeout, started=started):
+            pass
+        return update
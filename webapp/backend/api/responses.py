@@ -0,0 +1,174 @@
+"""
+Response Encoding
+JSON serialization, content-encoding negotiation and encoded body caching
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from flask import Response, request
+
+# Optional fast JSON encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional brotli support
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get('OPENHOMESTACK_COMPRESS_MIN_BYTES', 1024))
+
+# Bounds for the compressed body cache
+ENCODED_CACHE_ENTRIES = 128
+ENCODED_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def _encode_default(value):
+    """Encode read-only mappings (e.g. ServiceDescriptor) as objects and anything else as text"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def encode_json(payload):
+    """
+    Serialize a payload to JSON bytes
+
+    Uses orjson when installed and falls back to the standard library encoder.
+
+    Args:
+        payload: JSON-serializable object
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=_encode_default).encode('utf-8')
+
+
+class EncodedBodyCache:
+    """Small LRU cache of compressed bodies keyed by body digest and encoding"""
+
+    def __init__(self, max_entries=ENCODED_CACHE_ENTRIES, max_bytes=ENCODED_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_encoded_cache = EncodedBodyCache()
+
+
+def _negotiate_encoding():
+    """Pick the best supported content-encoding from Accept-Encoding"""
+    accept = request.accept_encodings
+    candidates = []
+    if brotli is not None and accept['br']:
+        candidates.append((accept['br'], 2, 'br'))
+    if accept['gzip']:
+        candidates.append((accept['gzip'], 1, 'gzip'))
+    if not candidates:
+        return None
+    return max(candidates)[2]
+
+
+def _compress(body, encoding):
+    """Compress a body with the given content-encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def body_digest(body):
+    """Return a short content digest used for ETags and cache keys"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def bytes_response(body, status=200, digest=None, mimetype='application/json'):
+    """
+    Build a response from an already encoded body
+
+    Adds an ETag, answers conditional GETs with 304 and applies gzip or
+    brotli content-encoding above COMPRESS_MIN_BYTES. Compressed bodies are
+    cached by digest, so unchanged payloads are only compressed once.
+
+    Args:
+        body: Encoded response body
+        status: HTTP status code
+        digest: Precomputed body digest (computed when omitted)
+        mimetype: Response mimetype
+
+    Returns:
+        Response: Flask response
+    """
+    digest = digest or body_digest(body)
+    etag = f'"{digest}"'
+    headers = {'Vary': 'Accept-Encoding'}
+
+    if status == 200 and request.method in ('GET', 'HEAD'):
+        headers['ETag'] = etag
+        if request.if_none_match.contains(digest):
+            return Response(status=304, headers=headers)
+
+    encoding = _negotiate_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        key = (digest, encoding)
+        compressed = _encoded_cache.get(key)
+        if compressed is None:
+            compressed = _compress(body, encoding)
+            _encoded_cache.put(key, compressed)
+        if len(compressed) < len(body):
+            body = compressed
+            headers['Content-Encoding'] = encoding
+
+    return Response(body, status=status, mimetype=mimetype, headers=headers)
+
+
+def json_response(payload, status=200):
+    """
+    Build a JSON response using the fast encoder and compression pipeline
+
+    Args:
+        payload: JSON-serializable object
+        status: HTTP status code
+
+    Returns:
+        Response: Flask response
+    """
+    return bytes_response(encode_json(payload), status=status)
@@ -3,20 +3,301 @@ API Routes
 Defines all REST endpoints for service management
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, g, request, stream_with_context
 from api.services import ServiceManager
 from api.containers import ContainerManager
 from api.system import SystemMonitor
+from api.logs import LogSearcher
+from api.snapshots import SnapshotManager
+from api.responses import json_response, bytes_response
+from api.collector import StateCollector
+from api.prober import EndpointProber
+from api.boot import BootOrchestrator, BOOT_ON_START
+from api.updates import ImageUpdater
+from api.journal import operation_journal
+from api.hosts import host_registry
+from api.state import StateTracker, build_entries, state_delta
+from api.alerts import AlertEngine, EventSink
+from api.dnsbench import DnsBenchmark
+from api.gc import GarbageCollector
+from api.events import event_bus, stream_events, format_sse
+from api.readiness import ReadinessWaiter
+from api.runner import command_runner, set_deadline, reset_deadline, READ_DEADLINE, WRITE_DEADLINE
+from api.startup import LazyInstance
+import os
+import time
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
 
-# Initialize managers
-service_manager = ServiceManager()
-container_manager = ContainerManager()
-system_monitor = SystemMonitor()
+# Managers are built on first use so importing this module stays cheap
+service_manager = LazyInstance(ServiceManager)
+container_manager = LazyInstance(ContainerManager)
+
+
+def _build_system_monitor():
+    monitor = SystemMonitor()
+    # The latest DNS benchmark figures are part of every system sample, so their
+    # history sits next to CPU and I/O (and alert rules can use them)
+    monitor.add_metrics('dns', lambda: dns_benchmark.latest_metrics())
+    return monitor
+
+
+system_monitor = LazyInstance(_build_system_monitor)
+log_searcher = LazyInstance(lambda: LogSearcher(container_manager))
+snapshot_manager = LazyInstance(lambda: SnapshotManager(service_manager, container_manager))
+boot_orchestrator = LazyInstance(lambda: BootOrchestrator(service_manager, container_manager, readiness_waiter))
+image_updater = LazyInstance(lambda: ImageUpdater(service_manager, container_manager, readiness_waiter))
+dns_benchmark = LazyInstance(lambda: DnsBenchmark(service_manager, container_manager))
+garbage_collector = LazyInstance(lambda: GarbageCollector(service_manager, container_manager))
+readiness_waiter = LazyInstance(lambda: ReadinessWaiter(service_manager, container_manager))
+
+
+def _build_alert_engine():
+    engine = AlertEngine()
+    engine.add_sink(EventSink(event_bus))
+    return engine
+
+
+alert_engine = LazyInstance(_build_alert_engine)
+
+
+def _collect_statuses():
+    """Collect container status for every discovered service, one query per host"""
+    statuses = container_manager.get_all_statuses(
+        [service['id'] for service in service_manager.discover_services()]
+    )
+    if alert_engine.started:
+        alert_engine.observe_states(statuses)
+    return statuses
+
+
+def _probe_targets():
+    """URLs of installed, running services for the endpoint prober"""
+    services = collector.get('services') or service_manager.discover_services()
+    statuses = collector.get('statuses') or {}
+    targets = []
+    for service in services:
+        if not service.get('url'):
+            continue
+        status = statuses.get(service['id']) or container_manager.get_status(service['id'])
+        if status.get('state') == 'running':
+            targets.append((service['id'], service['url']))
+    return targets
+
+
+endpoint_prober = EndpointProber(_probe_targets)
+
+# Shared collector: one process polls Docker and psutil for all workers
+collector = StateCollector()
+# Registered as lambdas: a bound method would be resolved through the LazyInstance
+# proxies and build every manager at import time
+collector.register('services', lambda: service_manager.discover_services())
+collector.register('statuses', _collect_statuses)
+collector.register('system', lambda: system_monitor.get_system_info())
+# Up to OPENHOMESTACK_SYSTEM_HISTORY_SIZE samples: kept out of the snapshot every worker parses
+collector.register('system_history', lambda: system_monitor.history(), separate=True)
+collector.register('resources', lambda: container_manager.get_all_resource_usage())
+collector.register('reachability', endpoint_prober.results)
+collector.register('alerts', lambda: alert_engine.active() if alert_engine.started else [])
+collector.register('events', lambda: event_bus.recent())
+collector.on_leader(endpoint_prober.start)
+collector.on_leader(lambda: system_monitor.start_sampler())
+collector.on_leader(lambda: dns_benchmark.start_schedule())
+collector.on_leader(lambda: garbage_collector.start_schedule())
+
+
+def start_alerts():
+    """Evaluate alert rules in the process that owns background collection"""
+    if collector.enabled and not collector.is_leader:
+        return
+    alert_engine.start()
+    system_monitor.add_listener(alert_engine.observe_metrics)
+    system_monitor.start_sampler()
+
+
+collector.on_leader(start_alerts)
+
+_relay_lock = threading.Lock()
+_relay_pid = None
+
+
+def _relay_events_once(last_id):
+    """Copy the leader's new events into this worker's bus; returns the last ID seen"""
+    for event in (collector.get_sections(fresh=False) or {}).get('events') or []:
+        if event['id'] > last_id:
+            event_bus.publish(event['type'], event['data'], event_id=event['id'], ts=event['ts'])
+            last_id = event['id']
+    return last_id
+
+
+def _ensure_event_relay():
+    """
+    Events are published by the collector leader; other workers relay them
+    from the shared snapshot so their SSE clients see the same stream
+    """
+    global _relay_pid
+    if not collector.enabled or collector.is_leader or _relay_pid == os.getpid():
+        return
+    with _relay_lock:
+        if _relay_pid == os.getpid():
+            return
+        _relay_pid = os.getpid()
+        # The first pass runs inline so already-published events are history,
+        # not news, for the client that triggered the relay
+        last_id = _relay_events_once(0)
+
+    def relay(last_id):
+        while not collector.is_leader:
+            time.sleep(1)
+            try:
+                last_id = _relay_events_once(last_id)
+            except Exception as e:
+                logger.error("Event relay failed: %s", e)
+
+    threading.Thread(target=relay, args=(last_id,), name='event-relay', daemon=True).start()
+
+# Versioned change log of the service table, kept by the collector leader
+state_tracker = StateTracker()
+
+
+def _track_state(sections):
+    """Derive the state version from the services and statuses just collected"""
+    if 'services' not in sections or 'statuses' not in sections:
+        return state_tracker.export()
+    return state_tracker.track(
+        build_entries(sections['services'], sections['statuses'], sections.get('reachability'))
+    )
+
+
+def _restore_state():
+    """Continue the previous leader's version sequence"""
+    state_tracker.restore((collector.get_sections(fresh=False) or {}).get('state'))
+
+
+collector.register_derived('state', _track_state)
+collector.on_leader(_restore_state)
+
+
+def boot_on_start():
+    """Bring the stack up once after the API starts (OPENHOMESTACK_BOOT_ON_START)"""
+    if not BOOT_ON_START or boot_orchestrator.status() is not None:
+        return
+    # With several workers only the collector leader boots the stack
+    if collector.enabled and not collector.is_leader:
+        return
+    try:
+        boot_orchestrator.start()
+    except (RuntimeError, ValueError) as e:
+        logger.warning("Boot on start skipped: %s", e)
+
+
+collector.on_leader(boot_on_start)
+
+
+def _get_reachability():
+    """Cached probe results, from the leader's snapshot when shared"""
+    if not collector.enabled:
+        endpoint_prober.start()
+        return endpoint_prober.results()
+    return collector.get('reachability') or {}
+
+
+def _get_status(service_id):
+    """Status from the shared snapshot, falling back to a direct query"""
+    statuses = collector.get('statuses')
+    if statuses is not None and service_id in statuses:
+        status = dict(statuses[service_id])
+    else:
+        status = dict(container_manager.get_status(service_id))
+
+    reachability = _get_reachability().get(service_id)
+    if reachability:
+        status['reachability'] = reachability
+    return status
+
+
+@api_bp.before_request
+def _start_deadline():
+    """
+    Give every request a time budget that docker commands it runs must fit in
+    Clients can shorten it with an X-Request-Timeout header (seconds)
+    """
+    budget = READ_DEADLINE if request.method in ('GET', 'HEAD') else WRITE_DEADLINE
+    try:
+        requested = float(request.headers.get('X-Request-Timeout', 0))
+    except ValueError:
+        requested = 0
+    if requested > 0:
+        budget = min(budget, requested)
+    g.deadline_token = set_deadline(budget)
+
+
+@api_bp.teardown_request
+def _end_deadline(exc):
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        reset_deadline(token)
+
+
+def _run_with_readiness(service_id, action, status_for):
+    """
+    Run a lifecycle action, optionally waiting until the service is ready
+
+    Query params: wait ("ready" responds once the service is ready, "stream"
+    sends progress as server-sent events), timeout (longest wait in seconds)
+
+    Args:
+        service_id: Service identifier
+        action: Callable running the action and returning its result dict
+        status_for: Callable mapping the result to the HTTP status
+
+    Raises:
+        ValueError: On an unknown wait mode
+    """
+    wait = request.args.get('wait') or None
+    if wait not in (None, 'ready', 'stream'):
+        raise ValueError(f"Unknown wait mode '{wait}' (expected ready or stream)")
+    timeout = request.args.get('timeout', type=float)
+    started = time.monotonic()
+
+    if wait == 'stream':
+        def generate():
+            sequence = 0
+
+            def frame(event_type, data):
+                nonlocal sequence
+                sequence += 1
+                return format_sse({"id": sequence, "type": event_type, "ts": time.time(), "data": data})
+
+            try:
+                result = action()
+                collector.request_refresh()
+                yield frame('result', result)
+                if not result['success']:
+                    return
+                for update in readiness_waiter.watch(service_id, timeout=timeout, started=started):
+                    yield frame(update['type'], update)
+                collector.request_refresh()
+            except Exception as e:
+                logger.error("Error while streaming readiness of %s: %s", service_id, e)
+                yield frame('error', {"success": False, "error": str(e)})
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    result = action()
+    collector.request_refresh()
+    if wait == 'ready' and result['success']:
+        result['readiness'] = readiness_waiter.wait(service_id, timeout=timeout, started=started)
+        collector.request_refresh()
+    return json_response(result, status_for(result))
 
 
 # ==================== Service Discovery ====================
@@ -25,21 +306,51 @@ system_monitor = SystemMonitor()
 def get_services():
     """
     Get list of all available services
-    Returns service metadata from docker-compose labels
+    Returns service metadata from docker-compose labels, encoded once per catalog change
     """
     try:
-        services = service_manager.discover_services()
-        return jsonify({
-            "success": True,
-            "count": len(services),
-            "services": services
-        })
+        # The leader's catalog when it is current, as for /state; otherwise scan here
+        published = collector.get('services')
+        if published is None:
+            catalog = service_manager.catalog()
+        else:
+            catalog = service_manager.catalog_from(published)
+        return bytes_response(catalog.body, digest=catalog.digest)
     except Exception as e:
-        logger.error(f"Error discovering services: {e}")
-        return jsonify({
+        logger.error("Error discovering services: %s", e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+
+
+@api_bp.route('/state', methods=['GET'])
+def get_state():
+    """
+    Get the service table as a delta against a version the client already has
+    Query params: since (version from the previous response; omit for a full snapshot)
+    """
+    try:
+        since = request.args.get('since', type=int)
+        sections = collector.get_sections()
+        if sections and all(name in sections for name in ('services', 'statuses', 'state')):
+            entries = build_entries(sections['services'], sections['statuses'], sections.get('reachability'))
+            return json_response({"success": True, **state_delta(sections['state'], entries, since)})
+
+        entries = build_entries(service_manager.discover_services(), _collect_statuses(), _get_reachability())
+        if not collector.enabled:
+            return json_response({"success": True, **state_delta(state_tracker.track(entries), entries, since)})
+
+        # The snapshot is being refreshed: answer in full, labelled with the last
+        # published version, so the client's next delta covers everything since
+        published = (collector.get_sections(fresh=False) or {}).get('state') or {"version": 0, "log": []}
+        return json_response({"success": True, **state_delta(published, entries)})
+    except Exception as e:
+        logger.error("Error getting state: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
 
 
 @api_bp.route('/services/<service_id>', methods=['GET'])
@@ -51,25 +362,22 @@ def get_service_detail(service_id):
     try:
         service = service_manager.get_service(service_id)
         if not service:
-            return jsonify({
+            return json_response({
                 "success": False,
                 "error": f"Service '{service_id}' not found"
-            }), 404
-
-        # Add current container status
-        status = container_manager.get_status(service_id)
-        service['status'] = status
+            }, 404)
 
-        return jsonify({
+        # Add current container status (catalog descriptors are read-only)
+        return json_response({
             "success": True,
-            "service": service
+            "service": dict(service, status=_get_status(service_id))
         })
     except Exception as e:
-        logger.error(f"Error getting service {service_id}: {e}")
-        return jsonify({
+        logger.error("Error getting service %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 
 # ==================== Container Management ====================
@@ -78,44 +386,61 @@ def get_service_detail(service_id):
 def install_service(service_id):
     """
     Install a service with user-provided configuration
-    Expects JSON body with environment variables
+    Expects JSON body with environment variables, optional force flag,
+    optional resource limits and optional log policy
+    Query params: wait, timeout (see _run_with_readiness)
     """
     try:
         data = request.get_json() or {}
         env_vars = data.get('env', {})
+        force = bool(data.get('force', False))
+        limits = data.get('limits')
+        log_policy = data.get('logging')
 
-        result = container_manager.install(service_id, env_vars)
-
-        if result['success']:
-            return jsonify(result), 201
-        else:
-            return jsonify(result), 400
+        return _run_with_readiness(
+            service_id,
+            lambda: container_manager.install(service_id, env_vars, force=force, limits=limits,
+                                              log_policy=log_policy),
+            lambda result: (200 if result.get('unchanged') else 201) if result['success'] else 400
+        )
 
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
     except Exception as e:
-        logger.error(f"Error installing service {service_id}: {e}")
-        return jsonify({
+        logger.error("Error installing service %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 
 @api_bp.route('/services/<service_id>/start', methods=['POST'])
 def start_service(service_id):
-    """Start an installed service"""
+    """
+    Start an installed service
+    Query params: wait, timeout (see _run_with_readiness)
+    """
     try:
-        result = container_manager.start(service_id)
-
-        if result['success']:
-            return jsonify(result)
-        else:
-            return jsonify(result), 400
+        return _run_with_readiness(
+            service_id,
+            lambda: container_manager.start(service_id),
+            lambda result: 200 if result['success'] else 400
+        )
 
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
     except Exception as e:
-        logger.error(f"Error starting service {service_id}: {e}")
-        return jsonify({
+        logger.error("Error starting service %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 
 @api_bp.route('/services/<service_id>/stop', methods=['POST'])
@@ -123,37 +448,45 @@ def stop_service(service_id):
     """Stop a running service"""
     try:
         result = container_manager.stop(service_id)
+        collector.request_refresh()
 
         if result['success']:
-            return jsonify(result)
+            return json_response(result)
         else:
-            return jsonify(result), 400
+            return json_response(result, 400)
 
     except Exception as e:
-        logger.error(f"Error stopping service {service_id}: {e}")
-        return jsonify({
+        logger.error("Error stopping service %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 
 @api_bp.route('/services/<service_id>/restart', methods=['POST'])
 def restart_service(service_id):
-    """Restart a service"""
+    """
+    Restart a service
+    Query params: wait, timeout (see _run_with_readiness)
+    """
     try:
-        result = container_manager.restart(service_id)
-
-        if result['success']:
-            return jsonify(result)
-        else:
-            return jsonify(result), 400
+        return _run_with_readiness(
+            service_id,
+            lambda: container_manager.restart(service_id),
+            lambda result: 200 if result['success'] else 400
+        )
 
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
     except Exception as e:
-        logger.error(f"Error restarting service {service_id}: {e}")
-        return jsonify({
+        logger.error("Error restarting service %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 
 @api_bp.route('/services/<service_id>', methods=['DELETE'])
@@ -167,18 +500,19 @@ def remove_service(service_id):
         remove_volumes = data.get('remove_volumes', False)
 
         result = container_manager.remove(service_id, remove_volumes)
+        collector.request_refresh()
 
         if result['success']:
-            return jsonify(result)
+            return json_response(result)
         else:
-            return jsonify(result), 400
+            return json_response(result, 400)
 
     except Exception as e:
-        logger.error(f"Error removing service {service_id}: {e}")
-        return jsonify({
+        logger.error("Error removing service %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
 
 
 # ==================== Monitoring ====================
@@ -187,57 +521,886 @@ def remove_service(service_id):
 def get_service_status(service_id):
     """Get current status of a service"""
     try:
-        status = container_manager.get_status(service_id)
-        return jsonify({
+        status = _get_status(service_id)
+        return json_response({
             "success": True,
             "service_id": service_id,
             "status": status
         })
     except Exception as e:
-        logger.error(f"Error getting status for {service_id}: {e}")
-        return jsonify({
+        logger.error("Error getting status for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/resources', methods=['GET'])
+def get_all_resources():
+    """Get CPU and memory usage of every running service against its resource budget"""
+    try:
+        # docker stats blocks for a second; the leader samples, workers serve its snapshot
+        usage = collector.get('resources')
+        if usage is None:
+            usage = container_manager.get_all_resource_usage()
+        return json_response({
+            "success": True,
+            "count": len(usage),
+            "services": usage
+        })
+    except Exception as e:
+        logger.error("Error getting resource usage: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/resources', methods=['GET'])
+def get_service_resources(service_id):
+    """Get CPU and memory usage of a service against its resource budget"""
+    try:
+        published = collector.get('resources')
+        if published is not None:
+            usage = published.get(service_id) or {"containers": []}
+        else:
+            usage = container_manager.get_resource_usage(service_id)
+        return json_response({
+            "success": True,
+            "service_id": service_id,
+            **usage
+        })
+    except Exception as e:
+        logger.error("Error getting resource usage for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/limits', methods=['PUT'])
+def update_service_limits(service_id):
+    """
+    Change a service's resource budget in place
+    Expects JSON body with any of cpus, memory, io_weight (null removes a limit)
+    """
+    try:
+        data = request.get_json() or {}
+        result = container_manager.update_limits(service_id, data)
+        collector.request_refresh()
+        return json_response(result, 200 if result['success'] else 207)
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
+    except Exception as e:
+        logger.error("Error updating limits for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/logging', methods=['PUT'])
+def update_service_logging(service_id):
+    """
+    Change a service's log rotation policy
+    Expects JSON body with any of driver, max_size, max_file, compress (null
+    restores the default) and optional apply (recreate containers now)
+    """
+    try:
+        data = dict(request.get_json() or {})
+        apply = bool(data.pop('apply', False))
+        result = container_manager.update_log_policy(service_id, data, apply=apply)
+        if apply:
+            collector.request_refresh()
+        return json_response(result, 200 if result['success'] else 500)
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
+    except Exception as e:
+        logger.error("Error updating log policy for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/logs/usage', methods=['GET'])
+def get_service_log_usage(service_id):
+    """Get log configuration and on-disk log size of each container"""
+    try:
+        return json_response({
+            "success": True,
+            "service_id": service_id,
+            **container_manager.get_log_usage(service_id)
+        })
+    except Exception as e:
+        logger.error("Error getting log usage for %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/logs/rotate', methods=['POST'])
+def rotate_service_logs(service_id):
+    """
+    Empty the active log file of each container
+    Optional JSON body: {"archive": false} to discard instead of keeping a gzipped copy
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = container_manager.rotate_logs(service_id, archive=bool(data.get('archive', True)))
+        return json_response(result)
+    except Exception as e:
+        logger.error("Error rotating logs for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
 
 
 @api_bp.route('/services/<service_id>/logs', methods=['GET'])
 def get_service_logs(service_id):
     """
     Get container logs
-    Query params: tail (default: 100), follow (default: false)
+    Query params: tail (default: 100), follow (default: false),
+    since (cursor from a previous response), until (timestamp), max_bytes
     """
     try:
         tail = request.args.get('tail', 100, type=int)
         follow = request.args.get('follow', 'false').lower() == 'true'
+        since = request.args.get('since') or None
+        until = request.args.get('until') or None
+        max_bytes = request.args.get('max_bytes', type=int)
 
-        logs = container_manager.get_logs(service_id, tail=tail, follow=follow)
+        result = container_manager.get_logs(
+            service_id,
+            tail=tail,
+            follow=follow,
+            since=since,
+            until=until,
+            max_bytes=max_bytes
+        )
 
-        return jsonify({
+        return json_response({
             "success": True,
             "service_id": service_id,
-            "logs": logs
+            "logs": result['logs'],
+            "cursor": result['cursor'],
+            "truncated": result['truncated']
         })
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
     except Exception as e:
-        logger.error(f"Error getting logs for {service_id}: {e}")
-        return jsonify({
+        logger.error("Error getting logs for %s: %s", service_id, e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/logs/search', methods=['GET'])
+def search_service_logs(service_id):
+    """
+    Search the logs of all containers of a service
+    Query params: q, regex (default: false), case_sensitive (default: false),
+    level, since, until, context (default: 0), limit (default: 100)
+    """
+    try:
+        result = log_searcher.search(
+            service_id,
+            query=request.args.get('q') or None,
+            regex=request.args.get('regex', 'false').lower() == 'true',
+            case_sensitive=request.args.get('case_sensitive', 'false').lower() == 'true',
+            level=request.args.get('level') or None,
+            since=request.args.get('since') or None,
+            until=request.args.get('until') or None,
+            context=request.args.get('context', 0, type=int),
+            limit=request.args.get('limit', 100, type=int)
+        )
+
+        return json_response({
+            "success": True,
+            "service_id": service_id,
+            **result
+        })
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
+    except Exception as e:
+        logger.error("Error searching logs for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/logs/search', methods=['GET'])
+def search_all_logs():
+    """
+    Search the logs of every installed service across all Docker hosts
+    Query params: as for /services/<id>/logs/search, plus services
+    (comma-separated, default: all); limit applies per service
+    """
+    try:
+        requested = request.args.get('services')
+        if requested:
+            service_ids = [s.strip() for s in requested.split(',') if s.strip()]
+        else:
+            statuses = collector.get('statuses') or _collect_statuses()
+            service_ids = [sid for sid, status in statuses.items() if status.get('state') != 'not_installed']
+
+        result = log_searcher.search_all(
+            service_ids,
+            query=request.args.get('q') or None,
+            regex=request.args.get('regex', 'false').lower() == 'true',
+            case_sensitive=request.args.get('case_sensitive', 'false').lower() == 'true',
+            level=request.args.get('level') or None,
+            since=request.args.get('since') or None,
+            until=request.args.get('until') or None,
+            context=request.args.get('context', 0, type=int),
+            limit=request.args.get('limit', 100, type=int)
+        )
+        return json_response({"success": True, **result})
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
+    except Exception as e:
+        logger.error("Error searching logs: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
 
 
 @api_bp.route('/system', methods=['GET'])
 def get_system_info():
     """Get system resource usage and information"""
     try:
-        info = system_monitor.get_system_info()
-        return jsonify({
+        info = collector.get('system')
+        if info is None:
+            info = system_monitor.get_system_info()
+        return json_response({
             "success": True,
             "system": info
         })
     except Exception as e:
-        logger.error(f"Error getting system info: {e}")
-        return jsonify({
+        logger.error("Error getting system info: %s", e)
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+
+
+@api_bp.route('/system/history', methods=['GET'])
+def get_system_history():
+    """
+    Get CPU, memory, network and disk I/O samples
+    Query params: since (Unix timestamp; only newer samples are returned)
+    """
+    try:
+        since = request.args.get('since', type=float)
+        # Only the leader samples; other workers serve its history, even while a refresh is pending
+        samples = collector.get('system_history', fresh=False)
+        if samples is None:
+            samples = system_monitor.history(since=since)
+        elif since is not None:
+            samples = [sample for sample in samples if sample['ts'] > since]
+        return json_response({
+            "success": True,
+            "interval_s": system_monitor.sample_interval,
+            "count": len(samples),
+            "samples": samples
+        })
+    except Exception as e:
+        logger.error("Error getting system history: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+# ==================== Snapshots ====================
+
+@api_bp.route('/services/<service_id>/snapshots', methods=['GET'])
+def list_snapshots(service_id):
+    """List data snapshots of a service, newest first"""
+    try:
+        snapshots = snapshot_manager.list(service_id)
+        return json_response({
+            "success": True,
+            "service_id": service_id,
+            "count": len(snapshots),
+            "snapshots": snapshots
+        })
+    except Exception as e:
+        logger.error("Error listing snapshots for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/snapshots', methods=['POST'])
+def create_snapshot(service_id):
+    """
+    Take an incremental snapshot of a service's data directory
+    Optional JSON body: {"quiesce": true} to stop the service while reading
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        snapshot = snapshot_manager.create(service_id, quiesce=bool(data.get('quiesce', False)))
+        collector.request_refresh()
+        return json_response({
+            "success": True,
+            "snapshot": snapshot
+        }, 201)
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
+    except Exception as e:
+        logger.error("Error creating snapshot for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/snapshots/<snapshot_id>/download', methods=['GET'])
+def download_snapshot(service_id, snapshot_id):
+    """Download a snapshot as a tar archive"""
+    try:
+        archive = snapshot_manager.iter_tar(service_id, snapshot_id)
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, 400)
+    except FileNotFoundError:
+        return json_response({
+            "success": False,
+            "error": f"Snapshot '{snapshot_id}' not found"
+        }, 404)
+    except Exception as e:
+        logger.error("Error exporting snapshot %s for %s: %s", snapshot_id, service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+    return Response(
+        archive,
+        mimetype='application/x-tar',
+        headers={'Content-Disposition': f'attachment; filename="{service_id}-{snapshot_id}.tar"'}
+    )
+
+
+@api_bp.route('/services/<service_id>/snapshots/<snapshot_id>/restore', methods=['POST'])
+def restore_snapshot(service_id, snapshot_id):
+    """
+    Restore a service's data directory to a snapshot
+    Optional JSON body: {"quiesce": false} to skip stopping the service
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = snapshot_manager.restore(
+            service_id, snapshot_id, quiesce=bool(data.get('quiesce', True))
+        )
+        collector.request_refresh()
+        return json_response({"success": True, **result})
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, 400)
+    except FileNotFoundError:
+        return json_response({
+            "success": False,
+            "error": f"Snapshot '{snapshot_id}' not found"
+        }, 404)
+    except Exception as e:
+        logger.error("Error restoring snapshot %s for %s: %s", snapshot_id, service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/snapshots/<snapshot_id>', methods=['DELETE'])
+def delete_snapshot(service_id, snapshot_id):
+    """Delete a snapshot and the chunks only it references"""
+    try:
+        result = snapshot_manager.delete(service_id, snapshot_id)
+        return json_response({"success": True, **result})
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, 400)
+    except FileNotFoundError:
+        return json_response({
+            "success": False,
+            "error": f"Snapshot '{snapshot_id}' not found"
+        }, 404)
+    except Exception as e:
+        logger.error("Error deleting snapshot %s for %s: %s", snapshot_id, service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/restore', methods=['POST'])
+def restore_uploaded_archive(service_id):
+    """
+    Restore a service's data directory from an uploaded tar archive
+    The request body is the (optionally gzip-compressed) tar stream
+    Query params: quiesce (default: true)
+    """
+    try:
+        quiesce = request.args.get('quiesce', 'true').lower() == 'true'
+        result = snapshot_manager.restore_tar(service_id, request.stream, quiesce=quiesce)
+        collector.request_refresh()
+        return json_response({"success": True, **result})
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, 400)
+    except Exception as e:
+        logger.error("Error restoring archive for %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+# ==================== Stack Boot ====================
+
+@api_bp.route('/boot', methods=['GET'])
+def get_boot():
+    """Get the dependency-ordered boot plan and the progress of the last boot"""
+    try:
+        return json_response({
+            "success": True,
+            "plan": boot_orchestrator.plan(),
+            "run": boot_orchestrator.status()
+        })
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, 400)
+    except Exception as e:
+        logger.error("Error getting boot plan: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/boot', methods=['POST'])
+def start_boot():
+    """Start every installed service in dependency order; poll GET /boot for progress"""
+    try:
+        plan = boot_orchestrator.start()
+        collector.request_refresh()
+        return json_response({"success": True, "plan": plan}, 202)
+    except RuntimeError as e:
+        return json_response({"success": False, "error": str(e)}, 409)
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, 400)
+    except Exception as e:
+        logger.error("Error starting boot: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+# ==================== Image Updates ====================
+
+@api_bp.route('/updates', methods=['GET'])
+def get_updates():
+    """
+    Check installed services for newer images and get the last update's report
+    Query params: refresh (default: false) bypasses the cached registry check
+    """
+    try:
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        return json_response({
+            "success": True,
+            "updates": image_updater.check(refresh=refresh),
+            "run": image_updater.status()
+        })
+    except Exception as e:
+        logger.error("Error checking for image updates: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/updates', methods=['POST'])
+def start_updates():
+    """
+    Pull new images and recreate the changed containers in the background
+    Optional JSON body: {"services": ["plex"]} (default: every service with an update)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        selected = image_updater.start(data.get('services'))
+        collector.request_refresh()
+        return json_response({"success": True, **selected}, 202)
+    except RuntimeError as e:
+        return json_response({"success": False, "error": str(e)}, 409)
+    except Exception as e:
+        logger.error("Error starting image update: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+# ==================== Operation History ====================
+
+@api_bp.route('/operations', methods=['GET'])
+def get_operations():
+    """
+    List recorded operations, newest first
+    Query params: service, action, since, until (Unix timestamps),
+    failed (default: false), limit (default: 100)
+    """
+    try:
+        operations = operation_journal.query(
+            service_id=request.args.get('service'),
+            action=request.args.get('action'),
+            since=request.args.get('since', type=float),
+            until=request.args.get('until', type=float),
+            failed=request.args.get('failed', 'false').lower() == 'true',
+            limit=min(request.args.get('limit', 100, type=int), 1000)
+        )
+        return json_response({
+            "success": True,
+            "operations": operations,
+            "count": len(operations)
+        })
+    except Exception as e:
+        logger.error("Error querying operations: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/operations/stats', methods=['GET'])
+def get_operation_stats():
+    """
+    Get duration percentiles per service and action
+    Query params: service, action, since, until (Unix timestamps)
+    """
+    try:
+        stats = operation_journal.stats(
+            service_id=request.args.get('service'),
+            action=request.args.get('action'),
+            since=request.args.get('since', type=float),
+            until=request.args.get('until', type=float)
+        )
+        return json_response({
+            "success": True,
+            "stats": stats
+        })
+    except Exception as e:
+        logger.error("Error computing operation stats: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+# ==================== Docker Hosts ====================
+
+@api_bp.route('/hosts', methods=['GET'])
+def get_hosts():
+    """List Docker hosts with their reachability and the services pinned to them"""
+    try:
+        def ping(host):
+            client = host.client()
+            if client is None:
+                raise ConnectionError("Docker client not available")
+            return client.version().get('Version')
+
+        answers = host_registry.fan_out('ping', ping)
+        pinned = {}
+        for service in service_manager.discover_services():
+            host = host_registry.host_for(service['id'], service.get('host'))
+            pinned.setdefault(host.name, []).append(service['id'])
+
+        hosts = []
+        for host in host_registry.hosts():
+            answer = answers[host.name]
+            hosts.append({
+                **host.as_dict(),
+                "reachable": answer['ok'],
+                "server_version": answer.get('result'),
+                "latency_ms": answer['latency_ms'],
+                "error": answer.get('error'),
+                "services": sorted(pinned.get(host.name, []))
+            })
+        return json_response({"success": True, "hosts": hosts})
+    except Exception as e:
+        logger.error("Error listing Docker hosts: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/dns/benchmark', methods=['GET'])
+def get_dns_benchmark():
+    """
+    Get recent DNS resolver benchmark runs, newest first
+    Query params: limit (default: 24)
+    """
+    try:
+        return json_response({
+            "success": True,
+            "running": dns_benchmark.running(),
+            "runs": dns_benchmark.runs(limit=request.args.get('limit', 24, type=int))
+        })
+    except Exception as e:
+        logger.error("Error getting DNS benchmark results: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/dns/benchmark', methods=['POST'])
+def start_dns_benchmark():
+    """Benchmark every running DNS resolver now, in the background"""
+    try:
+        resolvers = dns_benchmark.start()
+        return json_response({
+            "success": True,
+            "message": f"Benchmarking {len(resolvers)} resolvers",
+            "resolvers": resolvers
+        }, 202)
+    except RuntimeError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 409)
+    except Exception as e:
+        logger.error("Error starting DNS benchmark: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/gc', methods=['GET'])
+def get_gc_plan():
+    """
+    Get what garbage collection would remove and how many bytes it would free
+    Query params: keep_images (unused images kept per repository, default: configured)
+    """
+    try:
+        return json_response({
+            "success": True,
+            "running": garbage_collector.running(),
+            "plan": garbage_collector.plan(keep_images=request.args.get('keep_images', type=int)),
+            "last_run": garbage_collector.latest()
+        })
+    except Exception as e:
+        logger.error("Error planning garbage collection: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/gc', methods=['POST'])
+def start_gc():
+    """
+    Run garbage collection now, in the background
+    Optional JSON body: {"kinds": ["containers", "images", "volumes"], "keep_images": 1}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        options = garbage_collector.start(kinds=data.get('kinds'), keep_images=data.get('keep_images'))
+        return json_response({
+            "success": True,
+            "message": f"Collecting {', '.join(options['kinds'])}",
+            **options
+        }, 202)
+    except ValueError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 400)
+    except RuntimeError as e:
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 409)
+    except Exception as e:
+        logger.error("Error starting garbage collection: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/gc/runs', methods=['GET'])
+def get_gc_runs():
+    """
+    Get recorded garbage collection runs, newest first
+    Query params: limit (default: 20)
+    """
+    try:
+        return json_response({
+            "success": True,
+            "running": garbage_collector.running(),
+            "runs": garbage_collector.runs(limit=request.args.get('limit', 20, type=int))
+        })
+    except Exception as e:
+        logger.error("Error getting garbage collection runs: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/alerts', methods=['GET'])
+def get_alerts():
+    """List firing alerts and the configured rules"""
+    try:
+        active = collector.get('alerts')
+        if active is None:
+            active = alert_engine.active()
+        return json_response({
+            "success": True,
+            "active": active,
+            "rules": alert_engine.describe_rules()
+        })
+    except Exception as e:
+        logger.error("Error getting alerts: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/events', methods=['GET'])
+def get_events():
+    """
+    Stream backend events (alerts, ...) as Server-Sent Events
+    Query params: types (comma-separated event types, default: all)
+    Resumes after the Last-Event-ID header (or last_event_id param) when given
+    """
+    types = [t.strip() for t in request.args.get('types', '').split(',') if t.strip()]
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('last_event_id', type=int)
+
+    _ensure_event_relay()
+    subscription = event_bus.subscribe(types or None, last_event_id)
+    return Response(
+        stream_with_context(stream_events(subscription)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@api_bp.route('/health/deep', methods=['GET'])
+def get_deep_health():
+    """
+    Get reachability and latency of every running service's web endpoint
+    Served from the background prober cache; never probes inline
+    """
+    try:
+        reachability = _get_reachability()
+        down = sorted(sid for sid, r in reachability.items() if r['state'] != 'up')
+        return json_response({
+            "success": True,
+            "healthy": not down,
+            "down": down,
+            "services": reachability
+        })
+    except Exception as e:
+        logger.error("Error getting deep health: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/runs', methods=['GET'])
+def get_runs():
+    """Get docker commands currently running in any worker"""
+    try:
+        return json_response({
+            "success": True,
+            "runs": command_runner.active(),
+            "limits": {
+                "concurrency": command_runner.concurrency,
+                "service_concurrency": command_runner.service_concurrency
+            }
+        })
+    except Exception as e:
+        logger.error("Error listing running commands: %s", e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/runs/<run_id>', methods=['DELETE'])
+def cancel_run(run_id):
+    """Cancel a running docker command"""
+    try:
+        if not command_runner.cancel(run_id):
+            return json_response({
+                "success": False,
+                "error": f"Command '{run_id}' is not running"
+            }, 404)
+        collector.request_refresh()
+        return json_response({
+            "success": True,
+            "cancelled": [run_id]
+        })
+    except Exception as e:
+        logger.error("Error cancelling command %s: %s", run_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/services/<service_id>/cancel', methods=['POST'])
+def cancel_service_runs(service_id):
+    """Cancel every running docker command of a service (e.g. a hanging install)"""
+    try:
+        cancelled = command_runner.cancel_service(service_id)
+        if cancelled:
+            collector.request_refresh()
+        return json_response({
+            "success": True,
+            "service_id": service_id,
+            "cancelled": cancelled
+        })
+    except Exception as e:
+        logger.error("Error cancelling commands of %s: %s", service_id, e)
+        return json_response({
+            "success": False,
+            "error": str(e)
+        }, 500)
+
+
+@api_bp.route('/collector', methods=['GET'])
+def get_collector_info():
+    """Get shared state collector leadership and snapshot age"""
+    return json_response({
+        "success": True,
+        "collector": collector.snapshot_info()
+    })
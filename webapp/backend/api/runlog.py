@@ -0,0 +1,91 @@
+"""
+Run Log
+Append-only JSON-lines history of background runs, shared by all workers
+"""
+
+import os
+import json
+import threading
+import logging
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class RunLog:
+    """
+    Bounded history of runs in a JSON-lines file
+
+    Appends are single writes, so several workers can share the file; it is
+    trimmed back to `history` runs once it holds twice as many.
+    """
+
+    def __init__(self, path, history=500):
+        """
+        Initialize run log
+
+        Args:
+            path: JSON-lines file
+            history: Number of runs kept
+        """
+        self.path = Path(path)
+        self.history = history
+        self._latest = (None, None)
+        self._lock = threading.Lock()
+
+    def append(self, run):
+        """Record a finished run; failures are logged, never raised"""
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(run, default=str) + '\n')
+                self._trim()
+            except OSError as e:
+                logger.error("Could not record run in %s: %s", self.path, e)
+
+    def _trim(self):
+        with open(self.path, 'r') as f:
+            lines = f.readlines()
+        if len(lines) > 2 * self.history:
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                f.writelines(lines[-self.history:])
+            os.replace(tmp_path, self.path)
+
+    def runs(self, limit=24):
+        """
+        Recorded runs, newest first
+
+        Args:
+            limit: Maximum number of runs
+
+        Returns:
+            list: Run dicts
+        """
+        try:
+            with open(self.path, 'r') as f:
+                lines = deque(f, maxlen=limit)
+        except FileNotFoundError:
+            return []
+        runs = []
+        for line in reversed(lines):
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue
+        return runs
+
+    def latest(self):
+        """Most recent run, re-read only when the file changes"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+        cached_mtime, run = self._latest
+        if cached_mtime != mtime:
+            runs = self.runs(limit=1)
+            run = runs[0] if runs else None
+            self._latest = (mtime, run)
+        return run
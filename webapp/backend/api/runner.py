@@ -0,0 +1,445 @@
+"""
+Command Runner
+Deadline-aware docker / docker-compose subprocesses with concurrency limits and cancellation
+"""
+
+import os
+import json
+import time
+import signal
+import random
+import itertools
+import threading
+import subprocess
+import contextvars
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from api.collector import _default_run_dir
+from api.startup import LazyInstance
+
+# fcntl is only available on POSIX; without it the limits apply per process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Commands running at once across all workers, and per service
+RUN_CONCURRENCY = int(os.environ.get('OPENHOMESTACK_RUN_CONCURRENCY', 16))
+RUN_SERVICE_CONCURRENCY = int(os.environ.get('OPENHOMESTACK_RUN_SERVICE_CONCURRENCY', 3))
+
+# Seconds between SIGTERM and SIGKILL when a command is stopped
+KILL_GRACE = float(os.environ.get('OPENHOMESTACK_KILL_GRACE', 3))
+
+# Default time budget of an API request: reads should fail fast, while
+# mutations may run docker-compose (up to 120 seconds) several times
+READ_DEADLINE = float(os.environ.get('OPENHOMESTACK_READ_DEADLINE', 30))
+WRITE_DEADLINE = float(os.environ.get('OPENHOMESTACK_WRITE_DEADLINE', 300))
+
+# Seconds between attempts to take a slot while all are busy
+_SLOT_POLL = 0.05
+
+_deadline = contextvars.ContextVar('openhomestack_deadline', default=None)
+
+
+class CommandCancelled(RuntimeError):
+    """Raised when a running command was cancelled through the API"""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Limit everything run in this block to finish within `seconds`
+
+    Deadlines nest: an inner block can only shorten the outer one. Commands
+    started inside the block get the remaining time as their timeout.
+
+    Args:
+        seconds: Time budget, or None for no additional limit
+    """
+    current = _deadline.get()
+    if seconds is not None:
+        until = time.monotonic() + seconds
+        current = until if current is None else min(current, until)
+    token = _deadline.set(current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def set_deadline(seconds):
+    """Set the deadline for the current context; returns a token for reset_deadline()"""
+    return _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining(timeout=None):
+    """
+    Seconds left for a call with its own timeout under the current deadline
+
+    Returns:
+        float: The smaller of `timeout` and the time to the deadline (None if neither is set)
+    """
+    until = _deadline.get()
+    if until is None:
+        return timeout
+    left = max(0.0, until - time.monotonic())
+    return left if timeout is None else min(timeout, left)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _SlotPool:
+    """
+    Counting semaphore shared by all worker processes
+
+    Each slot is a lock file; holding its flock holds the slot, and the
+    kernel releases it if the process dies, so a crashed worker never leaks
+    slots. Without fcntl it falls back to a per-process semaphore.
+    """
+
+    def __init__(self, directory, name, size):
+        self.size = max(1, size)
+        self._paths = [Path(directory) / f"{name}-{i}.lock" for i in range(self.size)]
+        self._semaphore = threading.BoundedSemaphore(self.size) if fcntl is None else None
+
+    def acquire(self, timeout):
+        """
+        Take a slot, waiting at most `timeout` seconds (None waits forever)
+
+        Returns:
+            The slot handle for release(), or None if none became free in time
+        """
+        if self._semaphore is not None:
+            return self._semaphore if self._semaphore.acquire(timeout=timeout) else None
+
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Random start spreads workers over the slots instead of all fighting for slot 0
+            start = random.randrange(self.size)
+            for path in self._paths[start:] + self._paths[:start]:
+                handle = open(path, 'a')
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return handle
+                except BlockingIOError:
+                    handle.close()
+            if give_up is not None and time.monotonic() >= give_up:
+                return None
+            time.sleep(_SLOT_POLL if give_up is None else max(0, min(_SLOT_POLL, give_up - time.monotonic())))
+
+    def release(self, handle):
+        if self._semaphore is not None:
+            handle.release()
+        else:
+            handle.close()
+
+
+class CommandRunner:
+    """
+    Runs docker and docker-compose commands for all managers
+
+    Every command:
+    - gets the smaller of its own timeout and the current request deadline,
+      and waiting for a free slot counts against it;
+    - takes a global slot and, with a service, one of that service's slots,
+      so a stalled daemon ties up a bounded number of processes;
+    - runs in its own process group, which is killed as a whole (SIGTERM,
+      then SIGKILL) on timeout or cancellation, so docker-compose helpers
+      do not outlive it;
+    - is listed in the run directory while it runs, so any worker can list
+      and cancel it.
+    """
+
+    def __init__(self, run_dir=None, concurrency=RUN_CONCURRENCY,
+                 service_concurrency=RUN_SERVICE_CONCURRENCY, kill_grace=KILL_GRACE):
+        """
+        Initialize command runner
+
+        Args:
+            run_dir: Directory for slot locks and running command records
+            concurrency: Commands running at once across all workers
+            service_concurrency: Commands running at once per service
+            kill_grace: Seconds between SIGTERM and SIGKILL
+        """
+        base = Path(run_dir or os.environ.get('OPENHOMESTACK_RUN_DIR') or _default_run_dir())
+        self.runs_dir = base / 'runs'
+        self.slots_dir = base / 'slots'
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        self.slots_dir.mkdir(parents=True, exist_ok=True)
+        self.concurrency = concurrency
+        self.service_concurrency = service_concurrency
+        self.kill_grace = kill_grace
+
+        self._global = _SlotPool(self.slots_dir, 'global', concurrency)
+        self._service_pools = {}
+        self._ids = itertools.count(1)
+        self._procs = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def _service_pool(self, service):
+        with self._lock:
+            if service not in self._service_pools:
+                self._service_pools[service] = _SlotPool(
+                    self.slots_dir, f"service-{service}", self.service_concurrency
+                )
+            return self._service_pools[service]
+
+    @contextmanager
+    def _slots(self, cmd, service, timeout):
+        """Hold a global (and service) slot; raises TimeoutExpired if none frees up in time"""
+        started = time.monotonic()
+        # Service slot first, so commands queued behind a busy service do not hold global slots
+        pools = ([self._service_pool(service)] if service else []) + [self._global]
+        held = []
+        try:
+            for pool in pools:
+                wait = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+                handle = pool.acquire(wait)
+                if handle is None:
+                    logger.warning("No free command slot for %s within %.1fs", service or 'global', timeout)
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                held.append((pool, handle))
+            yield None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        finally:
+            for pool, handle in reversed(held):
+                pool.release(handle)
+
+    def _popen(self, cmd, service, label, **kwargs):
+        proc = subprocess.Popen(cmd, start_new_session=os.name == 'posix', **kwargs)
+        run_id = f"{os.getpid()}-{next(self._ids)}"
+        record = {
+            "id": run_id,
+            "pid": os.getpid(),
+            "pgid": proc.pid,
+            "command": ' '.join(str(part) for part in cmd)[:300],
+            "label": label,
+            "service": service,
+            "started_at": time.time()
+        }
+        with self._lock:
+            self._procs[run_id] = proc
+        self._write_record(record)
+        return run_id, proc
+
+    def _write_record(self, record):
+        path = self.runs_dir / f"{record['id']}.json"
+        tmp = path.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(record, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not record running command %s: %s", record['id'], e)
+
+    def _finish(self, run_id):
+        """Forget a finished command; returns whether it had been cancelled"""
+        with self._lock:
+            self._procs.pop(run_id, None)
+            cancelled = run_id in self._cancelled
+            self._cancelled.discard(run_id)
+        marker = self.runs_dir / f"{run_id}.cancel"
+        if marker.exists():
+            cancelled = True
+        for path in (self.runs_dir / f"{run_id}.json", marker):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return cancelled
+
+    def _kill_group(self, pgid, proc=None):
+        """SIGTERM a process group, then SIGKILL it if it is still there after the grace period"""
+        if os.name != 'posix':
+            if proc is not None:
+                proc.kill()
+            return
+        try:
+            os.killpg(pgid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+
+        def force():
+            try:
+                os.killpg(pgid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        if proc is not None:
+            try:
+                proc.wait(timeout=self.kill_grace)
+            except subprocess.TimeoutExpired:
+                pass
+            # Children may survive their parent, kill the rest of the group too
+            force()
+        else:
+            timer = threading.Timer(self.kill_grace, force)
+            timer.daemon = True
+            timer.start()
+
+    def run(self, cmd, timeout=None, service=None, label=None, capture_output=True, text=True,
+            cwd=None, env=None):
+        """
+        Run a command to completion, like subprocess.run
+
+        Args:
+            cmd: Command and arguments
+            timeout: Seconds for this command, shortened by the request deadline
+            service: Service the command acts on, for the per-service limit
+            label: Short description shown in the list of running commands
+            capture_output: Capture stdout and stderr
+            text: Decode output as text
+            cwd: Working directory
+            env: Environment (default: inherited)
+
+        Returns:
+            subprocess.CompletedProcess
+
+        Raises:
+            subprocess.TimeoutExpired: If no slot freed up or the command did
+                not finish before the timeout or deadline
+            CommandCancelled: If the command was cancelled
+        """
+        timeout = remaining(timeout)
+        pipe = subprocess.PIPE if capture_output else None
+        with self._slots(cmd, service, timeout) as left:
+            run_id, proc = self._popen(
+                cmd, service, label, stdout=pipe, stderr=pipe, text=text, cwd=cwd, env=env
+            )
+            try:
+                stdout, stderr = proc.communicate(timeout=left)
+            except subprocess.TimeoutExpired:
+                logger.warning("Command timed out after %.1fs, killing its process group: %s", timeout, cmd)
+                self._kill_group(proc.pid, proc)
+                stdout, stderr = proc.communicate()
+                self._finish(run_id)
+                raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+            except BaseException:
+                self._kill_group(proc.pid, proc)
+                proc.wait()
+                self._finish(run_id)
+                raise
+
+        if self._finish(run_id):
+            raise CommandCancelled(f"Cancelled: {' '.join(cmd)}")
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+    @contextmanager
+    def stream(self, cmd, timeout=None, service=None, label=None, env=None):
+        """
+        Run a command and stream its combined output
+
+        The process group is killed when the block exits, the timeout or
+        deadline elapses, or the command is cancelled, so callers can stop
+        reading at any point.
+
+        Yields:
+            iterator: Output lines including trailing newlines
+
+        Raises:
+            subprocess.TimeoutExpired: If no slot freed up in time
+        """
+        timeout = remaining(timeout)
+        with self._slots(cmd, service, timeout) as left:
+            run_id, proc = self._popen(
+                cmd, service, label, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, errors='replace', env=env
+            )
+            timer = None
+            if left is not None:
+                timer = threading.Timer(left, self._kill_group, (proc.pid,))
+                timer.daemon = True
+                timer.start()
+            try:
+                yield proc.stdout
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                if proc.poll() is None:
+                    self._kill_group(proc.pid, proc)
+                proc.stdout.close()
+                proc.wait()
+                self._finish(run_id)
+
+    def active(self):
+        """
+        Commands currently running in any worker
+
+        Returns:
+            list: Run records (id, command, label, service, started_at, running_s), oldest first
+        """
+        runs = []
+        for path in self.runs_dir.glob('*.json'):
+            try:
+                with open(path, 'r') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(record['pid']):
+                # Left behind by a worker that died mid-command
+                path.unlink(missing_ok=True)
+                continue
+            record['running_s'] = round(time.time() - record['started_at'], 1)
+            record['cancelling'] = (self.runs_dir / f"{record['id']}.cancel").exists()
+            runs.append(record)
+        runs.sort(key=lambda r: r['started_at'])
+        return runs
+
+    def cancel(self, run_id):
+        """
+        Cancel a running command, whichever worker started it
+
+        Args:
+            run_id: ID from active()
+
+        Returns:
+            bool: False if no such command is running
+        """
+        record = next((r for r in self.active() if r['id'] == run_id), None)
+        if record is None:
+            return False
+
+        logger.info("Cancelling command %s: %s", run_id, record['command'])
+        with self._lock:
+            proc = self._procs.get(run_id)
+            if proc is not None:
+                self._cancelled.add(run_id)
+        if proc is None:
+            # Started by another worker: leave a marker it checks when the command ends
+            (self.runs_dir / f"{run_id}.cancel").touch()
+        self._kill_group(record['pgid'])
+        return True
+
+    def cancel_service(self, service_id):
+        """
+        Cancel every running command of a service
+
+        Returns:
+            list: IDs of the cancelled commands
+        """
+        return [r['id'] for r in self.active() if r['service'] == service_id and self.cancel(r['id'])]
+
+    def stats(self):
+        return {
+            "running": len(self.active()),
+            "concurrency": self.concurrency,
+            "service_concurrency": self.service_concurrency
+        }
+
+
+command_runner = LazyInstance(CommandRunner)
@@ -4,12 +4,31 @@ Scans docker-compose files and parses openHomeStack labels
 """
 
 import os
-import yaml
 import logging
 from pathlib import Path
+from api.cache import SingleFlightCache
+from api.models import ServiceDescriptor, CatalogSnapshot
 
 logger = logging.getLogger(__name__)
 
+# The catalog only changes when compose files are edited
+CATALOG_TTL = 10
+CATALOG_STALE_TTL = 60
+
+
+def get_containers_root():
+    """
+    Get the root directory holding all service data
+
+    Returns:
+        Path: /home/containers (C:\\containers on Windows)
+    """
+    import platform
+
+    if platform.system() == 'Windows':
+        return Path("C:\\containers")
+    return Path("/home/containers")
+
 
 class ServiceManager:
     """Manages service discovery and metadata parsing"""
@@ -28,19 +47,72 @@ class ServiceManager:
             services_dir = repo_root / 'services'
 
         self.services_dir = Path(services_dir)
-        logger.info(f"ServiceManager initialized with services_dir: {self.services_dir}")
+        self._catalog_cache = SingleFlightCache('catalog', ttl=CATALOG_TTL, stale_ttl=CATALOG_STALE_TTL)
+        self._snapshot = None
+        self._published = (None, None)
+        logger.info("ServiceManager initialized with services_dir: %s", self.services_dir)
+
+    def catalog(self):
+        """
+        Current catalog snapshot
+
+        Concurrent callers share one scan and the result is cached briefly
+        (see api/cache.py). A rescan that finds nothing changed keeps the
+        previous snapshot, so its encoded body is reused.
+
+        Returns:
+            CatalogSnapshot: Immutable services with their pre-encoded listing
+        """
+        return self._catalog_cache.get('catalog', self._build_catalog)
+
+    def catalog_from(self, published):
+        """
+        Catalog snapshot for the services published by the collector leader
+
+        The snapshot is rebuilt only when the published list changes (a new
+        collector snapshot) and its services differ from the current ones,
+        so workers serve the same bytes and ETag without scanning themselves.
+
+        Args:
+            published: Service dicts from the collector's 'services' section
+
+        Returns:
+            CatalogSnapshot
+        """
+        source, snapshot = self._published
+        if source is published:
+            return snapshot
+        snapshot = self._adopt(ServiceDescriptor.from_metadata(service) for service in published)
+        self._published = (published, snapshot)
+        return snapshot
+
+    def _build_catalog(self):
+        return self._adopt(self._scan_services())
+
+    def _adopt(self, services):
+        """Make services the current snapshot, keeping the previous one if nothing changed"""
+        services = tuple(services)
+        previous = self._snapshot
+        if previous is not None and previous.services == services:
+            return previous
+        self._snapshot = CatalogSnapshot(services)
+        return self._snapshot
 
     def discover_services(self):
         """
         Discover all available services by scanning docker-compose files
 
         Returns:
-            list: List of service metadata dictionaries
+            tuple: ServiceDescriptors (read-only mappings), sorted by name
         """
+        return self.catalog().services
+
+    def _scan_services(self):
+        """Scan the services directory and parse every docker-compose file"""
         services = []
 
         if not self.services_dir.exists():
-            logger.warning(f"Services directory not found: {self.services_dir}")
+            logger.warning("Services directory not found: %s", self.services_dir)
             return services
 
         # Scan each subdirectory for docker-compose.yml
@@ -50,16 +122,16 @@ class ServiceManager:
 
             compose_file = service_dir / 'docker-compose.yml'
             if not compose_file.exists():
-                logger.debug(f"No docker-compose.yml found in {service_dir.name}")
+                logger.debug("No docker-compose.yml found in %s", service_dir.name)
                 continue
 
             try:
                 service_metadata = self._parse_service(service_dir.name, compose_file)
                 if service_metadata:
                     services.append(service_metadata)
-                    logger.info(f"Discovered service: {service_metadata['id']}")
+                    logger.info("Discovered service: %s", service_metadata['id'])
             except Exception as e:
-                logger.error(f"Error parsing service {service_dir.name}: {e}")
+                logger.error("Error parsing service %s: %s", service_dir.name, e)
 
         return sorted(services, key=lambda s: s.get('name', ''))
 
@@ -67,17 +139,24 @@ class ServiceManager:
         """
         Get detailed information about a specific service
 
+        Served from the catalog snapshot; a service added since the last scan
+        is parsed directly.
+
         Args:
             service_id: Service identifier (directory name)
 
         Returns:
-            dict: Service metadata or None if not found
+            ServiceDescriptor: Service metadata or None if not found
         """
+        service = self.catalog().get(service_id)
+        if service is not None:
+            return service
+
         service_dir = self.services_dir / service_id
         compose_file = service_dir / 'docker-compose.yml'
 
         if not compose_file.exists():
-            logger.warning(f"Service not found: {service_id}")
+            logger.warning("Service not found: %s", service_id)
             return None
 
         return self._parse_service(service_id, compose_file)
@@ -91,8 +170,10 @@ class ServiceManager:
             compose_file: Path to docker-compose.yml
 
         Returns:
-            dict: Service metadata
+            ServiceDescriptor: Service metadata
         """
+        import yaml
+
         try:
             with open(compose_file, 'r') as f:
                 compose_data = yaml.safe_load(f)
@@ -100,7 +181,7 @@ class ServiceManager:
             # Get service definitions
             services = compose_data.get('services', {})
             if not services:
-                logger.warning(f"No services defined in {compose_file}")
+                logger.warning("No services defined in %s", compose_file)
                 return None
 
             # Find the service with openhomestack labels (usually first, but check all)
@@ -144,15 +225,15 @@ class ServiceManager:
                     with open(readme_file, 'r', encoding='utf-8') as f:
                         metadata['readme'] = f.read()
                 except Exception as e:
-                    logger.warning(f"Could not read README for {service_id}: {e}")
+                    logger.warning("Could not read README for %s: %s", service_id, e)
 
-            return metadata
+            return ServiceDescriptor.from_metadata(metadata)
 
         except yaml.YAMLError as e:
-            logger.error(f"YAML parsing error in {compose_file}: {e}")
+            logger.error("YAML parsing error in %s: %s", compose_file, e)
             return None
         except Exception as e:
-            logger.error(f"Error parsing {compose_file}: {e}")
+            logger.error("Error parsing %s: %s", compose_file, e)
             return None
 
     def _parse_labels(self, labels):
@@ -166,7 +247,14 @@ class ServiceManager:
             openhomestack.icon=film
             openhomestack.category=media
             openhomestack.url=http://localhost:32400/web
+            openhomestack.requires=dns,pihole
+            openhomestack.host=media
+            openhomestack.dns=5354
             openhomestack.install.prompt.claim_token=Plex Claim Token (optional)
+            openhomestack.limits.cpus=2
+            openhomestack.limits.memory=2g
+            openhomestack.limits.io_weight=200
+            openhomestack.logging.max_size=50m
 
         Args:
             labels: List of label strings or dict
@@ -180,7 +268,12 @@ class ServiceManager:
             'icon': 'box',  # default icon
             'category': 'other',
             'url': None,
-            'install_prompts': []
+            'install_prompts': [],
+            'limits': {},
+            'logging': {},
+            'requires': [],
+            'host': None,
+            'dns': None
         }
 
         # Handle both list and dict formats
@@ -200,11 +293,23 @@ class ServiceManager:
 
             parts = key.split('.')
 
-            if len(parts) == 2:
+            if len(parts) == 2 and parts[1] == 'requires':
+                # Other services that must be ready first: openhomestack.requires=dns,pihole
+                metadata['requires'] = [s.strip() for s in value.split(',') if s.strip()]
+
+            elif len(parts) == 2:
                 # Simple labels: openhomestack.name
                 field = parts[1]
                 metadata[field] = value
 
+            elif len(parts) == 3 and parts[1] == 'limits':
+                # Resource budget: openhomestack.limits.cpus
+                metadata['limits'][parts[2]] = value
+
+            elif len(parts) == 3 and parts[1] == 'logging':
+                # Log rotation: openhomestack.logging.max_size
+                metadata['logging'][parts[2]] = value
+
             elif len(parts) >= 4 and parts[1] == 'install' and parts[2] == 'prompt':
                 # Installation prompts: openhomestack.install.prompt.claim_token
                 prompt_key = '.'.join(parts[3:])
@@ -216,6 +321,77 @@ class ServiceManager:
 
         return metadata
 
+    def get_dependency_layers(self, service_id):
+        """
+        Order a service's compose services by their depends_on relations
+
+        Args:
+            service_id: Service identifier
+
+        Returns:
+            list: Layers (lists of compose service names); every service only
+                depends on services in earlier layers. Empty if the compose
+                file is missing or has a dependency cycle.
+        """
+        import yaml
+
+        compose_file = self.get_compose_file_path(service_id)
+        if not compose_file:
+            return []
+
+        try:
+            with open(compose_file, 'r') as f:
+                services = (yaml.safe_load(f) or {}).get('services') or {}
+        except (OSError, yaml.YAMLError) as e:
+            logger.error("Could not read dependencies of %s: %s", service_id, e)
+            return []
+
+        depends = {}
+        for name, definition in services.items():
+            deps = (definition or {}).get('depends_on') or []
+            # depends_on may be a list or a dict of name -> condition
+            depends[name] = {d for d in deps if d in services}
+
+        layers = []
+        remaining = dict(depends)
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                logger.error("Dependency cycle in %s: %s", compose_file, sorted(remaining))
+                return []
+            layers.append(ready)
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+        return layers
+
+    def get_images(self, service_id):
+        """
+        Image references declared in a service's compose file
+
+        Args:
+            service_id: Service identifier
+
+        Returns:
+            list: Image references such as plexinc/pms-docker:latest (sorted, unique)
+        """
+        import yaml
+
+        compose_file = self.get_compose_file_path(service_id)
+        if not compose_file:
+            return []
+
+        try:
+            with open(compose_file, 'r') as f:
+                services = (yaml.safe_load(f) or {}).get('services') or {}
+        except (OSError, yaml.YAMLError) as e:
+            logger.error("Could not read images of %s: %s", service_id, e)
+            return []
+
+        return sorted({(definition or {}).get('image') for definition in services.values()} - {None})
+
     def get_compose_file_path(self, service_id):
         """
         Get the path to a service's docker-compose.yml file
@@ -240,3 +416,15 @@ class ServiceManager:
             Path: Path to service directory
         """
         return self.services_dir / service_id
+
+    def get_data_dir(self, service_id):
+        """
+        Get the persistent data directory for a service
+
+        Args:
+            service_id: Service identifier
+
+        Returns:
+            Path: /home/containers/{service_id} (C:\\containers\\{service_id} on Windows)
+        """
+        return get_containers_root() / service_id
@@ -0,0 +1,580 @@
+"""
+Service Data Snapshots
+Incremental, chunk-deduplicated backups of /home/containers/<service>
+"""
+
+import os
+import re
+import json
+import stat
+import time
+import shutil
+import hashlib
+import secrets
+import tarfile
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from api.services import get_containers_root
+
+# fcntl is only available on POSIX; without it the store lock only covers this process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Files are split into fixed-size chunks that are stored once by content hash
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Block size of the read/write copy used where sendfile is unavailable
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# IDs sort in creation order; those taken before microseconds were added have no fraction
+_SNAPSHOT_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}(\.[0-9]{6})?Z-[0-9a-f]{6}$')
+
+
+def _default_snapshot_root():
+    return Path(os.environ.get('OPENHOMESTACK_SNAPSHOT_DIR') or get_containers_root() / '.snapshots')
+
+
+def _snapshot_id(created_at):
+    """Snapshot ID for a creation time, e.g. 20250101T030000.123456Z-1a2b3c"""
+    return (time.strftime('%Y%m%dT%H%M%S', time.gmtime(created_at))
+            + f'.{int(created_at % 1 * 1_000_000):06d}Z-' + secrets.token_hex(3))
+
+
+def _creation_order(path):
+    """Sort key of a manifest path; older IDs without a fraction count as .000000"""
+    name = path.stem
+    return name if '.' in name else name.replace('Z-', '.000000Z-', 1)
+
+
+def _write_all(fd, data):
+    """os.write until everything is written (sockets may accept less)"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _copy_range(src_fd, dst_fd, count):
+    """Copy bytes between file descriptors in the kernel, falling back to read/write"""
+    offset = 0
+    try:
+        while offset < count:
+            sent = os.sendfile(dst_fd, src_fd, offset, count - offset)
+            if sent == 0:
+                break
+            offset += sent
+        return
+    except (OSError, AttributeError):
+        # sendfile unsupported for this pair of descriptors (or platform)
+        pass
+
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    while offset < count:
+        block = os.read(src_fd, min(STREAM_BLOCK_SIZE, count - offset))
+        if not block:
+            break
+        _write_all(dst_fd, block)
+        offset += len(block)
+
+
+class SnapshotManager:
+    """
+    Creates, lists, streams and restores per-service data snapshots
+
+    Chunks are shared between snapshots, so everything that writes or reads
+    them holds the store lock shared, and deleting (which removes chunks no
+    manifest references) holds it exclusively. The lock is an flock on the
+    store root, so it also spans gunicorn workers.
+    """
+
+    def __init__(self, service_manager, container_manager, root=None):
+        """
+        Initialize snapshot manager
+
+        Args:
+            service_manager: ServiceManager used to resolve data directories
+            container_manager: ContainerManager used to quiesce services
+            root: Snapshot store directory (default: /home/containers/.snapshots)
+        """
+        self.service_manager = service_manager
+        self.container_manager = container_manager
+        self.root = Path(root) if root else _default_snapshot_root()
+        self.objects_dir = self.root / 'objects'
+        self._local_lock = threading.Lock()
+
+    @contextmanager
+    def _store_lock(self, exclusive=False):
+        """Hold the store lock: shared while using chunks, exclusive while deleting them"""
+        if fcntl is None:
+            with self._local_lock:
+                yield
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # A new open file per holder, so threads of one worker lock independently too
+        with open(self.root / '.lock', 'a+') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # ==================== Snapshot creation ====================
+
+    def create(self, service_id, quiesce=False):
+        """
+        Take an incremental snapshot of a service's data directory
+
+        Files whose size, mtime and inode match the previous snapshot reuse its
+        chunk list without being read. Other files are read in CHUNK_SIZE
+        pieces and only chunks not already in the store are written.
+
+        Args:
+            service_id: Service identifier
+            quiesce: Stop the service while reading and start it again afterwards
+
+        Returns:
+            dict: Snapshot summary
+
+        Raises:
+            ValueError: If the service or its data directory does not exist
+        """
+        data_dir = self._data_dir(service_id)
+        if not data_dir.is_dir():
+            raise ValueError(f"No data directory for service '{service_id}'")
+
+        with self._quiesced(service_id, quiesce), self._store_lock():
+            return self._create(service_id, data_dir)
+
+    def _create(self, service_id, data_dir):
+        started = time.time()
+        previous = self._latest_manifest(service_id)
+        previous_files = {
+            e['path']: e for e in (previous or {}).get('entries', []) if e['type'] == 'file'
+        }
+
+        stats = {"files": 0, "bytes": 0, "reused_files": 0, "new_chunks": 0, "new_bytes": 0}
+        entries = []
+
+        for dirpath, dirnames, filenames in os.walk(data_dir):
+            dirnames.sort()
+            rel_dir = os.path.relpath(dirpath, data_dir)
+            if rel_dir != '.':
+                entries.append(self._entry(rel_dir, os.lstat(dirpath), 'dir'))
+
+            for name in sorted(filenames + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]):
+                full = os.path.join(dirpath, name)
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                st = os.lstat(full)
+
+                if stat.S_ISLNK(st.st_mode):
+                    entry = self._entry(rel, st, 'symlink')
+                    entry['target'] = os.readlink(full)
+                    entries.append(entry)
+                elif stat.S_ISREG(st.st_mode):
+                    entry = self._entry(rel, st, 'file')
+                    entry['chunks'] = self._file_chunks(full, st, previous_files.get(rel), stats)
+                    entries.append(entry)
+                    stats['files'] += 1
+                    stats['bytes'] += st.st_size
+                # Sockets, fifos and devices are skipped
+
+        snapshot_id = _snapshot_id(started)
+        stats['duration_s'] = round(time.time() - started, 3)
+        manifest = {
+            "id": snapshot_id,
+            "service_id": service_id,
+            "created_at": started,
+            "parent": previous['id'] if previous else None,
+            "chunk_size": CHUNK_SIZE,
+            "stats": stats,
+            "entries": entries
+        }
+
+        manifest_dir = self.root / 'services' / service_id
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(manifest_dir / f'{snapshot_id}.json', json.dumps(manifest).encode('utf-8'))
+
+        logger.info("Snapshot %s of %s: %s files, %s new bytes in %ss",
+                    snapshot_id, service_id, stats['files'], stats['new_bytes'], stats['duration_s'])
+        return self._summary(manifest)
+
+    def _entry(self, rel, st, entry_type):
+        return {
+            "path": rel,
+            "type": entry_type,
+            "mode": stat.S_IMODE(st.st_mode),
+            "uid": st.st_uid,
+            "gid": st.st_gid,
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size if entry_type == 'file' else 0,
+            "inode": st.st_ino
+        }
+
+    def _file_chunks(self, path, st, previous, stats):
+        """Chunk digests of a file, reusing the previous snapshot when unchanged"""
+        if (previous and previous['size'] == st.st_size
+                and previous['mtime_ns'] == st.st_mtime_ns
+                and previous.get('inode') == st.st_ino):
+            stats['reused_files'] += 1
+            return previous['chunks']
+
+        chunks = []
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                if self._store_chunk(digest, data):
+                    stats['new_chunks'] += 1
+                    stats['new_bytes'] += len(data)
+                chunks.append([digest, len(data)])
+        return chunks
+
+    def _chunk_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def _store_chunk(self, digest, data):
+        """Write a chunk unless it already exists; returns True if written"""
+        path = self._chunk_path(digest)
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(path, data)
+        return True
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    # ==================== Listing ====================
+
+    def list(self, service_id):
+        """
+        List snapshots of a service, newest first
+
+        Returns:
+            list: Snapshot summaries
+        """
+        manifest_dir = self.root / 'services' / service_id
+        if not manifest_dir.is_dir():
+            return []
+        snapshots = []
+        for path in sorted(manifest_dir.glob('*.json'), key=_creation_order, reverse=True):
+            try:
+                snapshots.append(self._summary(self._read_manifest(path)))
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable snapshot manifest %s: %s", path, e)
+        return snapshots
+
+    def get_manifest(self, service_id, snapshot_id):
+        """
+        Load a snapshot manifest
+
+        Raises:
+            ValueError: If the snapshot id is malformed
+            FileNotFoundError: If the snapshot does not exist
+        """
+        if not _SNAPSHOT_ID_PATTERN.match(snapshot_id):
+            raise ValueError(f"Invalid snapshot id '{snapshot_id}'")
+        self._data_dir(service_id)
+        return self._read_manifest(self.root / 'services' / service_id / f'{snapshot_id}.json')
+
+    def _read_manifest(self, path):
+        with open(path, 'rb') as f:
+            return json.loads(f.read())
+
+    def _latest_manifest(self, service_id):
+        manifest_dir = self.root / 'services' / service_id
+        if not manifest_dir.is_dir():
+            return None
+        paths = sorted(manifest_dir.glob('*.json'), key=_creation_order)
+        return self._read_manifest(paths[-1]) if paths else None
+
+    def _summary(self, manifest):
+        return {
+            "id": manifest['id'],
+            "service_id": manifest['service_id'],
+            "created_at": manifest['created_at'],
+            "parent": manifest.get('parent'),
+            "stats": manifest['stats']
+        }
+
+    def delete(self, service_id, snapshot_id):
+        """
+        Delete a snapshot and any chunks no other snapshot references
+
+        Holds the store lock exclusively, so no snapshot being created can
+        reuse a chunk after it was found unreferenced.
+
+        Returns:
+            dict: Number of chunks and bytes freed
+        """
+        self.get_manifest(service_id, snapshot_id)
+        with self._store_lock(exclusive=True):
+            (self.root / 'services' / service_id / f'{snapshot_id}.json').unlink()
+            return self._collect_chunks()
+
+    def _collect_chunks(self):
+        """Remove chunks no manifest references (store lock held exclusively)"""
+        referenced = set()
+        for path in (self.root / 'services').glob('*/*.json'):
+            for entry in self._read_manifest(path)['entries']:
+                referenced.update(digest for digest, _ in entry.get('chunks', []))
+
+        freed_chunks = freed_bytes = 0
+        for chunk in self.objects_dir.glob('*/*'):
+            if chunk.name not in referenced and not chunk.name.startswith('.tmp-'):
+                freed_bytes += chunk.stat().st_size
+                chunk.unlink()
+                freed_chunks += 1
+
+        return {"freed_chunks": freed_chunks, "freed_bytes": freed_bytes}
+
+    # ==================== Download ====================
+
+    def _tar_header(self, entry):
+        info = tarfile.TarInfo(entry['path'])
+        info.mode = entry['mode']
+        info.uid = entry['uid']
+        info.gid = entry['gid']
+        info.mtime = entry['mtime_ns'] // 1_000_000_000
+        if entry['type'] == 'dir':
+            info.type = tarfile.DIRTYPE
+        elif entry['type'] == 'symlink':
+            info.type = tarfile.SYMTYPE
+            info.linkname = entry['target']
+        else:
+            info.size = entry['size']
+        return info.tobuf(format=tarfile.PAX_FORMAT)
+
+    def iter_tar(self, service_id, snapshot_id):
+        """
+        Stream a snapshot as an uncompressed tar archive
+
+        Headers and chunk contents are yielded as they are read, so the
+        download starts at once and needs no space beyond the store; only one
+        block of one chunk is held in memory at a time. The snapshot is
+        looked up before returning, so a missing one fails before any output.
+
+        Args:
+            service_id: Service identifier
+            snapshot_id: Snapshot identifier
+
+        Returns:
+            iterator: Consecutive pieces of the archive (bytes)
+
+        Raises:
+            ValueError: If the snapshot id is malformed
+            FileNotFoundError: If the snapshot does not exist
+        """
+        manifest = self.get_manifest(service_id, snapshot_id)
+        return self._tar_stream(manifest)
+
+    def _tar_stream(self, manifest):
+        # Held until the response is closed, so a delete cannot remove chunks mid-download
+        with self._store_lock():
+            for entry in manifest['entries']:
+                yield self._tar_header(entry)
+                if entry['type'] != 'file':
+                    continue
+                for digest, _ in entry['chunks']:
+                    with open(self._chunk_path(digest), 'rb') as f:
+                        while True:
+                            block = f.read(STREAM_BLOCK_SIZE)
+                            if not block:
+                                break
+                            yield block
+                padding = -entry['size'] % tarfile.BLOCKSIZE
+                if padding:
+                    yield b'\0' * padding
+            yield b'\0' * (tarfile.BLOCKSIZE * 2)
+
+    # ==================== Restore ====================
+
+    def restore(self, service_id, snapshot_id, quiesce=True):
+        """
+        Restore a service's data directory to a snapshot
+
+        Files are reassembled chunk by chunk with os.sendfile into a temporary
+        file that then replaces the original. Files not in the snapshot are
+        removed so the directory matches the snapshot exactly.
+
+        Args:
+            service_id: Service identifier
+            snapshot_id: Snapshot identifier
+            quiesce: Stop the service during the restore and start it afterwards
+
+        Returns:
+            dict: Restore summary
+        """
+        manifest = self.get_manifest(service_id, snapshot_id)
+        data_dir = self._data_dir(service_id)
+
+        with self._quiesced(service_id, quiesce), self._store_lock():
+            started = time.time()
+            data_dir.mkdir(parents=True, exist_ok=True)
+            wanted = {entry['path'] for entry in manifest['entries']}
+            restored = 0
+
+            for entry in manifest['entries']:
+                target = self._safe_target(data_dir, entry['path'])
+                if entry['type'] == 'dir':
+                    if target.is_symlink() or (target.exists() and not target.is_dir()):
+                        target.unlink()
+                    target.mkdir(parents=True, exist_ok=True)
+                elif entry['type'] == 'symlink':
+                    self._remove_path(target)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.symlink(entry['target'], target)
+                    continue
+                else:
+                    if target.is_dir() and not target.is_symlink():
+                        shutil.rmtree(target)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    self._restore_file(target, entry)
+                    restored += 1
+                self._apply_metadata(target, entry)
+
+            removed = self._remove_extra(data_dir, wanted)
+
+            # Directory mtimes change while their contents are written
+            for entry in manifest['entries']:
+                if entry['type'] == 'dir':
+                    self._apply_metadata(self._safe_target(data_dir, entry['path']), entry)
+
+        return {
+            "snapshot_id": snapshot_id,
+            "files_restored": restored,
+            "paths_removed": removed,
+            "duration_s": round(time.time() - started, 3)
+        }
+
+    def restore_tar(self, service_id, stream, quiesce=True):
+        """
+        Restore a service's data directory from an uploaded tar stream
+
+        The archive is read sequentially, so it is never buffered as a whole.
+        Existing files are overwritten; files absent from the archive are kept.
+
+        Args:
+            service_id: Service identifier
+            stream: Readable binary file object with a (optionally compressed) tar
+            quiesce: Stop the service during the restore and start it afterwards
+
+        Returns:
+            dict: Restore summary
+        """
+        data_dir = self._data_dir(service_id)
+
+        with self._quiesced(service_id, quiesce):
+            started = time.time()
+            data_dir.mkdir(parents=True, exist_ok=True)
+            count = 0
+            with tarfile.open(fileobj=stream, mode='r|*') as archive:
+                for member in archive:
+                    if not (member.isfile() or member.isdir() or member.issym()):
+                        continue
+                    if hasattr(tarfile, 'data_filter'):
+                        # Rejects absolute paths, traversal and links escaping data_dir
+                        archive.extract(member, data_dir, filter='data')
+                    else:
+                        self._safe_target(data_dir, member.name)
+                        if member.issym():
+                            self._safe_target(
+                                data_dir, os.path.join(os.path.dirname(member.name), member.linkname))
+                        archive.extract(member, data_dir)
+                    count += 1
+
+        return {"members_restored": count, "duration_s": round(time.time() - started, 3)}
+
+    def _restore_file(self, target, entry):
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.restore-')
+        try:
+            for digest, size in entry['chunks']:
+                src_fd = os.open(self._chunk_path(digest), os.O_RDONLY)
+                try:
+                    _copy_range(src_fd, fd, size)
+                finally:
+                    os.close(src_fd)
+            os.close(fd)
+            fd = None
+            os.replace(tmp_path, target)
+        finally:
+            if fd is not None:
+                os.close(fd)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _apply_metadata(self, target, entry):
+        try:
+            os.chmod(target, entry['mode'])
+            if hasattr(os, 'chown') and os.geteuid() == 0:
+                os.chown(target, entry['uid'], entry['gid'])
+            os.utime(target, ns=(entry['mtime_ns'], entry['mtime_ns']))
+        except OSError as e:
+            logger.debug("Could not restore metadata of %s: %s", target, e)
+
+    def _remove_path(self, target):
+        if target.is_symlink() or target.is_file():
+            target.unlink()
+        elif target.is_dir():
+            shutil.rmtree(target)
+
+    def _remove_extra(self, data_dir, wanted):
+        """Remove paths under data_dir that are not in the snapshot"""
+        removed = 0
+        for dirpath, dirnames, filenames in os.walk(data_dir, topdown=False):
+            for name in filenames + dirnames:
+                full = Path(dirpath) / name
+                rel = os.path.relpath(full, data_dir)
+                if rel not in wanted:
+                    self._remove_path(full)
+                    removed += 1
+        return removed
+
+    @contextmanager
+    def _quiesced(self, service_id, quiesce):
+        """Stop a running service for the duration of the block if requested"""
+        was_running = False
+        if quiesce:
+            # Fresh: a cached "running" would restart a service the user just stopped
+            was_running = self.container_manager.get_status(service_id, fresh=True).get('state') == 'running'
+            if was_running:
+                result = self.container_manager.stop(service_id)
+                if not result['success']:
+                    raise RuntimeError(f"Could not quiesce {service_id}: {result.get('error')}")
+        try:
+            yield
+        finally:
+            if was_running:
+                result = self.container_manager.start(service_id)
+                if not result['success']:
+                    logger.error("Could not restart %s: %s", service_id, result.get('error'))
+
+    # ==================== Helpers ====================
+
+    def _data_dir(self, service_id):
+        if not self.service_manager.get_compose_file_path(service_id):
+            raise ValueError(f"Service '{service_id}' not found")
+        return self.service_manager.get_data_dir(service_id)
+
+    def _safe_target(self, data_dir, rel_path):
+        """Resolve a relative path inside data_dir, rejecting traversal"""
+        target = Path(os.path.normpath(data_dir / rel_path))
+        if os.path.isabs(rel_path) or (target != data_dir and data_dir not in target.parents):
+            raise ValueError(f"Unsafe path in snapshot: {rel_path}")
+        return target
@@ -0,0 +1,168 @@
+"""
+Startup Instrumentation
+Lazy construction helpers, background warm-up and the startup-time report
+"""
+
+import os
+import sys
+import time
+import importlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.environ.get('OPENHOMESTACK_WARMUP', 'true').lower() not in ('0', 'false', 'no')
+
+# Heavy optional modules imported on first use or by the warm-up thread
+HEAVY_MODULES = ('yaml', 'psutil', 'docker')
+
+_MODULE_LOADED = time.time()
+
+
+def process_start_time():
+    """
+    Wall-clock time at which this process was started
+
+    Reads /proc on Linux so interpreter boot is included; falls back to the
+    time this module was imported elsewhere.
+
+    Returns:
+        float: Unix timestamp
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime) follows the parenthesised command name
+            fields = f.read().rsplit(')', 1)[1].split()
+        start_ticks = int(fields[19])
+        with open('/proc/stat') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return _MODULE_LOADED
+
+
+class LazyInstance:
+    """
+    Proxy that constructs its target on first attribute access
+
+    Lets module-level singletons such as `container_manager` keep their names
+    while deferring construction (and the imports behind it) until a request
+    actually needs them.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    @property
+    def is_built(self):
+        """Whether the target has been constructed"""
+        return self._instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+
+class StartupReport:
+    """Records import timings, app creation and time to first request"""
+
+    def __init__(self):
+        self.process_started = process_start_time()
+        self.imports = {}
+        self.phases = {}
+        self.warmup = {}
+        self.first_request = None
+        self._lock = threading.Lock()
+
+    def _since_start_ms(self, timestamp=None):
+        return round(((timestamp or time.time()) - self.process_started) * 1000, 1)
+
+    def record_import(self, name, seconds):
+        """Record how long importing a module took"""
+        with self._lock:
+            self.imports[name] = round(seconds * 1000, 1)
+
+    def mark(self, phase):
+        """Record when a startup phase completed, relative to process start"""
+        with self._lock:
+            self.phases[phase] = self._since_start_ms()
+
+    def mark_first_request(self, path):
+        """Record the first request served by this process (only once)"""
+        if self.first_request is not None:
+            return
+        with self._lock:
+            if self.first_request is not None:
+                return
+            self.first_request = {"path": path, "ms": self._since_start_ms()}
+        logger.info("First request (%s) served %s ms after process start", path, self.first_request['ms'])
+
+    def timed_import(self, name):
+        """Import a module and record the time spent (zero if already loaded)"""
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        if name not in self.imports:
+            self.record_import(name, time.perf_counter() - started)
+        return module
+
+    def warm_up(self, steps):
+        """
+        Import heavy modules and run warm-up steps in a background thread
+
+        Args:
+            steps: List of (name, callable) run after the imports
+        """
+        if not WARMUP_ENABLED:
+            return
+
+        def run():
+            started = time.perf_counter()
+            for module in HEAVY_MODULES:
+                try:
+                    self.timed_import(module)
+                except ImportError as e:
+                    logger.warning("Warm-up could not import %s: %s", module, e)
+            for name, step in steps:
+                step_started = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    logger.warning("Warm-up step '%s' failed: %s", name, e)
+                with self._lock:
+                    self.warmup[name] = round((time.perf_counter() - step_started) * 1000, 1)
+            with self._lock:
+                self.warmup['total'] = round((time.perf_counter() - started) * 1000, 1)
+
+        threading.Thread(target=run, name='warm-up', daemon=True).start()
+
+    def as_dict(self):
+        """Report as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "process_started": self.process_started,
+                "uptime_s": round(time.time() - self.process_started, 1),
+                "imports_ms": dict(self.imports),
+                "phases_ms": dict(self.phases),
+                "first_request": dict(self.first_request) if self.first_request else None,
+                "warmup_ms": dict(self.warmup),
+                "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules]
+            }
+
+
+startup_report = StartupReport()
@@ -0,0 +1,168 @@
+"""
+State Versioning
+Monotonic version counter and change log for delta sync of the service table
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import deque
+from api.readiness import health_from_status
+
+# Changes kept for delta requests; clients further behind get a full snapshot
+STATE_LOG_SIZE = int(os.environ.get('OPENHOMESTACK_STATE_LOG_SIZE', 500))
+
+
+def build_entries(services, statuses, reachability=None):
+    """
+    Combine catalog, container status and reachability into one entry per service
+
+    Args:
+        services: Service mappings from ServiceManager.discover_services()
+        statuses: service_id -> status dict
+        reachability: service_id -> probe result (optional)
+
+    Returns:
+        dict: service_id -> service dict with a `status` key, as the dashboard renders it
+    """
+    reachability = reachability or {}
+    entries = {}
+    for service in services:
+        status = dict(statuses.get(service['id']) or {"state": "unknown"})
+        if reachability.get(service['id']):
+            status['reachability'] = reachability[service['id']]
+        entries[service['id']] = dict(service, status=status)
+    return entries
+
+
+def fingerprint(entry):
+    """
+    Hash of the parts of an entry that count as a change
+
+    Uptime text and probe latency change on every collection, so only the
+    container states, images, health and whether the service answers are
+    compared; an entry that is sent still carries their current values.
+    """
+    status = entry.get('status') or {}
+    containers = status.get('containers') or [status]
+    reachability = status.get('reachability') or {}
+    significant = {
+        "service": {key: value for key, value in entry.items() if key != 'status'},
+        "state": status.get('state'),
+        "host": status.get('host'),
+        "containers": [
+            [c.get('name'), c.get('id'), c.get('image'), c.get('state'), health_from_status(c.get('status_text'))]
+            for c in containers
+        ],
+        "up": reachability.get('state')
+    }
+    encoded = json.dumps(significant, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class StateTracker:
+    """
+    Assigns a version to every change of a service entry
+
+    Each changed (or removed) service advances the version by one and is
+    appended to a bounded log, so "what changed since version N" is a scan
+    of the log tail. The exported state is small (versions and hashes, no
+    entries) and is published in the collector snapshot for all workers.
+    """
+
+    def __init__(self, log_size=STATE_LOG_SIZE):
+        """
+        Initialize tracker
+
+        Args:
+            log_size: Number of changes kept for delta requests
+        """
+        self.version = 0
+        self._log = deque(maxlen=log_size)
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def restore(self, state):
+        """
+        Continue from a previously exported state (e.g. a new collector leader)
+
+        Versions keep increasing across leader changes, so clients holding
+        an old version still get a correct delta.
+        """
+        if not state:
+            return
+        with self._lock:
+            if state['version'] <= self.version:
+                return
+            self.version = state['version']
+            self._log.clear()
+            self._log.extend(tuple(change) for change in state['log'])
+            self._fingerprints = dict(state['fingerprints'])
+
+    def track(self, entries):
+        """
+        Record which entries changed since the last call
+
+        Args:
+            entries: service_id -> entry, as from build_entries()
+
+        Returns:
+            dict: Exported state (version, change log and fingerprints)
+        """
+        current = {service_id: fingerprint(entry) for service_id, entry in entries.items()}
+        with self._lock:
+            changed = sorted(sid for sid, fp in current.items() if self._fingerprints.get(sid) != fp)
+            removed = sorted(set(self._fingerprints) - set(current))
+            for service_id in changed + removed:
+                self.version += 1
+                self._log.append((self.version, service_id))
+            self._fingerprints = current
+            return self._export()
+
+    def export(self):
+        """Current state without tracking a new collection"""
+        with self._lock:
+            return self._export()
+
+    def _export(self):
+        return {
+            "version": self.version,
+            "log": [list(change) for change in self._log],
+            "fingerprints": dict(self._fingerprints)
+        }
+
+
+def state_delta(state, entries, since=None):
+    """
+    Entries changed after a client's version
+
+    Args:
+        state: Exported tracker state the entries belong to
+        entries: service_id -> current entry
+        since: Version the client last saw (None for a full snapshot)
+
+    Returns:
+        dict: version, whether this is a full snapshot, changed entries and
+            removed service IDs
+    """
+    version = state['version']
+    log = state['log']
+    # Oldest version the log can still bring up to date
+    floor = log[0][0] - 1 if log else version
+
+    if since is None or since > version or since < floor:
+        return {
+            "version": version,
+            "full": True,
+            "services": list(entries.values()),
+            "removed": []
+        }
+
+    changed = {service_id for change_version, service_id in log if change_version > since}
+    return {
+        "version": version,
+        "full": False,
+        "services": [entries[sid] for sid in sorted(changed) if sid in entries],
+        "removed": sorted(sid for sid in changed if sid not in entries)
+    }
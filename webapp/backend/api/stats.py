@@ -0,0 +1,52 @@
+"""
+Statistics Helpers
+Small summary statistics shared by the probers and analytics endpoints
+"""
+
+
+def percentile(sorted_values, pct):
+    """
+    Linear-interpolated percentile of an already sorted sequence
+
+    Args:
+        sorted_values: Ascending sequence of numbers
+        pct: Percentile between 0 and 100
+
+    Returns:
+        float: Percentile value or None for an empty sequence
+    """
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = rank - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def summarize(values, digits=2):
+    """
+    Summarize a set of samples as count, min, max and p50/p95/p99
+
+    Args:
+        values: Iterable of numbers
+        digits: Rounding precision
+
+    Returns:
+        dict: Summary statistics
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "min": None, "max": None, "p50": None, "p95": None, "p99": None}
+
+    return {
+        "count": len(ordered),
+        "min": round(ordered[0], digits),
+        "max": round(ordered[-1], digits),
+        "p50": round(percentile(ordered, 50), digits),
+        "p95": round(percentile(ordered, 95), digits),
+        "p99": round(percentile(ordered, 99), digits)
+    }
@@ -3,29 +3,103 @@ System Monitoring
 Provides system resource usage and information
 """
 
-import psutil
+import os
+import time
+import threading
 import logging
-import docker
+from collections import deque
+from api.cache import SingleFlightCache
+from api.hosts import host_registry
+from api.runner import command_runner
+from api.services import get_containers_root
 
 logger = logging.getLogger(__name__)
 
+# Seconds between background samples of CPU and I/O counters
+SAMPLE_INTERVAL = float(os.environ.get('OPENHOMESTACK_SYSTEM_SAMPLE_INTERVAL', 5))
+
+# Samples kept for /api/system/history (one hour at the default interval)
+HISTORY_SIZE = int(os.environ.get('OPENHOMESTACK_SYSTEM_HISTORY_SIZE', 720))
+
+# Seconds the first system info of a worker without the sampler measures CPU and I/O over
+LOCAL_PRIME_INTERVAL = 0.2
+
+# Loopback and per-container veth pairs would only duplicate the real interfaces
+IGNORED_INTERFACES = ('lo', 'veth')
+IGNORED_DISKS = ('loop', 'ram', 'zram')
+
+
+def counter_rates(previous, current, elapsed, fields):
+    """
+    Per-second rates between two sets of psutil counters
+
+    Args:
+        previous: name -> counters namedtuple from the earlier sample
+        current: name -> counters namedtuple from the later sample
+        elapsed: Seconds between the samples
+        fields: Output name -> counter attribute
+
+    Returns:
+        dict: name -> {output name: rate}; devices that appeared, or whose
+            counters went backwards (reset or wrapped), are left out
+    """
+    rates = {}
+    if elapsed <= 0:
+        return rates
+    for name, counters in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        deltas = {out: getattr(counters, attr) - getattr(before, attr) for out, attr in fields.items()}
+        if any(delta < 0 for delta in deltas.values()):
+            continue
+        rates[name] = {out: round(delta / elapsed, 1) for out, delta in deltas.items()}
+    return rates
+
+
+NET_FIELDS = {"rx_bps": "bytes_recv", "tx_bps": "bytes_sent"}
+DISK_FIELDS = {
+    "read_iops": "read_count",
+    "write_iops": "write_count",
+    "read_bps": "read_bytes",
+    "write_bps": "write_bytes"
+}
+
 
 class SystemMonitor:
     """Monitors system resources and Docker status"""
 
-    def __init__(self):
-        """Initialize system monitor"""
+    def __init__(self, sample_interval=SAMPLE_INTERVAL, history_size=HISTORY_SIZE):
+        """
+        Initialize system monitor
+
+        Args:
+            sample_interval: Seconds between background samples
+            history_size: Number of samples kept
+        """
         self._docker_client = None
+        self._info_cache = SingleFlightCache('system')
+        self.sample_interval = sample_interval
+        self._history = deque(maxlen=history_size)
+        self._latest = None
+        self._previous_counters = None
+        self._sample_lock = threading.Lock()
+        self._sampler_pid = None
+        self._local_counters = None
+        self._local_lock = threading.Lock()
+        self._listeners = []
+        self._metric_sources = {}
 
     @property
     def docker_client(self):
         """Lazy initialization of Docker client"""
         if self._docker_client is None:
             try:
+                import docker
                 self._docker_client = docker.from_env()
                 logger.info("Docker client initialized")
             except Exception as e:
-                logger.error(f"Failed to initialize Docker client: {e}")
+                logger.error("Failed to initialize Docker client: %s", e)
                 self._docker_client = None
         return self._docker_client
 
@@ -33,32 +107,247 @@ class SystemMonitor:
         """
         Get comprehensive system information
 
+        Concurrent callers share one collection and the result is cached
+        briefly with stale-while-revalidate (see api/cache.py).
+
         Returns:
             dict: System resource usage and status
         """
+        return self._info_cache.get('system', self._collect_system_info)
+
+    def start_sampler(self):
+        """
+        Start background sampling of CPU and I/O counters (idempotent, fork safe)
+
+        Rates are deltas between consecutive samples, so no request has to
+        wait for a measurement interval.
+        """
+        pid = os.getpid()
+        if self._sampler_pid == pid:
+            return
+        with self._sample_lock:
+            if self._sampler_pid == pid:
+                return
+            # A forked worker inherits the counters but not the sampling thread
+            self._sampler_pid = pid
+            self._previous_counters = None
+            threading.Thread(target=self._sample_loop, name='system-sampler', daemon=True).start()
+
+    def add_listener(self, callback):
+        """
+        Call a function with every new sample (e.g. the alert engine)
+
+        Listeners run on the sampling thread and should return quickly.
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def add_metrics(self, name, source):
+        """
+        Include externally measured metrics in every sample
+
+        Args:
+            name: Key of the metrics in each sample (e.g. "dns")
+            source: Callable returning a dict of current values, or None
+        """
+        self._metric_sources[name] = source
+
+    def _sample_loop(self):
+        while True:
+            try:
+                point = self.sample()
+            except Exception as e:
+                logger.error("System sampling failed: %s", e)
+                point = None
+            if point is not None:
+                for callback in self._listeners:
+                    try:
+                        callback(point)
+                    except Exception as e:
+                        logger.error("System sample listener failed: %s", e)
+            time.sleep(self.sample_interval)
+
+    def sample(self):
+        """
+        Take one sample and append it to the history
+
+        The first call only primes the counters; rates are available from the
+        second call on.
+
+        Returns:
+            dict: The new sample, or None after priming
+        """
+        import psutil
+
+        # Without an interval cpu_percent reports usage since its previous call
+        cpu_percent = psutil.cpu_percent(interval=None)
+        now, net, disk = self._read_counters()
+
+        with self._sample_lock:
+            previous = self._previous_counters
+            self._previous_counters = (now, net, disk)
+            if previous is None:
+                return None
+
+            elapsed = now - previous[0]
+            point = {
+                "ts": round(time.time(), 3),
+                "cpu_percent": cpu_percent,
+                "memory_percent": psutil.virtual_memory().percent,
+                "disk_percent": self._disk_percent(),
+                "net": counter_rates(previous[1], net, elapsed, NET_FIELDS),
+                "disk": counter_rates(previous[2], disk, elapsed, DISK_FIELDS)
+            }
+            for name, source in self._metric_sources.items():
+                try:
+                    values = source()
+                except Exception as e:
+                    logger.error("Metric source %s failed: %s", name, e)
+                    values = None
+                if values is not None:
+                    point[name] = values
+            self._latest = point
+            self._history.append(point)
+            return point
+
+    def _read_counters(self):
+        """Current network and disk I/O counters, with the monotonic time they were read"""
+        import psutil
+
+        net = {
+            name: counters for name, counters in psutil.net_io_counters(pernic=True).items()
+            if not name.startswith(IGNORED_INTERFACES)
+        }
+        disk = {
+            name: counters for name, counters in (psutil.disk_io_counters(perdisk=True) or {}).items()
+            if not name.startswith(IGNORED_DISKS)
+        }
+        return time.monotonic(), net, disk
+
+    def _local_rates(self):
+        """
+        CPU usage and I/O rates for a worker that does not run the sampler
+
+        Measured since this process's previous call, so only the first call
+        waits (LOCAL_PRIME_INTERVAL) to prime the counters.
+
+        Returns:
+            dict: ts, cpu_percent, net and disk, as in a sample
+        """
+        import psutil
+
+        with self._local_lock:
+            previous = self._local_counters
+            if previous is None:
+                psutil.cpu_percent(interval=None)
+                previous = self._read_counters()
+                time.sleep(LOCAL_PRIME_INTERVAL)
+            cpu_percent = psutil.cpu_percent(interval=None)
+            current = self._read_counters()
+            self._local_counters = current
+
+        elapsed = current[0] - previous[0]
+        return {
+            "ts": round(time.time(), 3),
+            "cpu_percent": cpu_percent,
+            "net": counter_rates(previous[1], current[1], elapsed, NET_FIELDS),
+            "disk": counter_rates(previous[2], current[2], elapsed, DISK_FIELDS)
+        }
+
+    def _disk_percent(self):
+        """Space used on the partition holding the service data"""
+        import psutil
+
+        try:
+            return psutil.disk_usage(str(get_containers_root())).percent
+        except OSError:
+            return psutil.disk_usage('/').percent
+
+    def history(self, since=None):
+        """
+        Samples taken by this process, oldest first
+
+        Empty unless this process runs the sampler (the collector leader, or
+        every process when the collector is disabled); other workers read the
+        leader's history from the collector snapshot.
+
+        Args:
+            since: Only samples taken after this Unix timestamp
+
+        Returns:
+            list: Sample dicts with CPU and memory percent and I/O rates
+        """
+        with self._sample_lock:
+            points = list(self._history)
+        if since is not None:
+            points = [point for point in points if point['ts'] > since]
+        return points
+
+    def _collect_system_info(self):
+        """Collect system information from psutil and every Docker host"""
+        with self._sample_lock:
+            latest = self._latest
+        if latest is None and self._sampler_pid != os.getpid():
+            # Only the leader samples; a worker computing info itself measures locally
+            latest = self._local_rates()
         info = {
-            "cpu": self._get_cpu_info(),
+            "cpu": self._get_cpu_info(latest),
             "memory": self._get_memory_info(),
             "disk": self._get_disk_info(),
-            "docker": self._get_docker_info(),
-            "containers": self._get_container_stats()
+            "network_io": latest['net'] if latest else {},
+            "disk_io": latest['disk'] if latest else {},
+            "sampled_at": latest['ts'] if latest else None
+        }
+        hosts = self._get_hosts_info()
+
+        # Top-level docker info describes the default host; containers span all hosts
+        default = hosts.get(host_registry.default.name, {})
+        info["docker"] = default.get("docker", {"status": "unavailable"})
+        info["containers"] = [
+            container for host in hosts.values() for container in host.get("containers", [])
+        ]
+        info["hosts"] = {
+            name: {key: value for key, value in host.items() if key != "containers"}
+            for name, host in hosts.items()
         }
         return info
 
-    def _get_cpu_info(self):
-        """Get CPU usage information"""
+    def _get_hosts_info(self):
+        """Query Docker info and containers of all hosts concurrently"""
+        def query(host):
+            env = host.env()
+            containers = self._get_container_stats(env)
+            for container in containers:
+                container["host"] = host.name
+            return {"docker": self._get_docker_info(env), "containers": containers}
+
+        hosts = {}
+        for name, answer in host_registry.fan_out('system', query).items():
+            if answer['ok']:
+                hosts[name] = {"reachable": True, "latency_ms": answer['latency_ms'], **answer['result']}
+            else:
+                hosts[name] = {"reachable": False, "error": answer['error'],
+                               "docker": {"status": "unavailable"}}
+        return hosts
+
+    def _get_cpu_info(self, latest=None):
+        """Get CPU usage information, from the latest background sample if there is one"""
+        import psutil
+
         try:
             return {
-                "percent": psutil.cpu_percent(interval=1),
+                "percent": latest['cpu_percent'] if latest else None,
                 "count": psutil.cpu_count(logical=True),
                 "physical_count": psutil.cpu_count(logical=False)
             }
         except Exception as e:
-            logger.error(f"Error getting CPU info: {e}")
+            logger.error("Error getting CPU info: %s", e)
             return {"error": str(e)}
 
     def _get_memory_info(self):
         """Get memory usage information"""
+        import psutil
+
         try:
             mem = psutil.virtual_memory()
             return {
@@ -68,11 +357,13 @@ class SystemMonitor:
                 "percent": mem.percent
             }
         except Exception as e:
-            logger.error(f"Error getting memory info: {e}")
+            logger.error("Error getting memory info: %s", e)
             return {"error": str(e)}
 
     def _get_disk_info(self):
         """Get disk usage for /home/containers"""
+        import psutil
+
         try:
             # Check /home/containers partition
             usage = psutil.disk_usage('/home/containers' if psutil.disk_partitions() else '/')
@@ -94,20 +385,17 @@ class SystemMonitor:
                     "note": "Root partition (containers path not available)"
                 }
             except Exception as e2:
-                logger.error(f"Error getting disk info: {e2}")
+                logger.error("Error getting disk info: %s", e2)
                 return {"error": str(e2)}
 
-    def _get_docker_info(self):
+    def _get_docker_info(self, env=None):
         """Get Docker daemon information using CLI, filtered to openHomeStack services only"""
-        import subprocess
-
         try:
             # Check if docker is running and get version
-            version_result = subprocess.run(
+            version_result = command_runner.run(
                 ['docker', 'info', '--format', '{{.ServerVersion}}'],
-                capture_output=True,
-                text=True,
-                timeout=5
+                timeout=5,
+                env=env
             )
 
             if version_result.returncode != 0:
@@ -116,27 +404,24 @@ class SystemMonitor:
             server_version = version_result.stdout.strip()
 
             # Count only openHomeStack containers (those with our label)
-            running_result = subprocess.run(
+            running_result = command_runner.run(
                 ['docker', 'ps', '-q', '--filter', 'label=openhomestack.service'],
-                capture_output=True,
-                text=True,
-                timeout=5
+                timeout=5,
+                env=env
             )
             running_count = len([l for l in running_result.stdout.strip().split('\n') if l])
 
-            stopped_result = subprocess.run(
+            stopped_result = command_runner.run(
                 ['docker', 'ps', '-aq', '--filter', 'label=openhomestack.service', '--filter', 'status=exited'],
-                capture_output=True,
-                text=True,
-                timeout=5
+                timeout=5,
+                env=env
             )
             stopped_count = len([l for l in stopped_result.stdout.strip().split('\n') if l])
 
-            total_result = subprocess.run(
+            total_result = command_runner.run(
                 ['docker', 'ps', '-aq', '--filter', 'label=openhomestack.service'],
-                capture_output=True,
-                text=True,
-                timeout=5
+                timeout=5,
+                env=env
             )
             total_count = len([l for l in total_result.stdout.strip().split('\n') if l])
 
@@ -149,21 +434,18 @@ class SystemMonitor:
             }
 
         except Exception as e:
-            logger.error(f"Error getting Docker info: {e}")
+            logger.error("Error getting Docker info: %s", e)
             return {"status": "unavailable"}
 
-    def _get_container_stats(self):
+    def _get_container_stats(self, env=None):
         """Get basic stats for openHomeStack containers only"""
-        import subprocess
-
         try:
             # Only get containers with our label
-            result = subprocess.run(
+            result = command_runner.run(
                 ['docker', 'ps', '--filter', 'label=openhomestack.service',
                  '--format', '{{.Names}}\t{{.Status}}\t{{.Image}}\t{{.Label "openhomestack.service"}}'],
-                capture_output=True,
-                text=True,
-                timeout=10
+                timeout=10,
+                env=env
             )
 
             if result.returncode != 0:
@@ -191,5 +473,5 @@ class SystemMonitor:
             return stats
 
         except Exception as e:
-            logger.error(f"Error getting container stats: {e}")
+            logger.error("Error getting container stats: %s", e)
             return []
@@ -0,0 +1,337 @@
+"""
+Image Updates
+Registry digest checks, pre-pulling and minimal-downtime container recreation
+"""
+
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from api.cache import SingleFlightCache
+from api.journal import operation_journal
+from api.readiness import ReadinessWaiter
+
+logger = logging.getLogger(__name__)
+
+# Optional registry (e.g. a local pull-through cache at localhost:5000) used
+# instead of Docker Hub for digest checks and pulls
+REGISTRY_MIRROR = os.environ.get('OPENHOMESTACK_REGISTRY_MIRROR', '').rstrip('/')
+
+# Registry checks are rate limited on Docker Hub; reuse results for a while
+UPDATE_CHECK_TTL = float(os.environ.get('OPENHOMESTACK_UPDATE_CHECK_TTL', 900))
+UPDATE_READY_TIMEOUT = float(os.environ.get('OPENHOMESTACK_UPDATE_READY_TIMEOUT', 120))
+UPDATE_MAX_PARALLEL = int(os.environ.get('OPENHOMESTACK_UPDATE_MAX_PARALLEL', 4))
+
+
+def split_image_ref(ref):
+    """
+    Split an image reference into repository and tag
+
+    Args:
+        ref: Image reference such as plexinc/pms-docker:latest or localhost:5000/app
+
+    Returns:
+        tuple: (repository, tag); tag defaults to latest
+    """
+    name, _, last = ref.rpartition('/')
+    if ':' in last:
+        last, tag = last.split(':', 1)
+    else:
+        tag = 'latest'
+    return (f"{name}/{last}" if name else last), tag
+
+
+def registry_ref(ref, mirror=REGISTRY_MIRROR):
+    """
+    Reference to query and pull, redirected to the registry mirror if configured
+
+    Only Docker Hub images are mirrored; images that name another registry
+    are used as-is.
+    """
+    if not mirror:
+        return ref
+    first = ref.split('/', 1)[0]
+    if '/' in ref and ('.' in first or ':' in first or first == 'localhost'):
+        if first not in ('docker.io', 'index.docker.io'):
+            return ref
+        ref = ref.split('/', 1)[1]
+    if '/' not in ref:
+        ref = f"library/{ref}"
+    return f"{mirror}/{ref}"
+
+
+class ImageUpdater:
+    """Checks installed services for newer images and applies them with minimal downtime"""
+
+    def __init__(self, service_manager, container_manager, readiness_waiter=None,
+                 ready_timeout=UPDATE_READY_TIMEOUT, max_parallel=UPDATE_MAX_PARALLEL):
+        """
+        Initialize image updater
+
+        Args:
+            service_manager: ServiceManager used for the catalog
+            container_manager: ContainerManager used to inspect and recreate services
+            readiness_waiter: ReadinessWaiter shared with the API (default: a new one)
+            ready_timeout: Seconds to wait for a recreated service to answer again
+            max_parallel: Maximum number of concurrent registry checks, pulls and recreates
+        """
+        self.service_manager = service_manager
+        self.container_manager = container_manager
+        self.readiness_waiter = readiness_waiter or ReadinessWaiter(service_manager, container_manager)
+        self.ready_timeout = ready_timeout
+        self.max_parallel = max_parallel
+        self._check_cache = SingleFlightCache('image-updates', ttl=UPDATE_CHECK_TTL, stale_ttl=0)
+        self._lock = threading.Lock()
+        self._run = None
+        self._thread = None
+
+    def _client(self, host_name):
+        client = self.container_manager.hosts.get(host_name).client()
+        if client is None:
+            raise ConnectionError(f"Docker client not available for host {host_name}")
+        return client
+
+    def check(self, refresh=False):
+        """
+        Compare the image of every installed service's containers with the registry
+
+        Args:
+            refresh: Ignore cached results
+
+        Returns:
+            dict: service_id -> list of per-container image states
+        """
+        if refresh:
+            self._check_cache.invalidate()
+        return self._check_cache.get('all', self._check_all)
+
+    def _service_containers(self):
+        """Containers of all services on every reachable host, grouped by service"""
+        def list_containers(host):
+            client = self._client(host.name)
+            return client, client.containers.list(all=True, filters={'label': 'openhomestack.service'})
+
+        grouped = {}
+        clients = {}
+        for host_name, answer in self.container_manager.hosts.fan_out('image-list', list_containers).items():
+            if not answer['ok']:
+                logger.warning("Skipping image check on host %s: %s", host_name, answer['error'])
+                continue
+            client, containers = answer['result']
+            clients[host_name] = client
+            for container in containers:
+                grouped.setdefault(container.labels['openhomestack.service'], []).append((host_name, container))
+        return grouped, clients
+
+    def _check_all(self):
+        grouped, clients = self._service_containers()
+        if not clients:
+            raise ConnectionError("No Docker host available")
+
+        # Registry lookups go through a daemon but do not depend on which one
+        registry_client = next(iter(clients.values()))
+        refs = {container.attrs['Config']['Image'] for containers in grouped.values() for _, container in containers}
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='image-check') as executor:
+            remote = dict(zip(refs, executor.map(lambda ref: self._remote_digest(registry_client, ref), refs)))
+
+        report = {}
+        for service_id, containers in grouped.items():
+            entries = []
+            for host_name, container in containers:
+                ref = container.attrs['Config']['Image']
+                entry = {
+                    "container": container.name,
+                    "host": host_name,
+                    "compose_service": container.labels.get('com.docker.compose.service'),
+                    "image": ref,
+                    "remote_digest": remote[ref].get('digest'),
+                    "update_available": False
+                }
+                if remote[ref].get('error'):
+                    entry['error'] = remote[ref]['error']
+                else:
+                    entry['update_available'] = not self._has_digest(
+                        clients[host_name], container.attrs['Image'], remote[ref]['digest']
+                    )
+                entries.append(entry)
+            report[service_id] = entries
+        return report
+
+    def _remote_digest(self, client, ref):
+        """Manifest digest of a reference in the registry (or mirror)"""
+        if '@sha256:' in ref:
+            return {"error": "Pinned to a digest"}
+        try:
+            data = client.images.get_registry_data(registry_ref(ref))
+            return {"digest": data.id}
+        except Exception as e:
+            logger.warning("Could not check registry digest of %s: %s", ref, e)
+            return {"error": str(e)}
+
+    def _has_digest(self, client, image_id, digest):
+        """Whether a local image was pulled from the given manifest digest"""
+        try:
+            repo_digests = client.images.get(image_id).attrs.get('RepoDigests') or []
+        except Exception:
+            return False
+        return any(d.endswith(f"@{digest}") for d in repo_digests)
+
+    def start(self, service_ids=None):
+        """
+        Update services in a background thread
+
+        Images are pulled first while the old containers keep serving; only
+        containers whose image changed are then recreated.
+
+        Args:
+            service_ids: Services to update (default: all with updates available)
+
+        Returns:
+            dict: Services and images that will be updated
+
+        Raises:
+            RuntimeError: If an update is already running
+            ConnectionError: If no Docker host is available
+        """
+        report = self.check(refresh=True)
+        selected = {
+            service_id: [entry for entry in entries if entry['update_available']]
+            for service_id, entries in report.items()
+            if service_ids is None or service_id in service_ids
+        }
+        selected = {service_id: entries for service_id, entries in selected.items() if entries}
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("An update is already in progress")
+            self._run = {
+                "state": "pulling",
+                "started_at": time.time(),
+                "finished_at": None,
+                "images": {},
+                "services": {
+                    service_id: {"state": "pending", "containers": [e['container'] for e in entries]}
+                    for service_id, entries in selected.items()
+                }
+            }
+            # Each image is pulled on every host that runs it
+            for entries in selected.values():
+                for entry in entries:
+                    image = self._run['images'].setdefault(entry['image'], {"state": "pending", "hosts": []})
+                    if entry['host'] not in image['hosts']:
+                        image['hosts'].append(entry['host'])
+            self._thread = threading.Thread(target=self._apply, args=(selected,), name='image-update', daemon=True)
+            self._thread.start()
+
+        logger.info("Updating %s services (%s images)", len(selected), len(self._run['images']))
+        return {"services": sorted(selected), "images": sorted(self._run['images'])}
+
+    def status(self):
+        """
+        Progress and per-service downtime of the current or last update
+
+        Returns:
+            dict: Run state, or None if no update has been run
+        """
+        with self._lock:
+            if self._run is None:
+                return None
+            run = dict(self._run)
+            run['images'] = {ref: dict(entry) for ref, entry in self._run['images'].items()}
+            run['services'] = {sid: dict(entry) for sid, entry in self._run['services'].items()}
+            return run
+
+    def _set(self, section, key, **fields):
+        with self._lock:
+            self._run[section][key].update(fields)
+
+    def _apply(self, selected):
+        # Phase 1: pull everything up front, old containers keep running
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='image-pull') as executor:
+            pulled = dict(zip(
+                self._run['images'],
+                executor.map(lambda ref: self._pull(ref, list(self._run['images'][ref]['hosts'])),
+                             list(self._run['images']))
+            ))
+
+        for service_id, entries in selected.items():
+            for ref in {entry['image'] for entry in entries}:
+                image = self._run['images'][ref]
+                operation_journal.record(
+                    service_id, 'pull', image['started_at'], image['ended_at'],
+                    exit_code=0 if pulled[ref] else 1, output=image.get('error') or ref
+                )
+
+        with self._lock:
+            self._run['state'] = 'recreating'
+
+        # Phase 2: recreate only services whose images are now available
+        def update_service(item):
+            service_id, entries = item
+            failed = [e['image'] for e in entries if not pulled.get(e['image'])]
+            if failed:
+                self._set('services', service_id, state="failed",
+                          error=f"Pull failed for {', '.join(sorted(set(failed)))}")
+                return
+            self._recreate(service_id, entries)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='image-recreate') as executor:
+            list(executor.map(update_service, selected.items()))
+
+        self._check_cache.invalidate()
+        with self._lock:
+            failed = any(s['state'] == 'failed' for s in self._run['services'].values())
+            self._run.update({
+                "state": "failed" if failed else "completed",
+                "finished_at": time.time()
+            })
+        logger.info("Image update finished")
+
+    def _pull(self, ref, host_names):
+        """Pull one image (through the mirror if configured) on each host; returns success"""
+        started = time.monotonic()
+        self._set('images', ref, state="pulling", started_at=time.time())
+        try:
+            source = registry_ref(ref)
+            repository, tag = split_image_ref(source)
+            for host_name in host_names:
+                image = self._client(host_name).images.pull(repository, tag=tag)
+                if source != ref:
+                    # Tag the mirrored image with the name the compose file uses
+                    target_repository, target_tag = split_image_ref(ref)
+                    image.tag(target_repository, tag=target_tag)
+            self._set('images', ref, state="pulled", image_id=image.id, ended_at=time.time(),
+                      pull_s=round(time.monotonic() - started, 2))
+            return True
+        except Exception as e:
+            logger.error("Failed to pull %s: %s", ref, e)
+            self._set('images', ref, state="failed", error=str(e), ended_at=time.time())
+            return False
+
+    def _recreate(self, service_id, entries):
+        """Recreate the changed containers of one service and measure its downtime"""
+        status = self.container_manager.get_status(service_id, fresh=True)
+        was_running = status.get('state') == 'running'
+        compose_services = sorted({e['compose_service'] for e in entries if e['compose_service']})
+
+        self._set('services', service_id, state="recreating")
+        started = time.monotonic()
+        result = self.container_manager.recreate(service_id, compose_services, start=was_running)
+        if not result['success']:
+            self._set('services', service_id, state="failed", error=result.get('error'))
+            return
+
+        if not was_running:
+            # Stopped services get the new image on their next start, no downtime
+            self._set('services', service_id, state="updated", downtime_s=0.0)
+            return
+
+        # Driven by Docker events; only the URL check is retried, with backoff
+        timeout = max(started + self.ready_timeout - time.monotonic(), 0)
+        readiness = self.readiness_waiter.wait(service_id, timeout=timeout, started=started)
+        ready = readiness['ready']
+        downtime = round(time.monotonic() - started, 2)
+        self._set('services', service_id, state="updated" if ready else "failed", downtime_s=downtime,
+                  **({} if ready else {"error": readiness['error']}))
+        logger.info("Updated %s: %ss downtime", service_id, downtime)
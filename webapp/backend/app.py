@@ -3,18 +3,27 @@ openHomeStack Backend API
 RESTful API for managing containerized services
 """
 
-from flask import Flask, jsonify
+import time
+
+_import_started = time.perf_counter()
+
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-from api.routes import api_bp
+from api.startup import startup_report
+startup_report.record_import('flask', time.perf_counter() - _import_started)
+
+_routes_started = time.perf_counter()
+from api.routes import api_bp, service_manager, container_manager, collector, boot_on_start, start_alerts
+startup_report.record_import('api.routes', time.perf_counter() - _routes_started)
+
 import logging
+from api.logconfig import configure_logging, logging_stats
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Log records are written by a background thread, never in request threads
+configure_logging()
 
 logger = logging.getLogger(__name__)
+startup_report.mark('imports_done')
 
 def create_app():
     """Application factory pattern"""
@@ -26,11 +35,30 @@ def create_app():
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    @app.before_request
+    def record_first_request():
+        startup_report.mark_first_request(request.path)
+
     # Health check endpoint
     @app.route('/health')
     def health():
-        return jsonify({"status": "healthy", "service": "openHomeStack API"})
+        return jsonify({"status": "healthy", "service": "openHomeStack API", "logging": logging_stats()})
+
+    # Startup timing report
+    @app.route('/health/startup')
+    def startup():
+        return jsonify(startup_report.as_dict())
+
+    # Heavy imports, manager construction and the first collection happen off the request path
+    startup_report.warm_up([
+        ('service_catalog', lambda: service_manager.discover_services()),
+        ('docker_client', lambda: container_manager.docker_client),
+        ('collector', collector.ensure_started),
+        ('boot', boot_on_start),
+        ('alerts', start_alerts)
+    ])
 
+    startup_report.mark('app_created')
     logger.info("openHomeStack backend API initialized")
     return app
 
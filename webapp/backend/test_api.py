@@ -114,6 +114,1284 @@ def test_system_info():
     return info
 
 
+def test_log_cursor():
+    """Test log cursor encoding round trip"""
+    from api.containers import encode_log_cursor, decode_log_cursor
+
+    print_section("Testing Log Cursor")
+
+    positions = {"grafana": "2024-01-15T12:00:00.000000000Z"}
+    cursor = encode_log_cursor(positions)
+    assert decode_log_cursor(cursor) == positions
+
+    try:
+        decode_log_cursor("not-a-cursor")
+        raise AssertionError("Invalid cursor was accepted")
+    except ValueError:
+        pass
+
+    print(f"\nCursor: {cursor}")
+
+
+def test_single_flight_cache():
+    """Test that concurrent identical reads share one computation"""
+    import threading
+    import time
+    from api.cache import SingleFlightCache
+
+    print_section("Testing Single-Flight Cache")
+
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    cache = SingleFlightCache('test', ttl=5, stale_ttl=5)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('key', slow_compute)))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [1] * 10
+    assert len(calls) == 1
+
+    cache.invalidate('key')
+    assert cache.get('key', slow_compute) == 2
+
+    print(f"\n10 concurrent reads, {len(calls) - 1} computation(s)")
+
+
+def test_resource_limits():
+    """Test validation and translation of resource budgets"""
+    from api.limits import normalize_limits, compose_limits, docker_update_kwargs
+
+    print_section("Testing Resource Limits")
+
+    limits = normalize_limits({'cpus': '1.5', 'memory': '512M', 'io_weight': '300'})
+    assert limits == {'cpus': 1.5, 'memory': '512m', 'io_weight': 300}
+    assert compose_limits(limits) == {
+        'cpus': 1.5, 'mem_limit': '512m', 'blkio_config': {'weight': 300}
+    }
+
+    kwargs = docker_update_kwargs(limits)
+    assert kwargs['cpu_quota'] == 150000
+    assert kwargs['mem_limit'] == 512 * 1024 ** 2
+
+    for invalid in ({'cpus': 0}, {'memory': '1k'}, {'io_weight': 5}, {'swap': '1g'}):
+        try:
+            normalize_limits(invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f"{invalid} should be rejected")
+
+    print(f"\n{limits} -> {kwargs}")
+
+
+def test_boot_order():
+    """Test the stack boot dependency graph and critical path"""
+    from api.boot import build_graph, boot_layers, critical_path
+
+    print_section("Testing Boot Order")
+
+    services = [
+        {'id': 'dns', 'requires': []},
+        {'id': 'plex', 'requires': ['dns', 'pihole']},
+        {'id': 'homeassistant', 'requires': ['dns']},
+        {'id': 'samba', 'requires': []},
+    ]
+    graph = build_graph(services, {'dns', 'plex', 'homeassistant', 'samba'})
+
+    # pihole is not installed, so plex only waits for dns
+    assert graph['plex'] == {'dns'}
+    assert boot_layers(graph) == [['dns', 'samba'], ['homeassistant', 'plex']]
+
+    path, total = critical_path(graph, {'dns': 5, 'plex': 20, 'homeassistant': 30, 'samba': 40})
+    assert path == ['samba'] and total == 40
+    path, total = critical_path(graph, {'dns': 25, 'plex': 20, 'homeassistant': 30, 'samba': 40})
+    assert path == ['dns', 'homeassistant'] and total == 55
+
+    try:
+        boot_layers({'a': {'b'}, 'b': {'a'}})
+        raise AssertionError("cycle should be rejected")
+    except ValueError:
+        pass
+
+    print(f"\nLayers: {boot_layers(graph)}, critical path: {path} ({total}s)")
+
+
+def test_image_refs():
+    """Test image reference parsing and registry mirror redirection"""
+    from api.updates import split_image_ref, registry_ref
+
+    print_section("Testing Image References")
+
+    assert split_image_ref('plexinc/pms-docker') == ('plexinc/pms-docker', 'latest')
+    assert split_image_ref('pihole/pihole:2024.07.0') == ('pihole/pihole', '2024.07.0')
+    assert split_image_ref('localhost:5000/app') == ('localhost:5000/app', 'latest')
+
+    mirror = 'localhost:5000'
+    assert registry_ref('nginx:latest', mirror) == 'localhost:5000/library/nginx:latest'
+    assert registry_ref('docker.io/plexinc/pms-docker', mirror) == 'localhost:5000/plexinc/pms-docker'
+    assert registry_ref('ghcr.io/home-assistant/home-assistant:stable', mirror) == \
+        'ghcr.io/home-assistant/home-assistant:stable'
+    assert registry_ref('nginx', '') == 'nginx'
+
+    print("\nImage references parsed and mirrored correctly")
+
+
+def test_operation_journal():
+    """Test batched journal writes and duration statistics"""
+    import tempfile
+    import time
+    from api.journal import OperationJournal
+
+    print_section("Testing Operation Journal")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = OperationJournal(Path(tmp) / 'journal.db')
+        now = time.time()
+        for i in range(20):
+            journal.record('plex', 'compose pull', now + i, now + i + 10 + i, exit_code=0)
+        journal.record('plex', 'compose stop', now, now + 120, output='Command timed out', timed_out=True)
+
+        assert len(journal.query(service_id='plex', action='compose pull', limit=50)) == 20
+        failed = journal.query(failed=True)
+        assert len(failed) == 1 and failed[0]['timed_out']
+
+        stats = {(g['service_id'], g['action']): g for g in journal.stats(service_id='plex')}
+        pull = stats[('plex', 'compose pull')]
+        assert pull['duration_s']['count'] == 20
+        assert pull['trend'] > 1
+        assert stats[('plex', 'compose stop')]['timeouts'] == 1
+
+    print(f"\nPull p50 {pull['duration_s']['p50']}s, trend {pull['trend']}x")
+
+
+def test_log_rate_limit():
+    """Test that repeated log templates are rate limited"""
+    import logging
+    from api.logconfig import RateLimitFilter
+
+    print_section("Testing Log Rate Limiting")
+
+    rate_filter = RateLimitFilter(limit=3, window=60)
+
+    def make(msg, level=logging.INFO):
+        return logging.LogRecord('api.services', level, __file__, 0, msg, ('plex',), None)
+
+    passed = [rate_filter.filter(make("Discovered service: %s")) for _ in range(10)]
+    assert passed.count(True) == 3
+    assert rate_filter.filter(make("Another message %s"))
+    assert rate_filter.filter(make("Discovered service: %s", logging.ERROR))
+
+    print(f"\n{passed.count(True)} of {len(passed)} repeated records logged")
+
+
+def test_host_fan_out():
+    """Test that a slow Docker host cannot hold up the others"""
+    import time
+    import threading
+    from api.hosts import HostRegistry, parse_hosts_env
+
+    print_section("Testing Multi-Host Fan-Out")
+
+    assert parse_hosts_env("core=,media=tcp://10.0.0.2:2375") == {'core': '', 'media': 'tcp://10.0.0.2:2375'}
+
+    registry = HostRegistry({'core': None, 'media': 'tcp://10.0.0.2:2375'}, {'plex': 'media'}, timeout=0.2)
+    assert registry.host_for('plex').name == 'media'
+    assert registry.host_for('pihole', label='nas').name == 'core'
+
+    release = threading.Event()
+
+    def query(host):
+        if host.name == 'media':
+            release.wait(5)
+        return host.name
+
+    started = time.perf_counter()
+    results = registry.fan_out('test', query)
+    elapsed = time.perf_counter() - started
+    assert results['core'] == {"ok": True, "result": 'core', "latency_ms": results['core']['latency_ms']}
+    assert not results['media']['ok']
+    assert elapsed < 1
+
+    # The stuck query is past its timeout, so the host is not queried again
+    again = registry.fan_out('test', query)
+    assert again['media']['error'] == "Previous query has not finished"
+    release.set()
+
+    # Concurrent healthy calls share the running query instead of failing
+    calls = []
+    gate = threading.Event()
+
+    def slow_query(host):
+        calls.append(host.name)
+        gate.wait(5)
+        return host.name
+
+    registry.timeout = 2
+    answers = []
+    callers = [threading.Thread(target=lambda: answers.append(registry.fan_out('shared', slow_query)))
+               for _ in range(3)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.1)
+    gate.set()
+    for caller in callers:
+        caller.join()
+    assert len(answers) == 3 and all(a[h]['ok'] and a[h]['result'] == h for a in answers for h in a)
+    assert sorted(calls) == ['core', 'media']
+
+    print(f"\nPartial results in {elapsed * 1000:.0f}ms: {sorted(h for h, r in results.items() if r['ok'])}")
+
+
+def test_state_delta():
+    """Test versioned delta sync of the service table"""
+    from api.state import StateTracker, build_entries, state_delta
+
+    print_section("Testing State Delta Sync")
+
+    services = [{'id': 'plex', 'name': 'Plex'}, {'id': 'pihole', 'name': 'Pi-hole'}]
+    statuses = {
+        'plex': {'state': 'running', 'status_text': 'Up 2 minutes (healthy)'},
+        'pihole': {'state': 'exited', 'status_text': 'Exited (0) 1 hour ago'}
+    }
+    tracker = StateTracker(log_size=3)
+    state = tracker.track(build_entries(services, statuses))
+    version = state['version']
+
+    # Uptime text alone is not a change
+    statuses['plex'] = {'state': 'running', 'status_text': 'Up 3 minutes (healthy)'}
+    assert tracker.track(build_entries(services, statuses))['version'] == version
+
+    statuses['pihole'] = {'state': 'running', 'status_text': 'Up 1 second'}
+    entries = build_entries(services, statuses)
+    delta = state_delta(tracker.track(entries), entries, since=version)
+    assert not delta['full']
+    assert [s['id'] for s in delta['services']] == ['pihole']
+
+    entries = build_entries(services[:1], statuses)
+    delta = state_delta(tracker.track(entries), entries, since=version + 1)
+    assert delta['removed'] == ['pihole']
+
+    # Too far behind the bounded log: full snapshot
+    assert state_delta(tracker.export(), entries, since=0)['full']
+
+    print(f"\nVersion {delta['version']}, removed {delta['removed']}")
+
+
+def test_io_rates():
+    """Test network and disk I/O rates from counter deltas"""
+    from collections import namedtuple
+    from api.system import counter_rates, NET_FIELDS
+
+    print_section("Testing I/O Rates")
+
+    Counters = namedtuple('Counters', ['bytes_recv', 'bytes_sent'])
+    previous = {'eth0': Counters(1000, 500), 'wlan0': Counters(5000, 5000)}
+    current = {
+        'eth0': Counters(11000, 2500),
+        'wlan0': Counters(10, 10),       # counters reset, skipped
+        'eth1': Counters(100, 100)       # new interface, no rate yet
+    }
+
+    rates = counter_rates(previous, current, 2.0, NET_FIELDS)
+    assert rates == {'eth0': {'rx_bps': 5000.0, 'tx_bps': 1000.0}}
+
+    print(f"\neth0: {rates['eth0']}")
+
+
+def test_alert_webhook():
+    """Test alert hysteresis, deduplication and webhook delivery"""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from api.alerts import AlertEngine, WebhookSink
+
+    print_section("Testing Alert Delivery")
+
+    received = []
+
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        engine = AlertEngine(
+            rules=[
+                {"name": "disk-full", "metric": "disk_percent", "above": 90, "clear": 85},
+                {"name": "crash-loop", "type": "flapping", "transitions": 3, "window": 60}
+            ],
+            sinks=[WebhookSink(f"http://127.0.0.1:{server.server_port}/hook")]
+        )
+        engine.start()
+
+        # 91 fires once, 88 is inside the hysteresis band, 80 resolves
+        for ts, value in enumerate([80, 91, 95, 88, 92, 80]):
+            engine.observe_metrics({"ts": ts, "disk_percent": value})
+        for ts, state in enumerate(['running', 'restarting', 'running', 'restarting']):
+            engine.observe_states({'plex': {'state': state}}, ts=ts)
+        engine.flush()
+    finally:
+        server.shutdown()
+
+    assert [(a['rule'], a['status']) for a in received] == [
+        ('disk-full', 'firing'), ('disk-full', 'resolved'), ('crash-loop', 'firing')
+    ]
+    # The resolved event describes the recovery, not the breach
+    assert received[0]['message'] == "disk_percent is 91, above 90"
+    assert received[1]['message'] == "disk_percent back to 80, below 85"
+    assert [a['rule'] for a in engine.active()] == ['crash-loop']
+
+    print(f"\nDelivered: {[(a['rule'], a['status']) for a in received]}")
+
+
+def test_dns_benchmark():
+    """Test the DNS benchmark against a local UDP stand-in resolver"""
+    import socket
+    import threading
+    from api.dnsbench import benchmark_resolver, resolver_address
+
+    print_section("Testing DNS Benchmark")
+
+    assert resolver_address('5354') == ('127.0.0.1', 5354)
+    assert resolver_address('53', 'tcp://192.168.1.21:2375') == ('192.168.1.21', 53)
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+
+    def answer():
+        while True:
+            try:
+                data, address = server.recvfrom(512)
+            except OSError:
+                return
+            # Echo the question back as a response; NXDOMAIN for .invalid names
+            rcode = 3 if b'\x07invalid\x00' in data else 0
+            server.sendto(data[:2] + bytes([0x81, 0x80 | rcode]) + data[4:], address)
+
+    threading.Thread(target=answer, daemon=True).start()
+    try:
+        results = benchmark_resolver(server.getsockname(), timeout=1)
+    finally:
+        server.close()
+
+    assert set(results) == {'cached', 'uncached', 'burst', 'nxdomain'}
+    assert results['burst']['answered'] == results['burst']['queries']
+    assert results['nxdomain']['rcodes'] == {'NXDOMAIN': results['nxdomain']['queries']}
+    assert results['cached']['latency_ms']['p99'] is not None
+
+    print(f"\nBurst: {results['burst']['qps']} qps, p95 {results['burst']['latency_ms']['p95']} ms")
+
+
+def test_log_policy():
+    """Test log policy validation and the compose logging section"""
+    from api.logpolicy import normalize_log_policy, compose_logging, max_log_bytes
+
+    print_section("Testing Log Policy")
+
+    policy = normalize_log_policy({'driver': 'json-file', 'max_size': '20M', 'max_file': '5', 'compress': 'no'})
+    assert policy == {'driver': 'json-file', 'max_size': '20m', 'max_file': 5, 'compress': False}
+    assert compose_logging(policy) == {
+        'driver': 'json-file',
+        'options': {'max-size': '20m', 'max-file': '5', 'compress': 'false'}
+    }
+    assert max_log_bytes(policy) == 100 * 1024 ** 2
+
+    for invalid in ({'driver': 'syslog'}, {'max_size': '100k'}, {'max_file': 0}, {'rotate': True}):
+        try:
+            normalize_log_policy(invalid)
+            raise AssertionError(f"Accepted invalid policy {invalid}")
+        except ValueError:
+            pass
+
+    print(f"\nLogging section: {compose_logging(policy)}")
+
+
+def test_command_runner():
+    """Test deadlines, process-group kills, slot limits and cancellation"""
+    import time
+    import subprocess
+    import tempfile
+    import threading
+    from api.runner import CommandRunner, CommandCancelled, deadline
+
+    print_section("Testing Command Runner")
+
+    runner = CommandRunner(run_dir=tempfile.mkdtemp(), concurrency=1, kill_grace=0.5)
+
+    # The request deadline cuts the command's own timeout short, and the
+    # background child dies with its group
+    started = time.time()
+    try:
+        with deadline(0.5):
+            runner.run(['sh', '-c', 'sleep 30 & echo $!; wait'], timeout=10)
+        raise AssertionError("Command was not stopped at the deadline")
+    except subprocess.TimeoutExpired as e:
+        child = int(e.output.split()[0])
+    assert time.time() - started < 5
+    time.sleep(0.2)
+    try:
+        with open(f'/proc/{child}/stat') as f:
+            assert f.read().rsplit(')', 1)[1].split()[0] == 'Z', "Child outlived its process group"
+    except FileNotFoundError:
+        pass
+
+    # A cancelled command raises, and holds its slot until it ends
+    outcome = {}
+
+    def long_run():
+        try:
+            runner.run(['sleep', '30'], service='demo')
+        except CommandCancelled as e:
+            outcome['error'] = e
+
+    worker = threading.Thread(target=long_run)
+    worker.start()
+    while not runner.active():
+        time.sleep(0.05)
+    try:
+        runner.run(['true'], timeout=0.3)
+        raise AssertionError("Second command ran past the concurrency limit")
+    except subprocess.TimeoutExpired:
+        pass
+    run_id = runner.active()[0]['id']
+    assert runner.cancel_service('demo') == [run_id]
+    worker.join(5)
+    assert isinstance(outcome.get('error'), CommandCancelled)
+    assert runner.active() == []
+    assert runner.run(['echo', 'ok']).stdout.strip() == 'ok'
+
+    print("\nDeadline, group kill, slot limit and cancellation behave as expected")
+
+
+def test_gc_plan():
+    """Test which images, containers and volumes garbage collection selects"""
+    from api.gc import plan_host, normalize_repository
+
+    print_section("Testing Garbage Collection Plan")
+
+    assert normalize_repository('docker.io/library/nginx:1.25') == 'nginx'
+    assert normalize_repository('pihole/pihole@sha256:abc') == 'pihole/pihole'
+
+    def container(cid, service, state, image, created, number='1'):
+        return {"Id": cid, "Names": [f"/{cid}"], "State": state, "ImageID": image, "Created": created,
+                "SizeRw": 100, "Labels": {"openhomestack.service": service,
+                                          "com.docker.compose.service": service,
+                                          "com.docker.compose.container-number": number}}
+
+    def image(iid, created, tags=(), digests=()):
+        return {"Id": iid, "Created": created, "Size": 1000, "SharedSize": 400,
+                "RepoTags": list(tags), "RepoDigests": list(digests)}
+
+    df = {
+        "Containers": [
+            container('pihole-new', 'pihole', 'running', 'img4', 40),
+            container('pihole-old', 'pihole', 'exited', 'img3', 30),
+            container('plex', 'plex', 'exited', 'img9', 10),
+            container('gone', 'removed-service', 'exited', 'img9', 10),
+        ],
+        "Images": [
+            image('img4', 4, tags=['pihole/pihole:latest']),
+            image('img3', 3, digests=['pihole/pihole@sha256:3']),
+            image('img2', 2, digests=['pihole/pihole@sha256:2']),
+            image('img1', 1, digests=['docker.io/pihole/pihole@sha256:1']),
+            image('other', 1, tags=['someone/else:latest']),
+        ],
+        "Volumes": [
+            {"Name": "pihole_data", "Labels": {"com.docker.compose.project": "pihole"},
+             "UsageData": {"Size": 5000, "RefCount": 0}},
+            {"Name": "plex_data", "Labels": {"com.docker.compose.project": "plex"},
+             "UsageData": {"Size": 5000, "RefCount": 1}},
+        ]
+    }
+    plan = plan_host(df, {'pihole/pihole'}, {'pihole', 'plex'}, keep_images=1)
+
+    assert sorted(c['id'] for c in plan['containers']) == ['gone', 'pihole-old']
+    # img3 is freed by removing pihole-old; it is the newest unused image, kept for rollback
+    assert [i['id'] for i in plan['kept_images']] == ['img4', 'img3']
+    assert [i['id'] for i in plan['images']] == ['img2', 'img1']
+    assert [v['name'] for v in plan['volumes']] == ['pihole_data']
+    assert plan['reclaimable_bytes'] == {'containers': 200, 'images': 1200, 'volumes': 5000, 'total': 6400}
+
+    # Containers that stay keep their images in use
+    kept = plan_host(df, {'pihole/pihole'}, {'pihole', 'plex'}, keep_images=1, remove_containers=False)
+    assert [i['id'] for i in kept['kept_images']] == ['img4', 'img3', 'img2']
+
+    print(f"\nReclaimable: {plan['reclaimable_bytes']}")
+
+
+def test_readiness_events():
+    """Test that a readiness wait wakes up on Docker events instead of polling"""
+    import time
+    import queue
+    import threading
+    from types import SimpleNamespace
+    from api.readiness import ReadinessWaiter
+
+    print_section("Testing Event-Driven Readiness")
+
+    events = queue.Queue()
+    health = {'status': 'starting'}
+
+    class EventStream:
+        def __iter__(self):
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                yield event
+
+        def close(self):
+            events.put(None)
+
+    def list_containers(all=False, filters=None):
+        state = {'Status': 'running', 'Health': {'Status': health['status']}}
+        return [SimpleNamespace(name='demo', attrs={'State': state})]
+
+    client = SimpleNamespace(
+        events=lambda decode=True, filters=None: EventStream(),
+        containers=SimpleNamespace(list=list_containers)
+    )
+    host = SimpleNamespace(name='local', client=lambda: client)
+    container_manager = SimpleNamespace(client_for=lambda sid: client, host_for=lambda sid: host)
+    service_manager = SimpleNamespace(get_service=lambda sid: {'id': sid})
+
+    def become_healthy():
+        time.sleep(0.3)
+        health['status'] = 'healthy'
+        events.put({'Action': 'health_status: healthy', 'Actor': {'Attributes': {'openhomestack.service': 'demo'}}})
+
+    threading.Thread(target=become_healthy, daemon=True).start()
+    updates = list(ReadinessWaiter(service_manager, container_manager, timeout=5).watch('demo'))
+
+    assert [u['type'] for u in updates] == ['containers', 'containers', 'ready']
+    assert updates[0]['containers'][0]['health'] == 'starting'
+    result = updates[-1]
+    assert result['ready'] and result['url'] is None
+    # Woken by the event, long before the periodic re-check would have run
+    assert 0.2 < result['time_to_ready_s'] < 2
+
+    print(f"\nReady after {result['time_to_ready_s']}s")
+
+
+def test_catalog_snapshot():
+    """Test the slotted service descriptors and the pre-encoded catalog"""
+    import tempfile
+
+    print_section("Testing Catalog Snapshot")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service_dir = Path(tmp) / 'plex'
+        service_dir.mkdir()
+        compose_file = service_dir / 'docker-compose.yml'
+        compose_file.write_text(
+            "services:\n"
+            "  plex:\n"
+            "    image: plexinc/pms-docker\n"
+            "    labels:\n"
+            "      - openhomestack.name=Plex\n"
+            "      - openhomestack.url=http://localhost:32400/web\n"
+            "      - openhomestack.version=1.40\n"
+            "      - openhomestack.limits.memory=2g\n"
+            "      - openhomestack.install.prompt.claim_token=Plex Claim Token\n"
+        )
+
+        manager = ServiceManager(tmp)
+        catalog = manager.catalog()
+        plex = catalog.get('plex')
+
+        assert not hasattr(plex, '__dict__')
+        assert plex['url'] == 'http://localhost:32400/web' and plex['version'] == '1.40'
+        assert plex['limits'] == {'memory': '2g'}
+        assert plex['install_prompts'] == [{'key': 'claim_token', 'label': 'Plex Claim Token', 'env_var': 'CLAIM_TOKEN'}]
+        listed = json.loads(catalog.body)['services'][0]
+        assert listed['version'] == '1.40' and listed['install_prompts'] == plex['install_prompts']
+        assert manager.get_service('plex') is plex
+
+        # An unchanged rescan keeps the snapshot and its encoded body
+        assert manager._build_catalog() is catalog
+        compose_file.write_text(compose_file.read_text().replace('name=Plex', 'name=Plex Media Server'))
+        changed = manager._build_catalog()
+        assert changed is not catalog and changed.digest != catalog.digest
+
+        # Services published by the collector leader (a JSON round trip) map to the same snapshot
+        published = json.loads(changed.body)['services']
+        assert manager.catalog_from(published) is changed
+        assert manager.catalog_from(published) is changed
+
+    print(f"\nCatalog body: {len(catalog.body)} bytes, ETag {catalog.digest}")
+
+
+def test_snapshots():
+    """Test snapshot round trips, chunk deduplication, deletion and parent order"""
+    import io
+    import os
+    import tarfile
+    import tempfile
+    from api.snapshots import SnapshotManager
+
+    print_section("Testing Snapshots")
+
+    class Services:
+        def __init__(self, root):
+            self.root = Path(root)
+
+        def get_compose_file_path(self, service_id):
+            return self.root / 'docker-compose.yml'
+
+        def get_data_dir(self, service_id):
+            return self.root / service_id
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / 'app'
+        (data_dir / 'sub').mkdir(parents=True)
+        (data_dir / 'a.txt').write_bytes(b'hello')
+        (data_dir / 'b.txt').write_bytes(b'hello')
+        (data_dir / 'sub' / 'c.bin').write_bytes(os.urandom(10000))
+        os.symlink('a.txt', data_dir / 'link')
+        manager = SnapshotManager(Services(tmp), None, root=Path(tmp) / '.snapshots')
+
+        first = manager.create('app')
+        # a.txt and b.txt share one chunk
+        assert first['stats']['files'] == 3 and first['stats']['new_chunks'] == 2
+
+        original_c = (data_dir / 'sub' / 'c.bin').read_bytes()
+        (data_dir / 'sub' / 'c.bin').write_bytes(os.urandom(10000))
+        second = manager.create('app')
+        third = manager.create('app')
+        # Taken within the same second, yet each is the parent of the next
+        assert second['parent'] == first['id'] and third['parent'] == second['id']
+        assert second['stats']['reused_files'] == 2 and third['stats']['new_chunks'] == 0
+        assert [s['id'] for s in manager.list('app')] == [third['id'], second['id'], first['id']]
+
+        # Only the chunk of the replaced c.bin was first's alone; third shares all of second's
+        assert manager.delete('app', first['id']) == {"freed_chunks": 1, "freed_bytes": 10000}
+        assert manager.delete('app', second['id']) == {"freed_chunks": 0, "freed_bytes": 0}
+
+        expected_c = (data_dir / 'sub' / 'c.bin').read_bytes()
+        (data_dir / 'a.txt').unlink()
+        (data_dir / 'extra.txt').write_bytes(b'not in the snapshot')
+        result = manager.restore('app', third['id'], quiesce=False)
+        assert (data_dir / 'a.txt').read_bytes() == b'hello'
+        assert (data_dir / 'sub' / 'c.bin').read_bytes() == expected_c != original_c
+        assert os.readlink(data_dir / 'link') == 'a.txt'
+        assert not (data_dir / 'extra.txt').exists() and result['paths_removed'] == 1
+
+        stream = manager.iter_tar('app', third['id'])
+        with tarfile.open(fileobj=io.BytesIO(b''.join(stream))) as archive:
+            assert archive.extractfile('sub/c.bin').read() == expected_c
+            assert sorted(archive.getnames()) == ['a.txt', 'b.txt', 'link', 'sub', 'sub/c.bin']
+        # Nothing is spooled next to the chunks
+        assert not [p for p in Path(tmp).rglob('.export-*')]
+        # An abandoned download releases the store lock, so deletes are not blocked
+        stream = manager.iter_tar('app', third['id'])
+        next(stream)
+        stream.close()
+        assert manager.delete('app', third['id'])['freed_chunks'] > 0
+
+    print(f"\nSnapshots: {first['id']} -> {second['id']} -> {third['id']}")
+
+
+def test_lazy_managers():
+    """Test that importing the routes builds none of the managers"""
+    import subprocess
+
+    print_section("Testing Deferred Manager Construction")
+
+    # A fresh interpreter, so managers built by earlier tests do not count
+    script = (
+        "import api.routes as routes\n"
+        "from api.startup import LazyInstance\n"
+        "print(sorted(name for name, value in vars(routes).items()\n"
+        "             if isinstance(value, LazyInstance) and value._instance is not None))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    built = result.stdout.strip().splitlines()[-1]
+    assert built == '[]', f"Built at import: {built}"
+
+    print("\nNo manager is built by importing api.routes")
+
+
+def test_collector_refresh():
+    """Test that a refresh requested during a collection is not satisfied by it"""
+    import time
+    import tempfile
+    from api.collector import StateCollector
+
+    print_section("Testing Collector Refresh")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = StateCollector(run_dir=tmp, interval=60, enabled=True)
+        calls = []
+
+        def collect_status():
+            calls.append(time.time())
+            if len(calls) == 1:
+                # A service is started while the leader is still collecting
+                time.sleep(0.05)
+                collector.request_refresh()
+                time.sleep(0.05)
+            return {"state": "running" if len(calls) > 1 else "exited"}
+
+        collector.register('status', collect_status)
+
+        # The snapshot predates the refresh, so readers must not trust it
+        collector._publish(*collector._collect())
+        assert collector._load_snapshot()['sections']['status'] == {"state": "exited"}
+        assert collector._read_snapshot() is None
+
+        # The next collection starts after the refresh and satisfies it
+        time.sleep(0.05)
+        collector._publish(*collector._collect())
+        assert collector._read_snapshot()['sections']['status'] == {"state": "running"}
+
+        # Large sections live in their own file, parsed only by workers that read them
+        collector.register('history', lambda: list(range(1000)), separate=True)
+        collector._publish(*collector._collect())
+        assert 'history' not in collector._load_snapshot()['sections']
+        assert collector._load_section('history') == list(range(1000))
+
+    print("\nRefresh requested mid-collection forced the next read to be fresh")
+
+
+def test_sampler_leader_only():
+    """Test that reading system info or history does not start a sampler"""
+    print_section("Testing Leader-Only Sampling")
+
+    monitor = SystemMonitor(sample_interval=60)
+    assert monitor.history() == []
+    info = monitor.get_system_info()
+    # Only the collector leader (or start_alerts without a collector) starts it
+    assert monitor._sampler_pid is None
+    # A worker computing info itself still reports CPU and I/O, measured locally
+    assert info['cpu']['percent'] is not None and info['sampled_at'] is not None
+
+    monitor.sample()
+    point = monitor.sample()
+    assert monitor.history() == [point]
+    assert monitor.history(since=point['ts']) == []
+
+    print("\nWorkers read history without sampling themselves")
+
+
+def test_log_search():
+    """Test server-side log search with level filter, context and limit"""
+    from contextlib import contextmanager
+    from api.logs import LogSearcher, detect_level
+
+    print_section("Testing Log Search")
+
+    lines = [
+        "2024-01-15T12:00:00.000000001Z INFO (MainThread) starting\n",
+        "2024-01-15T12:00:01.000000001Z level=warn msg=\"slow disk\"\n",
+        "2024-01-15T12:00:02.000000001Z ERROR (MainThread) database locked\n",
+        "2024-01-15T12:00:03.000000001Z INFO (MainThread) retrying\n",
+        "2024-01-15T12:00:04.000000001Z ERROR (MainThread) Database locked again\n",
+        "2024-01-15T12:00:05.000000001Z INFO (MainThread) done\n",
+    ]
+
+    class Containers:
+        def find_container_names(self, service_id):
+            return ['homeassistant']
+
+        def host_for(self, service_id):
+            return None
+
+        @contextmanager
+        def log_stream(self, container_name, since=None, until=None, timeout=None, host=None):
+            yield iter(lines)
+
+    assert detect_level(lines[1]) == 'warning'
+    searcher = LogSearcher(Containers())
+
+    result = searcher.search('homeassistant', query='database locked', context=1)
+    assert result['match_count'] == 2
+    first = result['matches'][0]
+    assert first['level'] == 'error' and first['timestamp'] == '2024-01-15T12:00:02.000000001Z'
+    assert first['before'] == [lines[1].rstrip('\n')] and first['after'] == [lines[3].rstrip('\n')]
+
+    # Case sensitive: only the first line has the lowercase spelling
+    assert searcher.search('homeassistant', query='database', case_sensitive=True)['match_count'] == 1
+    # Level only, stopping at the limit
+    limited = searcher.search('homeassistant', level='warn', limit=2)
+    assert limited['match_count'] == 2 and limited['limit_reached']
+    assert limited['lines_scanned'] < len(lines)
+
+    try:
+        searcher.search('homeassistant')
+        raise AssertionError("a query or level should be required")
+    except ValueError:
+        pass
+
+    print(f"\n{result['match_count']} matches in {result['lines_scanned']} lines")
+
+
+def test_response_encoding():
+    """Test ETags, conditional GETs and content-encoding negotiation"""
+    import gzip
+    from flask import Flask
+    from api import responses
+    from api.responses import json_response, body_digest, encode_json
+
+    print_section("Testing Response Encoding")
+
+    app = Flask(__name__)
+    payload = {"success": True, "services": [{"id": f"service-{i}", "name": "x" * 50} for i in range(50)]}
+    body = encode_json(payload)
+    etag = f'"{body_digest(body)}"'
+
+    with app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+        response = json_response(payload)
+        assert response.headers['ETag'] == etag
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.get_data()) == body
+
+    with app.test_request_context('/', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'}):
+        response = json_response(payload)
+        assert response.status_code == 304 and response.get_data() == b''
+
+    # Brotli is preferred when installed, unless the client weights gzip higher
+    accept = 'br;q=0.5, gzip' if responses.brotli is not None else 'identity;q=0.5, gzip'
+    with app.test_request_context('/', headers={'Accept-Encoding': accept}):
+        assert json_response(payload).headers['Content-Encoding'] == 'gzip'
+
+    # Small bodies and errors are neither compressed nor tagged
+    with app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+        small = json_response({"success": False, "error": "nope"}, 404)
+        assert 'Content-Encoding' not in small.headers and 'ETag' not in small.headers
+
+    print(f"\n{len(body)} bytes, ETag {etag}")
+
+
+def test_endpoint_prober():
+    """Test concurrent background probes, hung endpoints and latency summaries"""
+    import socket
+    import threading
+    import time
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from api.prober import EndpointProber
+    from api.stats import percentile
+
+    print_section("Testing Endpoint Prober")
+
+    assert percentile([1, 2, 3, 4], 50) == 2.5 and percentile([], 95) is None
+
+    release = threading.Event()
+    hangs = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/hang':
+                hangs.append(1)
+                release.wait(5)
+            self.send_response(404 if self.path == '/missing' else 200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    # Threaded, so the hung request does not hold up the others on the server side
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    with socket.socket() as closed:
+        closed.bind(('127.0.0.1', 0))
+        refused = f"http://127.0.0.1:{closed.getsockname()[1]}"
+
+    targets = [('plex', f'{base}/'), ('grafana', f'{base}/missing'), ('hung', f'{base}/hang'), ('dead', refused)]
+    prober = EndpointProber(lambda: targets, timeout=5)
+    try:
+        prober.probe_all()
+        deadline = time.time() + 5
+        while len(prober.results()) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        results = prober.results()
+
+        # The hung endpoint does not hold up the others, and is not probed twice
+        assert 'hung' not in results
+        assert results['plex']['state'] == 'up' and results['plex']['latency']['count'] == 1
+        assert results['grafana']['state'] == 'up' and results['grafana']['status_code'] == 404
+        assert results['dead']['state'] == 'down' and results['dead']['consecutive_failures'] == 1
+        prober.probe_all()
+        time.sleep(0.2)
+        assert len(hangs) == 1
+    finally:
+        release.set()
+        server.shutdown()
+
+    print(f"\nplex answered in {results['plex']['latency_ms']}ms while 'hung' was still pending")
+
+
+def test_noop_install():
+    """Test that an install whose configuration and containers are unchanged is skipped"""
+    import tempfile
+
+    print_section("Testing No-op Install Detection")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service_dir = Path(tmp) / 'app'
+        (service_dir / 'config').mkdir(parents=True)
+        (service_dir / 'docker-compose.yml').write_text(
+            "services:\n  app:\n    image: nginx\n    labels:\n      - openhomestack.name=App\n"
+        )
+        (service_dir / 'config' / 'app.conf').write_text("port=80\n")
+
+        manager = ContainerManager()
+        manager.service_manager = ServiceManager(tmp)
+        compose_calls = []
+        container_ids = ['a1']
+        manager._run_compose_command = lambda *args, **kwargs: compose_calls.append(args[1]) or {"success": True}
+        manager._create_data_directories = lambda service_id: None
+        manager._journal = lambda *args: None
+        manager._query_status = lambda service_id: {"containers": [{"state": "running"}]}
+        manager._container_ids = lambda service_id: list(container_ids)
+
+        assert 'unchanged' not in manager.install('app', {'tz': 'UTC'})
+        assert manager.install('app', {'tz': 'UTC'}).get('unchanged')
+        assert len(compose_calls) == 1
+
+        # A different .env, an edited config template, a forced install or
+        # containers recreated outside openHomeStack each reconcile again
+        assert 'unchanged' not in manager.install('app', {'tz': 'Europe/Berlin'})
+        (service_dir / 'config' / 'app.conf').write_text("port=8080\n")
+        assert 'unchanged' not in manager.install('app', {'tz': 'Europe/Berlin'})
+        assert 'unchanged' not in manager.install('app', {'tz': 'Europe/Berlin'}, force=True)
+        container_ids[0] = 'b2'
+        assert 'unchanged' not in manager.install('app', {'tz': 'Europe/Berlin'})
+        assert manager.install('app', {'tz': 'Europe/Berlin'}).get('unchanged')
+        assert len(compose_calls) == 5
+
+    print(f"\n{len(compose_calls)} reconciles for 7 install requests")
+
+
+def test_dependency_layers():
+    """Test depends_on layering and layer-ordered lifecycle actions via the Docker API"""
+    import tempfile
+
+    print_section("Testing Dependency Layers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service_dir = Path(tmp) / 'nextcloud'
+        service_dir.mkdir()
+        (service_dir / 'docker-compose.yml').write_text(
+            "services:\n"
+            "  proxy:\n    image: nginx\n    depends_on: [app]\n"
+            "  app:\n    image: nextcloud\n    depends_on:\n      db: {condition: service_healthy}\n      cache: {}\n"
+            "  db:\n    image: postgres\n"
+            "  cache:\n    image: redis\n"
+        )
+        (Path(tmp) / 'loop').mkdir()
+        (Path(tmp) / 'loop' / 'docker-compose.yml').write_text(
+            "services:\n  a:\n    depends_on: [b]\n  b:\n    depends_on: [a]\n"
+        )
+        services = ServiceManager(tmp)
+
+        assert services.get_dependency_layers('nextcloud') == [['cache', 'db'], ['app'], ['proxy']]
+        assert services.get_dependency_layers('loop') == []
+        assert services.get_dependency_layers('missing') == []
+
+        events = []
+
+        class Container:
+            def __init__(self, name):
+                self.name = name
+                self.labels = {'com.docker.compose.service': name}
+
+            def start(self):
+                events.append(('start', self.name))
+
+            def stop(self, timeout=None):
+                events.append(('stop', self.name))
+
+        class Client:
+            class containers:
+                @staticmethod
+                def list(all=False, filters=None):
+                    return [Container(name) for name in ('proxy', 'db', 'app', 'cache')]
+
+        manager = ContainerManager()
+        manager.service_manager = services
+        manager.client_for = lambda service_id: Client()
+
+        assert manager._run_direct_action('nextcloud', 'restart') == {"success": True}
+        stops = [name for action, name in events if action == 'stop']
+        starts = [name for action, name in events if action == 'start']
+        # Dependents stop first and start last; a layer runs in parallel, so its order is free
+        assert stops[:2] == ['proxy', 'app'] and set(stops[2:]) == {'db', 'cache'}
+        assert set(starts[:2]) == {'db', 'cache'} and starts[2:] == ['app', 'proxy']
+        # Restart is a full stop, then a start
+        assert all(action == 'stop' for action, _ in events[:4])
+
+    print(f"\nRestart order: {events}")
+
+
+def test_cache_revalidation():
+    """Test stale-while-revalidate and that invalidation discards in-flight results"""
+    import threading
+    import time
+    from api.cache import SingleFlightCache
+
+    print_section("Testing Cache Revalidation")
+
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    cache = SingleFlightCache('test', ttl=0.3, stale_ttl=5)
+    assert cache.get('key', slow_compute) == 1
+    time.sleep(0.35)
+
+    # Stale: served at once, while a single background refresh runs
+    started = time.monotonic()
+    assert [cache.get('key', slow_compute) for _ in range(5)] == [1] * 5
+    assert time.monotonic() - started < 0.1
+    deadline = time.monotonic() + 5
+    while cache._in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get('key', slow_compute) == 2 and len(calls) == 2
+
+    # A computation that started before an invalidation is returned to its
+    # callers but not cached, since it may predate the change
+    release = threading.Event()
+
+    def blocked_compute():
+        release.wait(5)
+        return 'before'
+
+    cache = SingleFlightCache('test', ttl=60, stale_ttl=0)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(cache.get('key', blocked_compute)))
+    reader.start()
+    time.sleep(0.05)
+    cache.invalidate('key')
+    release.set()
+    reader.join()
+    assert results == ['before']
+    assert cache.get('key', lambda: 'after') == 'after'
+
+    # Failures are not cached either
+    def failing():
+        raise RuntimeError("docker unavailable")
+
+    try:
+        cache.get('other', failing)
+        raise AssertionError("failure should propagate")
+    except RuntimeError:
+        pass
+    assert cache.get('other', lambda: 'ok') == 'ok'
+
+    print(f"\n{len(calls)} computations for 7 stale-window reads")
+
+
+def test_journal_once_per_action():
+    """Test that an install is journaled once, not also as the compose command it ran"""
+    import subprocess
+    import tempfile
+    import api.containers as containers
+
+    print_section("Testing One Journal Entry per Action")
+
+    class Journal:
+        def __init__(self):
+            self.actions = []
+
+        def record(self, service_id, action, started_at, ended_at=None, **kwargs):
+            self.actions.append(action)
+
+    class Runner:
+        def run(self, cmd, **kwargs):
+            return subprocess.CompletedProcess(cmd, 0, stdout='', stderr='')
+
+    journal = Journal()
+    saved = containers.operation_journal, containers.command_runner
+    containers.operation_journal, containers.command_runner = journal, Runner()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / 'app').mkdir()
+            (Path(tmp) / 'app' / 'docker-compose.yml').write_text("services:\n  app:\n    image: nginx\n")
+            manager = ContainerManager()
+            manager.service_manager = ServiceManager(tmp)
+            manager._create_data_directories = lambda service_id: None
+            manager.client_for = lambda service_id: None
+
+            assert manager.install('app')['success']
+            assert manager.stop('app')['success']
+            assert manager.remove('app')['success']
+    finally:
+        containers.operation_journal, containers.command_runner = saved
+
+    # Commands that are not an operation of their own are still journaled
+    assert journal.actions == ['install', 'stop', 'compose down']
+
+    print(f"\nJournal: {journal.actions}")
+
+
+def test_log_cursor_same_timestamp():
+    """Test that lines sharing the cursor's timestamp survive a truncated read"""
+    from contextlib import contextmanager
+    from api.containers import encode_log_cursor, log_line_digest
+
+    print_section("Testing Log Cursor on Equal Timestamps")
+
+    ts = "2024-01-15T12:00:00.000000000Z"
+    later = "2024-01-15T12:00:01.000000000Z"
+    log = [f"{ts} line {i}\n" for i in range(4)] + [f"{ts} line 0\n", f"{later} done\n"]
+
+    @contextmanager
+    def log_stream(container_name, since=None, until=None, tail=None, timeout=30, host=None):
+        # docker logs --since is inclusive
+        yield iter([line for line in log if not since or line[:len(ts)] >= since])
+
+    manager = ContainerManager()
+    manager.find_container_names = lambda service_id: ['app']
+    manager.host_for = lambda service_id: None
+    manager.log_stream = log_stream
+
+    first = manager.get_logs('app', max_bytes=len(log[0]) * 6)
+    assert first['logs'] == ''.join(log)
+    assert '\n\n' not in first['logs']
+
+    # Start again from the oldest line, two lines per read
+    read = [log[0]]
+    cursor = encode_log_cursor({'app': [ts, [log_line_digest(log[0])]]})
+    while True:
+        result = manager.get_logs('app', since=cursor, max_bytes=len(log[0]) * 2)
+        if not result['logs']:
+            break
+        assert result['logs'].endswith('\n') and '\n\n' not in result['logs']
+        read.append(result['logs'])
+        cursor = result['cursor']
+
+    # The repeated "line 0" at the same timestamp is kept, nothing is duplicated
+    assert ''.join(read) == ''.join(log)
+
+    print(f"\nReads: {len(read)}")
+
+
+def test_all_resource_usage():
+    """Test that resource usage of every service is sampled once per host"""
+    import tempfile
+    from types import SimpleNamespace
+    from api.hosts import HostRegistry
+
+    print_section("Testing Aggregated Resource Usage")
+
+    stats = {
+        "cpu_stats": {"cpu_usage": {"total_usage": 300}, "system_cpu_usage": 2000, "online_cpus": 2},
+        "precpu_stats": {"cpu_usage": {"total_usage": 100}, "system_cpu_usage": 1000},
+        "memory_stats": {"usage": 1024, "stats": {"inactive_file": 24}},
+    }
+    sampled = []
+
+    def container(name, service_id):
+        def sample(stream=False):
+            sampled.append(name)
+            return stats
+        return SimpleNamespace(name=name, labels={'openhomestack.service': service_id},
+                               attrs={'HostConfig': {'NanoCpus': 2 * 10 ** 9}}, stats=sample)
+
+    class Containers:
+        def __init__(self, running):
+            self.running = running
+
+        def list(self, filters=None):
+            if self.running is None:
+                raise RuntimeError("connection refused")
+            return self.running
+
+    registry = HostRegistry(hosts={'local': None, 'nas': 'tcp://nas:2375'})
+    registry.get('local')._client = SimpleNamespace(containers=Containers(
+        [container('app', 'app'), container('app-db', 'app'), container('wiki', 'wiki')]))
+    registry.get('nas')._client = SimpleNamespace(containers=Containers(None))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ContainerManager()
+        manager.service_manager = ServiceManager(tmp)
+        manager.hosts = registry
+
+        usage = manager.get_all_resource_usage()
+        # Cached like the per-service reads, so workers falling back do not resample
+        assert manager.get_all_resource_usage() == usage
+
+    assert sorted(usage) == ['app', 'wiki']
+    assert [c['name'] for c in usage['app']['containers']] == ['app', 'app-db']
+    app = usage['app']['containers'][0]
+    assert app['cpu_percent'] == 40.0 and app['cpu_percent_of_budget'] == 20.0 and app['memory_bytes'] == 1000
+    # One docker stats per container; the unreachable host is left out
+    assert sorted(sampled) == ['app', 'app-db', 'wiki']
+
+    print(f"\nServices: {sorted(usage)}")
+
+
+def test_boot_uses_readiness_waiter():
+    """Test that boot waits through the shared readiness waiter and health parser"""
+    from types import SimpleNamespace
+    from api.boot import BootOrchestrator
+    from api.readiness import containers_ready
+
+    print_section("Testing Boot Readiness")
+
+    assert containers_ready({'state': 'running', 'status_text': 'Up 5 minutes (healthy)'})
+    assert containers_ready({'state': 'running', 'status_text': 'Up 5 minutes'})
+    assert not containers_ready({'state': 'running', 'status_text': 'Up 5 seconds (health: starting)'})
+    assert not containers_ready({'state': 'running', 'status_text': 'Up 5 minutes (unhealthy)'})
+
+    class Waiter:
+        def __init__(self):
+            self.waited = []
+
+        def wait(self, service_id, timeout=None, started=None):
+            self.waited.append(service_id)
+            if service_id == 'dns':
+                return {"ready": False, "error": "Not ready after 1s (waiting on URL)"}
+            return {"ready": True}
+
+    services = [
+        {'id': 'dns', 'requires': [], 'url': 'http://dns'},
+        {'id': 'plex', 'requires': ['dns'], 'url': None},
+        {'id': 'samba', 'requires': [], 'url': None},
+    ]
+    started = []
+    service_manager = SimpleNamespace(discover_services=lambda: services)
+    container_manager = SimpleNamespace(
+        get_status=lambda service_id, fresh=False: {'state': 'exited'},
+        start=lambda service_id: started.append(service_id) or {'success': True}
+    )
+    waiter = Waiter()
+    orchestrator = BootOrchestrator(service_manager, container_manager, waiter, ready_timeout=1)
+    orchestrator.start()
+    orchestrator._thread.join(5)
+
+    run = orchestrator.status()
+    assert sorted(waiter.waited) == ['dns', 'samba']
+    assert run['services']['dns'] == dict(run['services']['dns'], state='failed',
+                                          error="Not ready after 1s (waiting on URL)")
+    assert run['services']['plex']['state'] == 'skipped' and run['services']['samba']['state'] == 'ready'
+    assert 'plex' not in started
+
+    print(f"\nBoot: {run['state']}, waited on {sorted(waiter.waited)}")
+
+
 def main():
     """Run all tests"""
     print("\n" + "=" * 60)
@@ -134,6 +1412,99 @@ def main():
         # Test 4: System Info
         test_system_info()
 
+        # Test 5: Log cursors
+        test_log_cursor()
+
+        # Test 6: Request coalescing
+        test_single_flight_cache()
+
+        # Test 7: Resource limits
+        test_resource_limits()
+
+        # Test 8: Boot order
+        test_boot_order()
+
+        # Test 9: Image references
+        test_image_refs()
+
+        # Test 10: Operation journal
+        test_operation_journal()
+
+        # Test 11: Log rate limiting
+        test_log_rate_limit()
+
+        # Test 12: Multi-host fan-out
+        test_host_fan_out()
+
+        # Test 13: State delta sync
+        test_state_delta()
+
+        # Test 14: I/O rates
+        test_io_rates()
+
+        # Test 15: Alerts
+        test_alert_webhook()
+
+        # Test 16: DNS benchmark
+        test_dns_benchmark()
+
+        # Test 17: Log rotation policy
+        test_log_policy()
+
+        # Test 18: Command runner
+        test_command_runner()
+
+        # Test 19: Garbage collection plan
+        test_gc_plan()
+
+        # Test 20: Event-driven readiness
+        test_readiness_events()
+
+        # Test 21: Catalog snapshot
+        test_catalog_snapshot()
+
+        # Test 22: Service data snapshots
+        test_snapshots()
+
+        # Test 23: Deferred manager construction
+        test_lazy_managers()
+
+        # Test 24: Collector refresh during a collection
+        test_collector_refresh()
+
+        # Test 25: Leader-only system sampling
+        test_sampler_leader_only()
+
+        # Test 26: Log search
+        test_log_search()
+
+        # Test 27: Response encoding
+        test_response_encoding()
+
+        # Test 28: Endpoint prober
+        test_endpoint_prober()
+
+        # Test 29: No-op install detection
+        test_noop_install()
+
+        # Test 30: Dependency layers
+        test_dependency_layers()
+
+        # Test 31: Cache revalidation
+        test_cache_revalidation()
+
+        # Test 32: One journal entry per action
+        test_journal_once_per_action()
+
+        # Test 33: Log cursor on equal timestamps
+        test_log_cursor_same_timestamp()
+
+        # Test 34: Aggregated resource usage
+        test_all_resource_usage()
+
+        # Test 35: Boot readiness through the shared waiter
+        test_boot_uses_readiness_waiter()
+
         print_section("All Tests Completed")
         print("\nBackend API is working correctly!")
         print("\nNext steps:")
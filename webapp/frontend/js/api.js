@@ -38,6 +38,15 @@ class API {
         return await this.request('/services');
     }
 
+    /**
+     * Get services whose metadata or status changed since a state version
+     * Pass null to get a full snapshot
+     */
+    static async getState(since = null) {
+        const query = since === null ? '' : `?since=${since}`;
+        return await this.request(`/state${query}`);
+    }
+
     /**
      * Get details for a specific service
      */
@@ -45,21 +54,30 @@ class API {
         return await this.request(`/services/${serviceId}`);
     }
 
+    /**
+     * Query string for an optional readiness wait ('ready'); empty by default,
+     * so the call returns once the action is done and the status is polled as before
+     */
+    static waitQuery(wait) {
+        return wait ? `?wait=${encodeURIComponent(wait)}` : '';
+    }
+
     /**
      * Install a service
+     * With wait = 'ready' the response's readiness object reports whether it got ready in time
      */
-    static async installService(serviceId, envVars = {}) {
-        return await this.request(`/services/${serviceId}/install`, {
+    static async installService(serviceId, envVars = {}, wait = null) {
+        return await this.request(`/services/${serviceId}/install${this.waitQuery(wait)}`, {
             method: 'POST',
             body: JSON.stringify({ env: envVars })
         });
     }
 
     /**
-     * Start a service
+     * Start a service, optionally waiting until it is ready (wait = 'ready')
      */
-    static async startService(serviceId) {
-        return await this.request(`/services/${serviceId}/start`, {
+    static async startService(serviceId, wait = null) {
+        return await this.request(`/services/${serviceId}/start${this.waitQuery(wait)}`, {
             method: 'POST'
         });
     }
@@ -101,9 +119,28 @@ class API {
 
     /**
      * Get service logs
+     * Pass the cursor from a previous response as `since` to get only new lines
+     */
+    static async getServiceLogs(serviceId, tail = 100, since = null) {
+        const params = new URLSearchParams({ tail });
+        if (since) {
+            params.set('since', since);
+        }
+        return await this.request(`/services/${serviceId}/logs?${params}`);
+    }
+
+    /**
+     * Get CPU and memory usage of a service against its resource budget
+     */
+    static async getServiceResources(serviceId) {
+        return await this.request(`/services/${serviceId}/resources`);
+    }
+
+    /**
+     * Get CPU and memory usage of every running service in one request
      */
-    static async getServiceLogs(serviceId, tail = 100) {
-        return await this.request(`/services/${serviceId}/logs?tail=${tail}`);
+    static async getAllResources() {
+        return await this.request('/resources');
     }
 
     /**
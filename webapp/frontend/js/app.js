@@ -7,6 +7,8 @@ let allServices = [];
 let currentCategory = 'all';
 let currentServiceForInstall = null;
 let currentServiceForLogs = null;
+let currentLogsCursor = null;
+let stateVersion = null;
 
 // Icon mapping for services
 const serviceIcons = {
@@ -39,6 +41,7 @@ async function init() {
 
     // Load initial data
     await loadServices();
+    await loadResources();
     await loadSystemInfo();
 
     // Refresh system info every 5 seconds
@@ -46,34 +49,91 @@ async function init() {
 
     // Refresh services every 10 seconds
     setInterval(loadServices, 10000);
+    setInterval(loadResources, 10000);
 }
 
 /**
- * Load all services from API
+ * Load services and their status from API
+ * After the first load only services that changed since the last version are sent
  */
 async function loadServices() {
     try {
-        const response = await API.getServices();
-        allServices = response.services || [];
-
-        // Fetch status for each service
-        await Promise.all(allServices.map(async (service) => {
-            try {
-                const statusResponse = await API.getServiceStatus(service.id);
-                service.status = statusResponse.status;
-            } catch (error) {
-                console.error(`Failed to load status for ${service.id}:`, error);
-                service.status = { state: 'unknown' };
-            }
-        }));
+        const response = await API.getState(stateVersion);
+        const previous = new Map(allServices.map(service => [service.id, service]));
+        const changed = response.services || [];
 
-        renderServices();
+        // Resource usage is loaded separately; keep it across updates
+        changed.forEach(service => {
+            service.resources = previous.get(service.id)?.resources;
+        });
+
+        if (response.full) {
+            allServices = changed;
+            renderServices();
+        } else {
+            applyServiceChanges(previous, changed, response.removed || []);
+        }
+        stateVersion = response.version;
     } catch (error) {
         console.error('Failed to load services:', error);
+        stateVersion = null;
         showError('Failed to load services. Is the backend API running?');
     }
 }
 
+/**
+ * Apply a delta from the state API, re-rendering only the rows that changed
+ */
+function applyServiceChanges(previous, changed, removed) {
+    if (changed.length === 0 && removed.length === 0) return;
+
+    const changedIds = new Set(changed.map(service => service.id));
+    allServices = allServices
+        .filter(service => !removed.includes(service.id) && !changedIds.has(service.id))
+        .concat(changed);
+
+    // Rows are sorted and filtered, so anything that moves a row needs a full render
+    const reorders = removed.length > 0 || changed.some(service => {
+        const old = previous.get(service.id);
+        return !old
+            || old.name !== service.name
+            || old.category !== service.category
+            || (old.status?.state === 'running') !== (service.status?.state === 'running');
+    });
+    if (reorders) {
+        renderServices();
+        return;
+    }
+
+    const tbody = document.getElementById('servicesBody');
+    changed.forEach(service => {
+        const row = tbody.querySelector(`tr[data-service-id="${service.id}"]`);
+        if (row) {
+            row.outerHTML = createServiceRow(service);
+        }
+    });
+}
+
+/**
+ * Load CPU and memory usage of running services and update their rows in place
+ */
+async function loadResources() {
+    try {
+        // One request for all services; the server samples docker stats in the background
+        const resources = await API.getAllResources();
+        const usageByService = resources.services || {};
+        allServices.forEach(service => {
+            service.resources = usageByService[service.id]?.containers || [];
+            const usage = document.querySelector(`tr[data-service-id="${service.id}"] .usage-text`);
+            if (usage) {
+                usage.innerHTML = formatResourceUsage(service.resources);
+            }
+        });
+    } catch (error) {
+        console.error('Failed to load resources:', error);
+    }
+}
+
 /**
  * Load system information
  */
@@ -140,6 +200,17 @@ function createServiceRow(service) {
     const status = service.status?.state || 'not_installed';
     const statusClass = getStatusClass(status);
     const statusText = formatStatus(status);
+    const reachability = service.status?.reachability;
+    const reachabilityText = reachability
+        ? (reachability.state === 'up'
+            ? `<span class="description-text">${reachability.latency_ms} ms</span>`
+            : `<span class="description-text">Not responding</span>`)
+        : '';
+
+    const usageText = formatResourceUsage(service.resources);
+    const hostText = service.status?.host && service.status.host !== 'local'
+        ? `<span class="description-text">on ${service.status.host}</span>`
+        : '';
 
     return `
         <tr data-service-id="${service.id}">
@@ -151,6 +222,9 @@ function createServiceRow(service) {
             </td>
             <td>
                 <span class="status-badge ${statusClass}">${statusText}</span>
+                ${reachabilityText}
+                <span class="usage-text">${usageText}</span>
+                ${hostText}
             </td>
             <td>
                 <span class="category-badge">${service.category || 'other'}</span>
@@ -167,6 +241,32 @@ function createServiceRow(service) {
     `;
 }
 
+/**
+ * Summarize container CPU and memory usage, relative to the budget when one is set
+ */
+function formatResourceUsage(containers) {
+    if (!containers || containers.length === 0) return '';
+
+    let cpu = 0;
+    let memoryMb = 0;
+    let cpuBudget = 0;
+    let memoryBudgetMb = 0;
+    containers.forEach(container => {
+        cpu += container.cpu_percent || 0;
+        memoryMb += (container.memory_bytes || 0) / (1024 * 1024);
+        cpuBudget += container.cpu_limit || 0;
+        memoryBudgetMb += (container.memory_limit_bytes || 0) / (1024 * 1024);
+    });
+
+    const cpuText = cpuBudget
+        ? `CPU ${cpu.toFixed(0)}% of ${cpuBudget} cores`
+        : `CPU ${cpu.toFixed(0)}%`;
+    const memoryText = memoryBudgetMb
+        ? `${memoryMb.toFixed(0)} / ${memoryBudgetMb.toFixed(0)} MB`
+        : `${memoryMb.toFixed(0)} MB`;
+    return `<span class="description-text">${cpuText} · ${memoryText}</span>`;
+}
+
 /**
  * Get appropriate actions for a service based on its status
  */
@@ -299,10 +399,10 @@ async function confirmInstall() {
             }
         });
 
-        await API.installService(currentServiceForInstall.id, envVars);
+        const result = await API.installService(currentServiceForInstall.id, envVars);
 
         closeInstallModal();
-        showSuccess(`${currentServiceForInstall.name} installed successfully!`);
+        showSuccess(`${currentServiceForInstall.name} installed successfully! ${readinessText(result.readiness)}`);
         await loadServices();
     } catch (error) {
         console.error('Installation failed:', error);
@@ -313,13 +413,22 @@ async function confirmInstall() {
     }
 }
 
+/**
+ * Describe the readiness result of an install or start
+ */
+function readinessText(readiness) {
+    if (!readiness) return '';
+    if (readiness.ready) return `Ready after ${readiness.time_to_ready_s}s.`;
+    return 'It is still starting up.';
+}
+
 /**
  * Start a service
  */
 async function startService(serviceId) {
     try {
-        await API.startService(serviceId);
-        showSuccess('Service started');
+        const result = await API.startService(serviceId);
+        showSuccess(`Service started. ${readinessText(result.readiness)}`);
         await loadServices();
     } catch (error) {
         showError(`Failed to start service: ${error.message}`);
@@ -361,6 +470,7 @@ async function removeService(serviceId) {
  */
 async function showLogs(serviceId) {
     currentServiceForLogs = serviceId;
+    currentLogsCursor = null;
 
     const service = allServices.find(s => s.id === serviceId);
     document.getElementById('logsTitle').textContent = `${service?.name || serviceId} - Logs`;
@@ -377,11 +487,26 @@ async function showLogs(serviceId) {
 async function refreshLogs() {
     if (!currentServiceForLogs) return;
 
+    const logsContent = document.getElementById('logsContent');
+
     try {
-        const response = await API.getServiceLogs(currentServiceForLogs, 100);
-        document.getElementById('logsContent').textContent = response.logs || 'No logs available';
+        const response = await API.getServiceLogs(currentServiceForLogs, 100, currentLogsCursor);
+
+        if (!currentLogsCursor) {
+            logsContent.textContent = response.logs || 'No logs available';
+        } else if (response.logs) {
+            // Incremental refresh - only lines newer than the cursor were returned
+            if (logsContent.textContent === 'No logs available') {
+                logsContent.textContent = '';
+            }
+            logsContent.textContent += response.logs;
+        }
+
+        currentLogsCursor = response.cursor || null;
+        logsContent.scrollTop = logsContent.scrollHeight;
     } catch (error) {
-        document.getElementById('logsContent').textContent = `Error loading logs: ${error.message}`;
+        logsContent.textContent = `Error loading logs: ${error.message}`;
+        currentLogsCursor = null;
     }
 }
 
@@ -391,6 +516,7 @@ async function refreshLogs() {
 function closeLogsModal() {
     document.getElementById('logsModal').style.display = 'none';
     currentServiceForLogs = null;
+    currentLogsCursor = null;
 }
 
 /**